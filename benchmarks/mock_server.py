@@ -0,0 +1,213 @@
+"""Local stand-in for ETNA's APIs, used by the benchmarks.
+
+The server answers every URL template of `etnawrapper.constants` with
+generated payloads. Requests are expected on `/<host name>/<path>`, where
+the host name is a key of `constants.API_HOSTS`; `rewrite_url` converts
+the URLs built by the wrappers accordingly.
+"""
+import json
+import random
+from collections import Counter
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from etnawrapper import constants
+from etnawrapper.endpoints import resolve_template
+
+
+class ServerConfig:
+    """Behaviour of the mock server.
+
+    `latency` and `jitter` are in seconds, `error_rate` is the probability
+    of answering `503 Service Unavailable`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.01,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        students: int = 100,
+        log_events: int = 1000,
+        seed: int = 42,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.students = students
+        self.log_events = log_events
+        self.seed = seed
+
+
+def _student(index: int) -> dict:
+    return {
+        "id": index,
+        "login": "student_{}".format(index),
+        "firstname": "First{}".format(index),
+        "lastname": "Last{}".format(index),
+        "email": "student_{}@etna-alternance.net".format(index),
+        "groups": ["student"],
+        "login_date": "2021-04-07 23:38:36",
+    }
+
+
+def _log_event(index: int) -> dict:
+    day = 1 + index % 28
+    return {
+        "id": index,
+        "type": "connection",
+        "start": "2021-03-{:02d} 09:00:00".format(day),
+        "end": "2021-03-{:02d} 18:00:00".format(day),
+        "location": "remote",
+    }
+
+
+def build_payloads(config: ServerConfig) -> dict:
+    """Return the pre-serialized body of every URL template."""
+    students = [_student(index) for index in range(config.students)]
+    events = [_log_event(index) for index in range(config.log_events)]
+    stage = {"name": "Stage", "start": "2021-03-01 09:00", "end": "2021-04-01 23:59"}
+    quest = {"id": 1, "name": "Quest", "date_end": "2021-04-01", "stages": [stage] * 4}
+    project = {"id": 2, "name": "Project", "date_start": "2021-03-01", "date_end": "2021-04-30"}
+    grades = [
+        {"activity_name": "Activity {}".format(index), "student_mark": 15, "uv_name": "UV"}
+        for index in range(40)
+    ]
+    conversations = [
+        {
+            "id": index,
+            "title": "Conversation {}".format(index),
+            "metas": {"wall-name": "students"},
+            "last_message": {"user": index % config.students, "content": "Hello"},
+        }
+        for index in range(20)
+    ]
+    payloads = {
+        constants.IDENTITY_URL: students[0],
+        constants.USER_INFO_URL: students[0],
+        constants.USER_PROMO_URL: [{"id": 1, "target_name": "Bachelor", "promo": "2021"}],
+        constants.PROMOTION_URL: students,
+        constants.GRADES_URL: grades,
+        constants.NOTIF_URL: [{"id": 1, "message": "Notification"}],
+        constants.ACTIVITY_URL: {"Module": {"project": [project], "quest": [quest]}},
+        constants.SEARCH_URL: [project],
+        constants.ACTIVITIES_URL: [project, quest],
+        constants.GROUPS_URL: [{"id": 1, "members": students[:4]}],
+        constants.GSA_EVENTS_URL: events,
+        constants.GSA_LOGS_URL: events,
+        constants.EVENTS_URL: events[:100],
+        constants.DECLARATION_URL: {"declared": True},
+        constants.DECLARATIONS_URL: events[:50],
+        constants.CONVERSATIONS_URL: {"total": len(conversations), "hits": conversations},
+        constants.TICKET_URL: {"id": 1, "title": "Ticket"},
+        constants.TICKETS_URL: [{"id": index, "title": "Ticket"} for index in range(50)],
+        constants.ACHIEVEMENTS_URL: [{"id": index, "name": "Badge"} for index in range(30)],
+        constants.AUTH_URL: {},
+    }
+    return {template: json.dumps(body).encode() for template, body in payloads.items()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "EtnaMock/1.0"
+    # headers and body are written separately, avoid the delayed ACK
+    # penalty on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _original_url(self) -> str:
+        path = urlsplit(self.path).path
+        _, name, rest = path.split("/", 2) if path.count("/") >= 2 else (None, path.strip("/"), "")
+        return constants.API_HOSTS.get(name, "") + "/" + rest
+
+    def _answer(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        rand = server.request_random(self.command, self.path)
+        delay = server.config.latency
+        if server.config.jitter:
+            delay += rand.uniform(0, server.config.jitter)
+        if delay:
+            time.sleep(delay)
+        url = self._original_url()
+        template = resolve_template(url)
+        if rand.random() < server.config.error_rate:
+            status, body = 503, b'{"error": "unavailable"}'
+        elif template is None:
+            status, body = 404, b'{"error": "not found"}'
+        else:
+            status, body = 200, server.payloads[template]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if template == constants.AUTH_URL:
+            self.send_header("Set-Cookie", "authenticator=benchmark; Path=/")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = do_HEAD = _answer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops the connections opened concurrently
+    # by the pooled clients
+    request_queue_size = 1024
+
+    def request_random(self, method: str, path: str) -> random.Random:
+        """Return the random generator of the next `method` request to `path`.
+
+        Each request gets its own generator, seeded on the seed, the
+        request and how many times it was received before, so the same
+        requests meet the same errors whatever the thread scheduling.
+        """
+        with self.lock:
+            occurrence = self.seen[method, path]
+            self.seen[method, path] += 1
+        return random.Random("{} {} {} {}".format(self.config.seed, method, path, occurrence))
+
+
+class MockServer:
+    """Threaded mock server, usable as a context manager."""
+
+    def __init__(self, config: ServerConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or ServerConfig()
+        self._server = _Server((host, port), _Handler)
+        self._server.config = self.config
+        self._server.payloads = build_payloads(self.config)
+        self._server.seen = Counter()
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def rewrite_url(self, url: str) -> str:
+        """Return the URL of the mock server standing for `url`."""
+        for name, base in constants.API_HOSTS.items():
+            if url.startswith(base):
+                return "{}/{}{}".format(self.base_url, name, url[len(base):])
+        return url
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
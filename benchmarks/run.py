@@ -0,0 +1,234 @@
+"""Offline benchmarks of etnawrapper against a local mock server.
+
+Compare the plain, pooled and async clients, cached and uncached
+requests, batch fan-out at several concurrency levels and buffered vs
+streamed decoding of large payloads:
+
+    $ python benchmarks/run.py --latency 0.02 --students 5000 --log-events 100000
+    $ python benchmarks/run.py --output report.json
+
+Every run uses the same seed, so reports can be compared between
+revisions to catch regressions. Failed requests (e.g. the 503 injected
+with `--error-rate` and not retried) are counted in the `errors` column.
+
+The script can be run from anywhere, it uses the package of its checkout.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import requests
+
+# use the checkout this script belongs to, not an installed etnawrapper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockServer, ServerConfig  # noqa: E402
+
+from etnawrapper import EtnaWrapper, AsyncEtnaWrapper  # noqa: E402
+from etnawrapper.cache import MemoryCache  # noqa: E402
+from etnawrapper.transport import RetryPolicy, Transport  # noqa: E402
+
+
+class _Rewriting:
+    """Send the requests of a wrapper to the mock server."""
+
+    def __init__(self, req, server: MockServer):
+        self.req = req
+        self.server = server
+
+    def request(self, method, url, **kwargs):
+        return self.req.request(method, self.server.rewrite_url(url), **kwargs)
+
+
+class _AsyncMockWrapper(AsyncEtnaWrapper):
+    def __init__(self, server: MockServer, **kwargs):
+        super().__init__(**kwargs)
+        self.server = server
+
+    async def _query(self, url, *args, **kwargs):
+        return await super()._query(self.server.rewrite_url(url), *args, **kwargs)
+
+
+def make_wrapper(server: MockServer, use_session: bool = True, pool_maxsize: int = 10, **kwargs):
+    """Return an `EtnaWrapper` talking to `server`."""
+    if use_session:
+        req = EtnaWrapper.create_session(pool_maxsize=pool_maxsize)
+    else:
+        req = requests
+    transport = Transport(_Rewriting(req, server), retry=RetryPolicy(total=3, backoff_factor=0.01))
+    return EtnaWrapper(
+        "student_0", cookies={}, use_session=use_session, transport=transport, **kwargs
+    )
+
+
+def _percentile(values, percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(
+    name: str, elapsed: float, count: int, latencies=None, peak: int = None, errors: int = 0,
+) -> dict:
+    report = {
+        "scenario": name,
+        "requests": count,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput": round(count / elapsed, 2) if elapsed else None,
+    }
+    if latencies:
+        report.update({
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        })
+    if peak is not None:
+        report["peak_memory_kb"] = round(peak / 1024, 1)
+    return report
+
+
+def sequential(name: str, func, count: int) -> dict:
+    """Call `func(index)` `count` times in a row, counting the failed calls."""
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for index in range(count):
+        before = time.perf_counter()
+        try:
+            func(index)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - before)
+    return _report(name, time.perf_counter() - started, count, latencies, errors=errors)
+
+
+def with_memory(name: str, func, count: int = 1) -> dict:
+    """Measure the duration and the peak memory of `func()`."""
+    errors = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        func()
+    except Exception:
+        errors = 1
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _report(name, elapsed, count, peak=peak, errors=errors)
+
+
+def bench_clients(server: MockServer, count: int, concurrency: int) -> list:
+    plain = make_wrapper(server, use_session=False, conditional=False, single_flight=False)
+    pooled = make_wrapper(server, conditional=False, single_flight=False)
+    reports = [
+        sequential("plain", lambda index: plain.get_user_info(index), count),
+        sequential("pooled", lambda index: pooled.get_user_info(index), count),
+    ]
+
+    async def run_async():
+        client = _AsyncMockWrapper(server, login="student_0", cookies={}, concurrency=concurrency)
+        async with client:
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                *(client.get_user_info(index) for index in range(count)), return_exceptions=True
+            )
+            errors = sum(isinstance(result, Exception) for result in results)
+            return time.perf_counter() - started, errors
+
+    elapsed, errors = asyncio.run(run_async())
+    reports.append(
+        _report("async (concurrency={})".format(concurrency), elapsed, count, errors=errors)
+    )
+    return reports
+
+
+def bench_cache(server: MockServer, count: int) -> list:
+    uncached = make_wrapper(server, conditional=False)
+    cached = make_wrapper(server, cache=MemoryCache())
+    return [
+        sequential("uncached", lambda index: uncached.get_user_info(index % 10), count),
+        sequential("cached", lambda index: cached.get_user_info(index % 10), count),
+    ]
+
+
+def bench_batch(server: MockServer, count: int, levels) -> list:
+    logins = ["student_{}".format(index) for index in range(count)]
+    reports = []
+    for workers in levels:
+        client = make_wrapper(server, pool_maxsize=workers)
+        started = time.perf_counter()
+        results = client.batch(max_workers=workers).get_grades(1, logins=logins)
+        elapsed = time.perf_counter() - started
+        errors = sum(not result.ok for result in results)
+        reports.append(_report("batch (workers={})".format(workers), elapsed, count, errors=errors))
+    return reports
+
+
+def bench_payloads(server: MockServer) -> list:
+    client = make_wrapper(server, conditional=False)
+
+    def consume(iterable):
+        for _ in iterable:
+            pass
+
+    return [
+        with_memory("trombi", lambda: client.get_students(1)),
+        with_memory("trombi (stream)", lambda: consume(client.get_students(1, stream=True))),
+        with_memory("logs", lambda: client.get_logs()),
+        with_memory("logs (stream)", lambda: consume(client.get_logs(stream=True))),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--latency", type=float, default=0.01, help="server latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503")
+    parser.add_argument("--students", type=int, default=5000, help="size of the trombi")
+    parser.add_argument("--log-events", type=int, default=100000, help="number of log events")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="async client concurrency")
+    parser.add_argument("--batch-levels", default="1,4,16", help="batch worker counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    config = ServerConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        students=args.students,
+        log_events=args.log_events,
+        seed=args.seed,
+    )
+    levels = [int(level) for level in args.batch_levels.split(",")]
+    with MockServer(config) as server:
+        reports = []
+        reports += bench_clients(server, args.requests, args.concurrency)
+        reports += bench_cache(server, args.requests)
+        reports += bench_batch(server, args.requests, levels)
+        reports += bench_payloads(server)
+
+    columns = ("scenario", "requests", "errors", "seconds", "throughput", "p50_ms", "p95_ms", "p99_ms", "peak_memory_kb")
+    print(" | ".join("{:>24}".format(column) if index == 0 else "{:>10}".format(column)
+                     for index, column in enumerate(columns)))
+    for report in reports:
+        print(" | ".join(
+            "{:>24}".format(str(report.get(column, ""))) if index == 0
+            else "{:>10}".format(str(report.get(column, "")))
+            for index, column in enumerate(columns)
+        ))
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump({"config": vars(args), "results": reports}, stream, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,29 @@
 # coding: utf-8
 """
 Allows accessing the module
+
+The wrappers are imported on first access, so that importing a light
+submodule (e.g. from the CLI) does not load `requests` or `asyncio`.
 """
-from .etna import EtnaWrapper
+import importlib
+
+
+_LAZY = {
+    "EtnaWrapper": ".etna",
+    "AsyncEtnaWrapper": ".aio",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
 
 
-__all__ = ["EtnaWrapper"]
+__all__ = ["EtnaWrapper", "AsyncEtnaWrapper"]
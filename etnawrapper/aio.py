@@ -0,0 +1,417 @@
+"""Asynchronous client for ETNA's APIs, built on top of aiohttp."""
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Union, List
+
+from .constants import (
+    AUTH_URL,
+    IDENTITY_URL,
+    USER_INFO_URL,
+    PROMOTION_URL,
+    USER_PROMO_URL,
+    ACTIVITY_URL,
+    NOTIF_URL,
+    GRADES_URL,
+    PICTURE_URL,
+    SEARCH_URL,
+    ACTIVITIES_URL,
+    GROUPS_URL,
+    GSA_EVENTS_URL,
+    GSA_LOGS_URL,
+    EVENTS_URL,
+    DECLARATION_URL,
+    DECLARATIONS_URL,
+    CONVERSATIONS_URL,
+    TICKET_URL,
+    TICKETS_URL,
+    ACHIEVEMENTS_URL,
+    CACHE_TTLS,
+    DEFAULT_TIMEOUT,
+    TIMEOUTS,
+)
+from .cache import BaseCache, MISSING
+from .endpoints import resolve_template
+from .errors import BadStatusException
+
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class AsyncEtnaWrapper:
+    """asyncio counterpart of `etnawrapper.EtnaWrapper`.
+
+    Every request goes through a single pooled `aiohttp.ClientSession`.
+    `max_connections` bounds the sockets opened by the pool, and
+    `concurrency` bounds the number of requests in flight at once.
+
+    Like `EtnaWrapper`, requests use the per-endpoint (connect, read)
+    timeouts of `timeouts`, error statuses raise `BadStatusException` and
+    GET requests on the templates of `cache_ttls` are served from `cache`
+    when it is set.
+
+    Use it as an asynchronous context manager to release the pool:
+
+    >>> async with AsyncEtnaWrapper('login', 'password') as etna:
+    ...     infos = await etna.get_user_info()
+    """
+
+    def __init__(
+        self,
+        login: str = None,
+        password: str = None,
+        cookies: dict = None,
+        headers: dict = None,
+        max_connections: int = 100,
+        max_connections_per_host: int = 0,
+        concurrency: int = 100,
+        timeout: float = 50,
+        session=None,
+        cache: BaseCache = None,
+        cache_ttls: dict = None,
+        timeouts: dict = None,
+        default_timeout: tuple = DEFAULT_TIMEOUT,
+    ):
+        if cookies is None:
+            if login is None:
+                raise ValueError("missing login, can not authenticate")
+            if password is None:
+                raise ValueError("missing password, can not authenticate")
+        self.login = login
+        self._password = password
+        self._cookies = cookies
+        self.headers = headers
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self._session = session
+        self._owns_session = session is None
+        self.concurrency = concurrency
+        # asyncio primitives are bound to a loop before Python 3.10, they
+        # are created in the loop running the requests, see `_primitives`
+        self._loop = None
+        self._semaphore = None
+        self._auth_lock = None
+        self.cache = cache
+        self.cache_ttls = dict(CACHE_TTLS)
+        if cache_ttls is not None:
+            self.cache_ttls.update(cache_ttls)
+        self.default_timeout = default_timeout
+        self.timeouts = dict(TIMEOUTS)
+        if timeouts is not None:
+            self.timeouts.update(timeouts)
+
+    def __repr__(self):
+        return "<etnawrapper.aio.AsyncEtnaWrapper(login='{}', cookies={})>".format(
+            self.login, self._cookies
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Close the underlying HTTP pool if it was created by the wrapper."""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            if aiohttp is None:
+                raise ImportError(
+                    "aiohttp is required for AsyncEtnaWrapper, "
+                    "install it using `pip install etnawrapper[async]`"
+                )
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _primitives(self) -> tuple:
+        """Return the request semaphore and the login lock of the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._auth_lock = asyncio.Lock()
+        return self._semaphore, self._auth_lock
+
+    async def _ensure_cookies(self) -> dict:
+        if self._cookies is None:
+            _, auth_lock = self._primitives()
+            async with auth_lock:
+                if self._cookies is None:
+                    self._cookies = await self.get_cookies(self.login, self._password)
+        return self._cookies
+
+    def _timeout(self, url: str):
+        """Return the `aiohttp.ClientTimeout` of a request to `url`."""
+        if aiohttp is None:
+            return None
+        connect, read = self.timeouts.get(resolve_template(url), self.default_timeout)
+        return aiohttp.ClientTimeout(total=self.timeout, sock_connect=connect, sock_read=read)
+
+    def _cache_key(self, template: str, url: str, params: dict = None, raw: bool = False) -> str:
+        """Build the cache key of a request, see `EtnaWrapper._cache_key`."""
+        query = "&".join(
+            "{}={}".format(key, value) for key, value in sorted((params or {}).items())
+        )
+        identity = repr(sorted((self._cookies or {}).items())).encode()
+        digest = hashlib.sha1(identity).hexdigest()
+        return "{} {}?{} {} {}".format(template, url, query, int(raw), digest)
+
+    async def _query(
+        self, url: str, method="GET", raw: bool = False, data=None, params=None,
+    ) -> Union[dict, bytes]:
+        """Perform a request using the pooled HTTP session.
+
+        Upon requesting a non-standard URL (not returning JSON),
+        the `raw` flag allow to return the response body as `bytes`
+        instead of a dictionnary.
+
+        Raise `BadStatusException` when the API answers with an error.
+        """
+        cookies = await self._ensure_cookies()
+        template = resolve_template(url)
+        ttl = key = None
+        if method == "GET" and self.cache is not None:
+            ttl = self.cache_ttls.get(template)
+        if ttl:
+            key = self._cache_key(template, url, params, raw)
+            cached = self.cache.get(key, MISSING)
+            if cached is not MISSING:
+                return cached
+        session = self._get_session()
+        semaphore, _ = self._primitives()
+        async with semaphore:
+            async with session.request(
+                method,
+                url,
+                cookies=cookies,
+                json=data,
+                params=params,
+                headers=self.headers,
+                timeout=self._timeout(url),
+            ) as response:
+                if response.status >= 400:
+                    raise BadStatusException(
+                        "{} {} returned {}".format(method, url, response.status),
+                        status_code=response.status,
+                        response=response,
+                    )
+                if raw:
+                    result = await response.read()
+                else:
+                    result = await response.json(content_type=None)
+        if ttl:
+            self.cache.set(key, result, ttl)
+        return result
+
+    async def get_cookies(self, login: str = None, password: str = None) -> dict:
+        """Fetch a Cookie."""
+        if login is None:
+            raise ValueError("missing login, can not authenticate")
+        if password is None:
+            raise ValueError("missing password, can not authenticate")
+        data = {"login": login, "password": password}
+        session = self._get_session()
+        semaphore, _ = self._primitives()
+        async with semaphore:
+            async with session.post(AUTH_URL, data=data, timeout=self._timeout(AUTH_URL)) as response:
+                if response.status >= 400:
+                    raise BadStatusException(
+                        "POST {} returned {}".format(AUTH_URL, response.status),
+                        status_code=response.status,
+                        response=response,
+                    )
+                cookies = {key: morsel.value for key, morsel in response.cookies.items()}
+        if not cookies:
+            raise BadStatusException(
+                "authentication of {} returned no cookie".format(login),
+                status_code=response.status,
+                response=response,
+            )
+        return cookies
+
+    def invalidate(self, *templates: str):
+        """Drop the cached responses of every URL template in `templates`."""
+        if self.cache is not None:
+            for template in templates:
+                self.cache.invalidate(template + " ")
+
+    async def get_user_info(self, user_id: int = None) -> dict:
+        """Return a user's informations. Defaults to self.login."""
+        url = IDENTITY_URL
+        if user_id is not None:
+            url = USER_INFO_URL.format(user_id=user_id)
+        return await self._query(url)
+
+    async def get_promotion(self, promotion_id: int = None) -> dict:
+        """Return a user's informations. Defaults to self.login."""
+        url = USER_PROMO_URL
+        if promotion_id is not None:
+            url = PROMOTION_URL.format(promo_id=promotion_id)
+        return await self._query(url)
+
+    async def get_user_promotion(self, login: str = None) -> dict:
+        """Return user's promotions."""
+        url = USER_PROMO_URL
+        if login is not None:
+            url = USER_PROMO_URL + "?login=" + login
+        return await self._query(url)
+
+    async def get_current_activities(self, login: str = None) -> dict:
+        """Return a user's current activities.
+
+        Defaults to self.login.
+
+        """
+        url = ACTIVITY_URL.format(login=login or self.login)
+        return await self._query(url)
+
+    async def get_notifications(self, login: str = None) -> dict:
+        """Return `login`'s notifications.
+
+        If login is not set, defaults to self.login.
+        """
+        url = NOTIF_URL.format(login=login or self.login)
+        return await self._query(url)
+
+    async def get_grades(self, promotion_id: int, login: str = None) -> dict:
+        """Fetch a student's grades, based on the promotion."""
+        url = GRADES_URL.format(login=login or self.login, promo_id=promotion_id)
+        return await self._query(url)
+
+    async def get_picture(self, login: str = None) -> bytes:
+        """Fetch a user's picture, defaults to self.login."""
+        url = PICTURE_URL.format(login=login or self.login)
+        return await self._query(url, raw=True)
+
+    async def get_projects(self, login: str = None, date: datetime = None) -> dict:
+        """Fetch a student's projects base on the login."""
+        url = SEARCH_URL.format(login=login or self.login)
+        params = dict()
+        if date is not None:
+            params["date"] = date.strftime('%Y-%m-%d')
+        return await self._query(url, params=params)
+
+    async def get_project_activites(self, module: str) -> dict:
+        """Fetch activities related to `module`."""
+        url = ACTIVITIES_URL.format(module_id=module)
+        return await self._query(url)
+
+    async def get_group_for_activity(self, module: str, project: str) -> dict:
+        """Return group composition for the module/project tuple."""
+        url = GROUPS_URL.format(module_id=module, project_id=project)
+        return await self._query(url)
+
+    async def get_students(self, promotion_id: int) -> dict:
+        """Fetch every student bsaed on `promotion_id`."""
+        url = PROMOTION_URL.format(promo_id=promotion_id)
+        return await self._query(url)
+
+    async def get_log_events(self, login: str = None) -> dict:
+        """Get a user's log event, defaults to self.login."""
+        url = GSA_EVENTS_URL.format(login=login or self.login)
+        return await self._query(url)
+
+    async def get_logs(self, login: str = None) -> dict:
+        """Fetch a user's logs, defaults to self.login."""
+        url = GSA_LOGS_URL.format(login=login or self.login)
+        return await self._query(url)
+
+    async def get_events(
+        self, start_date: datetime, end_date: datetime, login: str = None
+    ) -> dict:
+        """Fetch a user's events, defaults to self.login."""
+        url = EVENTS_URL.format(
+            login=login or self.login,
+            start_date=start_date.isoformat(),
+            end_date=end_date.isoformat(),
+        )
+        return await self._query(url)
+
+    async def get_conversations(self, user_id: int, start: int = None, size: int = None) -> dict:
+        """Return the list of conversations for a user.
+
+        Requires read permission for this user_id.
+        """
+        url = CONVERSATIONS_URL.format(user_id=user_id)
+        params = dict()
+        if start is not None:
+            params['from'] = start
+        if size is not None:
+            params['size'] = size
+        return await self._query(url, params=params)
+
+    async def get_declarations(self, start: str = None, end: str = None) -> dict:
+        """Return the list of declarations for a user.
+
+        Requires read permission for this login.
+        """
+        url = DECLARATIONS_URL.format(login=self.login)
+        params = dict()
+        if start is not None:
+            params['start'] = start
+        if end is not None:
+            params['end'] = end
+        return await self._query(url, params=params)
+
+    async def declare_log(self, module_id: int, content: dict):
+        """Send a log declaration for module_id with `content`.
+
+        See `EtnaWrapper.declare_log` for the expected `content`.
+        """
+        url = DECLARATION_URL.format(login=self.login, module_id=module_id)
+        await self._query(url, method='OPTIONS', raw=True)
+        result = await self._query(url, method='POST', data=content)
+        self.invalidate(DECLARATIONS_URL, GSA_LOGS_URL, GSA_EVENTS_URL)
+        return result
+
+    async def open_ticket(self, title: str, message: str, tags: List[str] = None, users: List[str] = None):
+        """Open a ticket."""
+        content = {
+            'title': title,
+            'message': message,
+            'tags': tags,
+            'users': users,
+        }
+        await self._query(TICKETS_URL, method='OPTIONS', raw=True)
+        result = await self._query(TICKETS_URL, method='POST', data=content)
+        self.invalidate(TICKETS_URL)
+        return result
+
+    async def close_ticket(self, ticket_id: int):
+        """Close a ticket."""
+        url = TICKET_URL.format(task_id=ticket_id)
+        result = await self._query(url, method='DELETE')
+        self.invalidate(TICKETS_URL, TICKET_URL)
+        return result
+
+    async def get_tickets(self):
+        """Fetch the list of tickets."""
+        return await self._query(TICKETS_URL)
+
+    async def get_ticket(self, ticket_id: int):
+        """Fetch the ticket matching `ticket_id`."""
+        url = TICKET_URL.format(task_id=ticket_id)
+        return await self._query(url)
+
+    async def get_achievements(self, login: str = None) -> list:
+        """Fetch the list of achievements."""
+        url = ACHIEVEMENTS_URL.format(login=login or self.login)
+        return await self._query(url)
+
+
+__all__ = ("AsyncEtnaWrapper",)
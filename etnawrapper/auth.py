@@ -0,0 +1,219 @@
+"""Authentication cookies management.
+
+`AuthManager` logs in against `AUTH_URL`, keeps the resulting cookies in
+a `TokenStore` and renews them shortly before they expire, so that
+short-lived processes can reuse the session of a previous run.
+"""
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import requests
+
+from .constants import AUTH_URL, DEFAULT_TIMEOUT, TIMEOUTS
+from .errors import BadStatusException, DeadlineExceeded
+
+
+class TokenStore:
+    """Interface of the stores used to persist the authentication cookies.
+
+    Records are dicts holding the `cookies` and their `expires` timestamp.
+    """
+
+    def load(self, login: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def save(self, login: str, record: dict):
+        raise NotImplementedError
+
+    def delete(self, login: str):
+        raise NotImplementedError
+
+
+class MemoryTokenStore(TokenStore):
+    """Keep the cookies for the lifetime of the process."""
+
+    def __init__(self):
+        self._records = {}
+
+    def load(self, login: str) -> Optional[dict]:
+        return self._records.get(login)
+
+    def save(self, login: str, record: dict):
+        self._records[login] = record
+
+    def delete(self, login: str):
+        self._records.pop(login, None)
+
+
+class FileTokenStore(TokenStore):
+    """Persist the cookies of every login in a JSON file only readable by its owner."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as stream:
+                return json.load(stream)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, records: dict):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory)
+        with os.fdopen(descriptor, "w") as stream:
+            json.dump(records, stream)
+        os.chmod(temporary, 0o600)
+        os.replace(temporary, self.path)
+
+    def load(self, login: str) -> Optional[dict]:
+        with self._lock:
+            return self._read().get(login)
+
+    def save(self, login: str, record: dict):
+        with self._lock:
+            records = self._read()
+            records[login] = record
+            self._write(records)
+
+    def delete(self, login: str):
+        with self._lock:
+            records = self._read()
+            if records.pop(login, None) is not None:
+                self._write(records)
+
+
+def _jwt_expiry(token: str) -> Optional[float]:
+    """Return the `exp` claim of a JWT, None if `token` is not one."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except ValueError:
+        return None
+    expiry = claims.get("exp") if isinstance(claims, dict) else None
+    try:
+        return float(expiry) if expiry is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class AuthManager:
+    """Provide valid authentication cookies for `login`.
+
+    Cookies are loaded from `store` when possible and renewed
+    `refresh_margin` seconds before they expire. The expiry is read from
+    the cookies themselves (JWT `exp` claim or cookie expiry) and defaults
+    to `lifetime` seconds after the login. Concurrent callers share a
+    single renewal.
+
+    Logins are bounded by `timeout`, a (connect, read) tuple defaulting to
+    the one of `AUTH_URL` in `TIMEOUTS`, and by the `deadline` given to
+    `cookies` and `refresh`.
+    """
+
+    def __init__(
+        self,
+        login: str = None,
+        password: str = None,
+        store: TokenStore = None,
+        req=None,
+        refresh_margin: float = 300,
+        lifetime: float = 3600,
+        timeout: tuple = None,
+    ):
+        if login is None:
+            raise ValueError("missing login, can not authenticate")
+        self.login = login
+        self._password = password
+        self.store = store if store is not None else MemoryTokenStore()
+        self._req = req if req is not None else requests
+        self.refresh_margin = refresh_margin
+        self.lifetime = lifetime
+        self.timeout = timeout if timeout is not None else TIMEOUTS.get(AUTH_URL, DEFAULT_TIMEOUT)
+        self._lock = threading.Lock()
+        self._record = self.store.load(login)
+
+    def _is_fresh(self, record: Optional[dict]) -> bool:
+        if not record:
+            return False
+        return record["expires"] - self.refresh_margin > time.time()
+
+    def cookies(self, deadline: float = None) -> dict:
+        """Return valid cookies, authenticating again if needed."""
+        record = self._record
+        if self._is_fresh(record):
+            return record["cookies"]
+        return self.refresh(stale=record["cookies"] if record else None, deadline=deadline)
+
+    def refresh(self, stale: dict = None, deadline: float = None) -> dict:
+        """Authenticate again and return the new cookies.
+
+        `stale` are the cookies the caller found invalid: when another
+        thread already replaced them, its cookies are returned instead
+        of authenticating once more. `deadline` is a `time.monotonic()`
+        value bounding the login, `DeadlineExceeded` is raised once passed.
+        """
+        with self._lock:
+            record = self._record
+            if record and record["cookies"] != stale and self._is_fresh(record):
+                return record["cookies"]
+            record = self._authenticate(deadline)
+            self._record = record
+            self.store.save(self.login, record)
+            return record["cookies"]
+
+    def invalidate(self):
+        """Forget the current cookies."""
+        with self._lock:
+            self._record = None
+            self.store.delete(self.login)
+
+    def _timeout(self, deadline: float = None) -> tuple:
+        connect, read = self.timeout
+        if deadline is None:
+            return connect, read
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("deadline exceeded before authenticating {}".format(self.login))
+        return min(connect, remaining), min(read, remaining)
+
+    def _authenticate(self, deadline: float = None) -> dict:
+        """Log in, raise `BadStatusException` when it was refused."""
+        if self._password is None:
+            raise ValueError("missing password, can not authenticate")
+        data = {"login": self.login, "password": self._password}
+        response = self._req.post(AUTH_URL, data=data, timeout=self._timeout(deadline))
+        if not 200 <= response.status_code < 300:
+            raise BadStatusException(
+                "authentication of {} returned {}".format(self.login, response.status_code),
+                status_code=response.status_code,
+                response=response,
+            )
+        if not response.cookies:
+            raise BadStatusException(
+                "authentication of {} returned no cookie".format(self.login),
+                status_code=response.status_code,
+                response=response,
+            )
+        now = time.time()
+        expires = None
+        for cookie in response.cookies:
+            expiry = _jwt_expiry(cookie.value or "") or cookie.expires
+            if expiry is not None:
+                expires = expiry if expires is None else min(expires, expiry)
+        if expires is None:
+            expires = now + self.lifetime
+        return {"cookies": response.cookies.get_dict(), "expires": expires}
+
+
+__all__ = ("TokenStore", "MemoryTokenStore", "FileTokenStore", "AuthManager")
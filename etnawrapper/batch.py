@@ -0,0 +1,75 @@
+"""Concurrent fan-out of `EtnaWrapper` calls over many students."""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, NamedTuple
+
+
+class BatchResult(NamedTuple):
+    """Outcome of a single call of a batch."""
+
+    key: Any
+    value: Any = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Batch:
+    """Run the same `EtnaWrapper` method for many keys on a thread pool.
+
+    Results are returned in input order, one `BatchResult` per key.
+    A failing call is reported in its `BatchResult.error` and does not
+    abort the batch. Duplicated keys only trigger a single request.
+
+    >>> results = wrapper.batch(max_workers=16).get_grades(42, logins=logins)
+    >>> grades = {result.key: result.value for result in results if result.ok}
+    """
+
+    def __init__(self, wrapper, max_workers: int = 8):
+        self.wrapper = wrapper
+        self.max_workers = max_workers
+
+    def map(self, func: Callable, keys: Iterable) -> List[BatchResult]:
+        """Call `func(key)` for every key in `keys`, within the caller's deadline."""
+        func = self.wrapper.bind_deadline(func)
+        keys = list(keys)
+        unique = list(dict.fromkeys(keys))
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {key: executor.submit(func, key) for key in unique}
+            for key, future in futures.items():
+                try:
+                    outcomes[key] = BatchResult(key, value=future.result())
+                except Exception as error:
+                    outcomes[key] = BatchResult(key, error=error)
+        return [outcomes[key] for key in keys]
+
+    def get_user_info(self, user_ids: Iterable[int]) -> List[BatchResult]:
+        """Fetch the informations of every user in `user_ids`."""
+        return self.map(self.wrapper.get_user_info, user_ids)
+
+    def get_grades(self, promotion_id: int, logins: Iterable[str]) -> List[BatchResult]:
+        """Fetch the grades of every student in `logins`."""
+        return self.map(
+            lambda login: self.wrapper.get_grades(promotion_id, login=login), logins
+        )
+
+    def get_current_activities(self, logins: Iterable[str]) -> List[BatchResult]:
+        """Fetch the current activities of every student in `logins`."""
+        return self.map(self.wrapper.get_current_activities, logins)
+
+    def get_logs(self, logins: Iterable[str]) -> List[BatchResult]:
+        """Fetch the logs of every student in `logins`."""
+        return self.map(self.wrapper.get_logs, logins)
+
+    def get_log_events(self, logins: Iterable[str]) -> List[BatchResult]:
+        """Fetch the log events of every student in `logins`."""
+        return self.map(self.wrapper.get_log_events, logins)
+
+    def get_achievements(self, logins: Iterable[str]) -> List[BatchResult]:
+        """Fetch the achievements of every student in `logins`."""
+        return self.map(self.wrapper.get_achievements, logins)
+
+
+__all__ = ("Batch", "BatchResult")
@@ -0,0 +1,197 @@
+"""Response caches used by `EtnaWrapper._query`.
+
+Every backend is a bounded LRU mapping whose entries expire after a
+per-entry time to live. Keys are strings starting with the URL template
+of the cached endpoint, which allows invalidating every entry of an
+endpoint at once.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+MISSING = object()
+
+
+class BaseCache:
+    """Interface shared by the cache backends.
+
+    Subclasses implement `_get`, `_set`, `delete`, `invalidate` and `clear`,
+    `get` takes care of the hit/miss counters, under their own lock.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._counters_lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        """Return the value stored for `key`, `default` if missing or expired."""
+        value = self._get(key)
+        with self._counters_lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if value is MISSING else value
+
+    def set(self, key: str, value, ttl: float = None):
+        """Store `value` for `ttl` seconds, forever if `ttl` is None."""
+        expires = None if ttl is None else time.time() + ttl
+        self._set(key, value, expires)
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters."""
+        with self._counters_lock:
+            hits, misses = self.hits, self.misses
+        return {"hits": hits, "misses": misses, "size": len(self)}
+
+    def _get(self, key: str):
+        raise NotImplementedError
+
+    def _set(self, key: str, value, expires: float = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove `key` from the cache."""
+        raise NotImplementedError
+
+    def invalidate(self, prefix: str):
+        """Remove every entry whose key starts with `prefix`."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove every entry."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """In-process LRU cache."""
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__(maxsize)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value, expires: float = None):
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache(BaseCache):
+    """LRU cache persisted in a SQLite database.
+
+    Values are pickled, which allows caching `requests.Response` objects
+    returned by raw queries.
+    """
+
+    def __init__(self, path: str, maxsize: int = 4096):
+        super().__init__(maxsize)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires REAL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+
+    def _get(self, key: str):
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISSING
+            value, expires = row
+            if expires is not None and expires < now:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return MISSING
+            self._db.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return pickle.loads(value)
+
+    def _set(self, key: str, value, expires: float = None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, blob, expires, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def invalidate(self, prefix: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM entries WHERE substr(key, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+
+    def close(self):
+        """Close the underlying database."""
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+__all__ = ("BaseCache", "MemoryCache", "DiskCache")
@@ -1,13 +1,29 @@
-"""Script to interact with etnawrapper."""
+"""Script to interact with etnawrapper.
+
+The wrapper (and `requests`) is only imported once a command needs it,
+responses are kept in a local cache and reused while younger than
+`--max-age` seconds, or whatever their age with `--offline`.
+"""
 import os
+import time
 import typing
+from datetime import datetime, timezone
 
-import arrow  # TODO: Use datetime to remove arrow dependency
 import click
 
-from etnawrapper import EtnaWrapper
+from etnawrapper.cache import BaseCache, DiskCache, MISSING
+from etnawrapper.errors import BadStatusException
+from etnawrapper.utils import extract_items, parse_datetime
 
 
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'etnawrapper',
+)
+TOKEN_STORE_PATH = os.path.join(CACHE_DIR, 'tokens.json')
+RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, 'responses.sqlite')
+DEFAULT_MAX_AGE = 300
+UNKNOWN_AUTHOR = {'login': 'unknown', 'firstname': '', 'lastname': ''}
 CURSOR_UP_ONE = '\x1b[1A'
 ERASE_LINE = '\x1b[2K'
 
@@ -16,6 +32,60 @@ def _clear_line():
     print(CURSOR_UP_ONE + ERASE_LINE, end='')
 
 
+def _is_past(value) -> bool:
+    moment = parse_datetime(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment < datetime.now(timezone.utc)
+
+
+class _AgedCache(BaseCache):
+    """Keep responses in `backend`, serve them while younger than `max_age`.
+
+    Entries never expire in the backend (it is a bounded LRU), so that
+    they stay available offline; `max_age=None` serves them at any age.
+    """
+
+    def __init__(self, backend: BaseCache, max_age: float = None):
+        super().__init__(backend.maxsize)
+        self.backend = backend
+        self.max_age = max_age
+
+    def _get(self, key: str):
+        entry = self.backend.get(key, MISSING)
+        if entry is MISSING:
+            return MISSING
+        stored, value = entry
+        if self.max_age is not None and time.time() - stored > self.max_age:
+            return MISSING
+        return value
+
+    def _set(self, key: str, value, expires: float = None):
+        self.backend.set(key, (time.time(), value))
+
+    def delete(self, key: str):
+        self.backend.delete(key)
+
+    def invalidate(self, prefix: str):
+        self.backend.invalidate(prefix)
+
+    def clear(self):
+        self.backend.clear()
+
+    def __len__(self):
+        return len(self.backend)
+
+
+class _OfflineTransport:
+    """Transport of `--offline` runs, refusing to reach the network."""
+
+    def request(self, method, url, **kwargs):
+        raise click.ClickException(f"offline: no cached response for {url}")
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
 def display_current_projects(projects: typing.List[typing.Dict]):
     """Pretty print current projects with end date."""
     fmt_p = [f"{project['name']} ({project['date_end']})" for project in projects]
@@ -36,7 +106,7 @@ def display_current_quests(quests: typing.List[typing.Dict], show_all=False):
     for quest in _quests:
         click.secho(f"     {quest['name']}", fg='blue')
         for stage in quest['stages']:
-            if not show_all and arrow.get(stage['end']) < arrow.utcnow():
+            if not show_all and _is_past(stage['end']):
                 continue
             click.secho(f"       {stage['name']} {(stage['end'])}", fg='green')
 
@@ -55,8 +125,22 @@ def conversations():
 
 
 @click.group()
-def cli():
+@click.option(
+    '--offline',
+    help='Only use cached responses.',
+    is_flag=True,
+)
+@click.option(
+    '--max-age',
+    help='Reuse cached responses younger than this (seconds).',
+    type=int,
+    default=DEFAULT_MAX_AGE,
+    show_default=True,
+)
+@click.pass_context
+def cli(ctx, offline, max_age):
     """CLI utility to interact with ETNA's APIs."""
+    ctx.obj = {'offline': offline, 'max_age': max_age}
 
 
 @conversations.command(name='list')
@@ -71,11 +155,22 @@ def list_latest_conversations(count):
     click.secho(f"Fetching conversations for {etna.login}")
     infos = etna.get_user_info()
     response = etna.get_conversations(infos['id'], size=count)
+    from etnawrapper.directory import Directory
+
+    # the trombi of the user's promotions names most authors in a request or
+    # two, the other displayed authors are fetched once each
+    directory = Directory(etna)
+    try:
+        for promotion in extract_items(etna.get_user_promotion()):
+            directory.load(promotion['id'])
+    except BadStatusException:
+        pass
+    authors = directory.resolve(
+        conversation['last_message']['user'] for conversation in response['hits']
+    )
     _clear_line()
-    # TODO: Maybe cache the user_id of the author to
-    #       avoid querying the same profile
     for conversation in response['hits']:
-        infos = etna.get_user_info(conversation['last_message']['user'])
+        infos = authors.get(conversation['last_message']['user'], UNKNOWN_AUTHOR)
         identifier = conversation['metas'].get('uv_name', 'students')
         wall_name = conversation['metas']['wall-name']
         message = conversation['last_message']['content'].replace('\n\n', '\n')
@@ -119,16 +214,93 @@ def list_current_activities(full):
             display_current_quests(quests, show_all=full)
 
 
+@click.command(name='export')
+@click.option('--output', help='Output directory.', required=True, type=click.Path(file_okay=False))
+@click.option(
+    '--promotion', 'promotions', help='Promotion id, defaults to yours.', type=int, multiple=True,
+)
+@click.option(
+    '--kind', 'kinds', help='Data to export.', multiple=True,
+    type=click.Choice(['grades', 'logs', 'achievements']),
+    default=('grades', 'logs', 'achievements'), show_default=True,
+)
+@click.option('--group', 'groups', help='MODULE:PROJECT whose groups to export.', multiple=True)
+@click.option('--processes', help='Worker processes.', type=int, default=4, show_default=True)
+@click.option('--threads', help='Requests per process.', type=int, default=8, show_default=True)
+@click.option('--chunk-size', help='Units per file.', type=int, default=200, show_default=True)
+@click.option(
+    '--format', 'fmt', type=click.Choice(['ndjson', 'parquet']), default='ndjson', show_default=True,
+)
+def export(output, promotions, kinds, groups, processes, threads, chunk_size, fmt):
+    """Export the data of every student, resuming an interrupted export."""
+    from etnawrapper.export import ExportJob, plan
+
+    etna = get_wrapper()
+    if not promotions:
+        promotions = [promotion['id'] for promotion in etna.get_user_promotion()]
+    try:
+        # workers share the CLI token store, and log in again if needed
+        job = ExportJob(
+            output, etna.login, etna.cookies,
+            processes=processes, threads=threads, chunk_size=chunk_size, fmt=fmt,
+            password=os.environ.get('ETNA_PASS'), token_store_path=TOKEN_STORE_PATH,
+        )
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    units = plan(etna, promotions, kinds=kinds, groups=groups)
+    click.secho(f"Exporting {len(units)} units to {output}")
+    summary = job.run(units)
+    click.secho(
+        f"{summary['exported']} exported, {summary['skipped']} already done, "
+        f"{summary['failed']} failed",
+        fg='red' if summary['failed'] else 'green',
+    )
+    if summary['failed']:
+        raise SystemExit(1)
+
+
 def get_wrapper():
+    from etnawrapper.auth import AuthManager, FileTokenStore
+    from etnawrapper.endpoints import TEMPLATES
+    from etnawrapper.etna import EtnaWrapper
+
+    # called outside of a command (e.g. from a script), use the defaults
+    context = click.get_current_context(silent=True)
+    settings = (context.find_root().obj if context is not None else None) or {}
+    offline = settings.get('offline', False)
     login = os.environ.get('ETNA_USER')
     password = os.environ.get('ETNA_PASS')
-    wrapper = EtnaWrapper(login, password)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cache = _AgedCache(
+        DiskCache(RESPONSE_CACHE_PATH),
+        max_age=None if offline else settings.get('max_age', DEFAULT_MAX_AGE),
+    )
+    store = FileTokenStore(TOKEN_STORE_PATH)
+    transport = auth = None
+    if offline:
+        transport = _OfflineTransport()
+        # the stored cookies are reused whatever their age, they only
+        # identify the account in the cache keys
+        auth = AuthManager(
+            login, password, store=store, req=transport, refresh_margin=float('-inf'),
+        )
+    wrapper = EtnaWrapper(
+        login,
+        password,
+        auth=auth,
+        token_store=store,
+        transport=transport,
+        cache=cache,
+        # every endpoint is cached, freshness is decided by `--max-age`
+        cache_ttls={template: DEFAULT_MAX_AGE for template in TEMPLATES},
+    )
     return wrapper
 
 
 def main():
     cli.add_command(activities)
     cli.add_command(conversations)
+    cli.add_command(export)
     cli()
 
 
@@ -30,3 +30,37 @@ TICKET_URL = TICKET_API + "/tasks/{task_id}.json"
 TICKETS_URL = TICKET_API + "/tasks.json"
 
 ACHIEVEMENTS_URL = ACHIEVEMENTS_API + "/users/{login}/achievements"
+
+# Default time to live (in seconds) of the cached responses, per URL template.
+# Templates missing from this mapping are never cached.
+CACHE_TTLS = {
+    IDENTITY_URL: 300,
+    USER_INFO_URL: 3600,
+    PICTURE_URL: 86400,
+    USER_PROMO_URL: 3600,
+    PROMOTION_URL: 3600,
+    ACHIEVEMENTS_URL: 600,
+}
+
+# Name of each API host, used to rate limit and monitor them separately.
+API_HOSTS = {
+    "intra": INTRA_API,
+    "auth": ETNA_API,
+    "modules": MODULE_API,
+    "gsa": GSA_API,
+    "tickets": TICKET_API,
+    "achievements": ACHIEVEMENTS_API,
+}
+
+# (connect, read) timeouts in seconds, per URL template.
+DEFAULT_TIMEOUT = (5, 50)
+TIMEOUTS = {
+    AUTH_URL: (5, 15),
+    IDENTITY_URL: (5, 10),
+    USER_INFO_URL: (5, 10),
+    USER_PROMO_URL: (5, 10),
+    NOTIF_URL: (5, 15),
+    PICTURE_URL: (5, 30),
+    TICKET_URL: (5, 15),
+    DECLARATION_URL: (5, 20),
+}
@@ -0,0 +1,153 @@
+"""Bulk submission of log declarations."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+from .utils import extract_items, parse_datetime
+
+
+DECLARED = "declared"
+DUPLICATE = "duplicate"
+VALID = "valid"
+INVALID = "invalid"
+FAILED = "failed"
+
+
+class DeclarationResult(NamedTuple):
+    """Outcome of one declaration of `declare_logs`.
+
+    `status` is one of `declared`, `duplicate` (already declared, or
+    repeated in the batch), `valid` (dry run), `invalid` or `failed`.
+    """
+
+    index: int
+    module_id: Any
+    status: str
+    value: Any = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status in (DECLARED, DUPLICATE, VALID)
+
+
+def _minute(value) -> Optional[str]:
+    moment = parse_datetime(value)
+    return moment.strftime("%Y-%m-%d %H:%M") if moment is not None else None
+
+
+def validate(module_id, content: dict) -> Tuple[datetime, datetime]:
+    """Check a declaration, return its parsed start and end.
+
+    Raise `ValueError` when `content` is not a valid declaration.
+    """
+    if module_id is None:
+        raise ValueError("missing module_id")
+    declaration = content.get("declaration") if isinstance(content, dict) else None
+    if not isinstance(declaration, dict):
+        raise ValueError("missing declaration")
+    for key in ("start", "end", "content"):
+        if not declaration.get(key):
+            raise ValueError("missing declaration {}".format(key))
+    start = parse_datetime(declaration["start"])
+    end = parse_datetime(declaration["end"])
+    if end < start:
+        raise ValueError("declaration ends before it starts")
+    return start, end
+
+
+def _existing_key(item: dict) -> Optional[tuple]:
+    declaration = item.get("declaration") if isinstance(item.get("declaration"), dict) else item
+    module = item.get("module", item.get("module_id"))
+    try:
+        return str(module), _minute(declaration.get("start")), _minute(declaration.get("end"))
+    except ValueError:
+        return None
+
+
+def _validate_all(declarations: list, results: list) -> list:
+    """Validate `declarations`, return the valid ones with their bounds."""
+    pending = []
+    for index, (module_id, content) in enumerate(declarations):
+        try:
+            start, end = validate(module_id, content)
+        except (ValueError, TypeError) as error:
+            results[index] = DeclarationResult(index, module_id, INVALID, error=error)
+            continue
+        pending.append((index, module_id, content, start, end))
+    return pending
+
+
+def _declared(wrapper, pending: list) -> set:
+    """Return the keys of the declarations already made over `pending`'s range."""
+    # declarations are compared on their wall-clock time, like `_existing_key`
+    bounds = [moment.replace(tzinfo=None) for entry in pending for moment in entry[3:]]
+    existing = wrapper.get_declarations(
+        start=min(bounds).strftime("%Y-%m-%d"), end=max(bounds).strftime("%Y-%m-%d"),
+    )
+    return {_existing_key(item) for item in extract_items(existing) if isinstance(item, dict)}
+
+
+def _skip_duplicates(pending: list, seen: set, dedupe: bool, results: list) -> list:
+    """Drop the declarations in `seen` or repeated, return the others."""
+    kept = []
+    for index, module_id, content, start, end in pending:
+        key = (str(module_id), start.strftime("%Y-%m-%d %H:%M"), end.strftime("%Y-%m-%d %H:%M"))
+        if dedupe and key in seen:
+            results[index] = DeclarationResult(index, module_id, DUPLICATE)
+            continue
+        seen.add(key)
+        kept.append((index, module_id, content))
+    return kept
+
+
+def _submit(wrapper, entry) -> DeclarationResult:
+    index, module_id, content = entry
+    try:
+        value = wrapper.declare_log(module_id, content)
+    except Exception as error:
+        return DeclarationResult(index, module_id, FAILED, error=error)
+    return DeclarationResult(index, module_id, DECLARED, value=value)
+
+
+def declare_logs(
+    wrapper,
+    declarations: Iterable[Tuple[Any, dict]],
+    max_workers: int = 4,
+    dry_run: bool = False,
+    dedupe: bool = True,
+) -> List[DeclarationResult]:
+    """Validate and submit many `(module_id, content)` declarations.
+
+    Declarations already returned by `get_declarations` for the covered
+    range, or repeated within `declarations`, are skipped. Submissions run
+    concurrently on `max_workers` threads, within the caller's deadline,
+    and share a single preflight per URL. With `dry_run`, nothing is posted.
+    When the existing declarations can not be fetched, every valid
+    declaration is reported as failed with that error.
+    """
+    declarations = list(declarations)
+    results = [None] * len(declarations)  # type: List[Optional[DeclarationResult]]
+    pending = _validate_all(declarations, results)
+    seen = set()
+    if dedupe and pending:
+        try:
+            seen = _declared(wrapper, pending)
+        except Exception as error:
+            # nothing can be checked for duplicates, nothing is sent
+            for index, module_id, *_ in pending:
+                results[index] = DeclarationResult(index, module_id, FAILED, error=error)
+            return results
+    to_send = _skip_duplicates(pending, seen, dedupe, results)
+    if dry_run:
+        for index, module_id, _ in to_send:
+            results[index] = DeclarationResult(index, module_id, VALID)
+    elif to_send:
+        submit = wrapper.bind_deadline(lambda entry: _submit(wrapper, entry))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for result in executor.map(submit, to_send):
+                results[result.index] = result
+    return results
+
+
+__all__ = ("DeclarationResult", "declare_logs", "validate")
@@ -0,0 +1,120 @@
+"""In-memory directory of users, indexed by id, login and name."""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .utils import extract_items
+
+
+def _normalize(value) -> str:
+    return str(value or "").strip().casefold()
+
+
+class Directory:
+    """Resolve users from the trombis of promotions.
+
+    `load` fetches a promotion's students once and indexes them by id,
+    login and name; `resolve` looks many user ids up at once and only
+    fetches the unknown ones, each a single time, with `get_user_info`.
+
+    >>> directory = Directory(wrapper)
+    >>> directory.load(promotion_id)
+    >>> authors = directory.resolve(user_ids)
+    """
+
+    def __init__(self, wrapper, max_workers: int = 8):
+        self.wrapper = wrapper
+        self.max_workers = max_workers
+        self._by_id = {}  # type: Dict[int, dict]
+        self._by_login = {}  # type: Dict[str, dict]
+        self._names = []  # sorted (name, login) pairs
+        self._loaded = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self._by_id
+
+    def add(self, user: dict):
+        """Index `user`, replacing a previous entry with the same id."""
+        login = user.get("login")
+        with self._lock:
+            previous = self._by_id.get(user.get("id")) or self._by_login.get(login)
+            if previous is not None:
+                self._unindex(previous)
+            if user.get("id") is not None:
+                self._by_id[user["id"]] = user
+            if login is not None:
+                self._by_login[login] = user
+                for name in self._names_of(user):
+                    bisect.insort(self._names, (name, login))
+
+    def _unindex(self, user: dict):
+        self._by_id.pop(user.get("id"), None)
+        login = user.get("login")
+        if self._by_login.pop(login, None) is None:
+            return
+        for name in self._names_of(user):
+            index = bisect.bisect_left(self._names, (name, login))
+            if index < len(self._names) and self._names[index] == (name, login):
+                del self._names[index]
+
+    @staticmethod
+    def _names_of(user: dict) -> set:
+        first, last = _normalize(user.get("firstname")), _normalize(user.get("lastname"))
+        names = {_normalize(user.get("login")), first, last}
+        if first and last:
+            names.update(("{} {}".format(first, last), "{} {}".format(last, first)))
+        names.discard("")
+        return names
+
+    def load(self, promotion_id: int, force: bool = False) -> int:
+        """Index the students of `promotion_id`, return how many were added.
+
+        A promotion is only fetched once unless `force` is set.
+        """
+        if promotion_id in self._loaded and not force:
+            return 0
+        students = extract_items(self.wrapper.get_students(promotion_id))
+        for student in students:
+            self.add(student)
+        self._loaded.add(promotion_id)
+        return len(students)
+
+    def get(self, user_id: int) -> Optional[dict]:
+        return self._by_id.get(user_id)
+
+    def by_login(self, login: str) -> Optional[dict]:
+        return self._by_login.get(login)
+
+    def search(self, prefix: str, limit: int = None) -> List[dict]:
+        """Return the users whose login or name starts with `prefix`."""
+        prefix = _normalize(prefix)
+        with self._lock:
+            index = bisect.bisect_left(self._names, (prefix, ""))
+            logins = {}
+            while index < len(self._names) and self._names[index][0].startswith(prefix):
+                logins.setdefault(self._names[index][1])
+                if limit is not None and len(logins) >= limit:
+                    break
+                index += 1
+            return [self._by_login[login] for login in logins]
+
+    def resolve(self, user_ids: Iterable[int]) -> Dict[int, dict]:
+        """Return the users of `user_ids`, fetching the unknown ones.
+
+        The missing users are fetched concurrently, once per id; users
+        that cannot be fetched are left out of the result.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        missing = [user_id for user_id in user_ids if user_id not in self._by_id]
+        if missing:
+            for result in self.wrapper.batch(self.max_workers).get_user_info(missing):
+                if result.ok and result.value:
+                    self.add(result.value)
+        return {user_id: self._by_id[user_id] for user_id in user_ids if user_id in self._by_id}
+
+
+__all__ = ("Directory",)
@@ -0,0 +1,37 @@
+"""Map concrete URLs back to the URL templates of `etnawrapper.constants`."""
+import re
+from typing import Optional
+
+from . import constants
+
+
+def _compile(template: str):
+    path = template.split('?', 1)[0]
+    pattern = re.sub(r'\\{\w+\\}', '[^/?]+', re.escape(path))
+    return re.compile(pattern)
+
+
+TEMPLATES = tuple(
+    value for name, value in vars(constants).items()
+    if name.endswith('_URL') and isinstance(value, str)
+)
+_PATTERNS = tuple((_compile(template), template) for template in TEMPLATES)
+
+
+def resolve_template(url: str) -> Optional[str]:
+    """Return the URL template `url` was built from.
+
+    The query string is ignored, return None if `url` does not match
+    any known template.
+
+    >>> resolve_template("https://intra-api.etna-alternance.net/trombi/42")
+    'https://intra-api.etna-alternance.net/trombi/{promo_id}'
+    """
+    path = url.split('?', 1)[0]
+    for pattern, template in _PATTERNS:
+        if pattern.fullmatch(path):
+            return template
+    return None
+
+
+__all__ = ("TEMPLATES", "resolve_template")
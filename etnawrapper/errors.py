@@ -12,6 +12,20 @@ class MaxRetryError(Exception):
 class BadStatusException(Exception):
     """Receive unexpected reponse code."""
 
-    def __init__(self, message):
+    def __init__(self, message, status_code: int = None, response=None):
         self.message = message
+        self.status_code = status_code
+        self.response = response
         super().__init__(message)
+
+
+class DeadlineExceeded(Exception):
+    """The latency budget of an operation is spent."""
+
+    pass
+
+
+class ReplayError(Exception):
+    """No recorded response matches a replayed request."""
+
+    pass
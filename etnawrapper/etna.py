@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 """Client for ETNA's APIs"""
-# TODO: Implement a Session upon instantiation?
 # TODO: Cli ? :o
 # TODO: CLI.
-from datetime import datetime
-from typing import Union, List
-from io import BytesIO
+import functools
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from datetime import date, datetime, timedelta
+from typing import Iterator, Union, List
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .constants import (
     AUTH_URL,
@@ -31,7 +36,25 @@ from .constants import (
     TICKET_URL,
     TICKETS_URL,
     ACHIEVEMENTS_URL,
+    CACHE_TTLS,
+    DEFAULT_TIMEOUT,
+    TIMEOUTS,
 )
+from .auth import AuthManager, TokenStore
+from .batch import Batch
+from . import declarations as _declarations
+from .cache import BaseCache, MemoryCache, MISSING
+from .endpoints import resolve_template
+from .errors import BadStatusException, DeadlineExceeded
+from .jsonstream import iter_json_items
+from . import models as _models
+from .metrics import Metrics
+from .pictures import PictureService
+from .ranges import fetch_windows, window_dates
+from .singleflight import SingleFlight
+from .transport import RetryPolicy, Transport
+from .utils import extract_items, iter_pages, iter_windows
+from .watch import Watcher
 
 
 __author__ = "Theo Massard <massar_t@etna-alternance.net>"
@@ -45,19 +68,66 @@ class EtnaWrapper:
         login: str = None,
         password: str = None,
         cookies: dict = None,
-        use_session: bool = False,
+        use_session: bool = True,
         headers: dict = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 0,
+        cache: BaseCache = None,
+        cache_ttls: dict = None,
+        conditional: bool = True,
+        max_validators: int = 256,
+        max_windows: int = 1024,
+        single_flight: bool = True,
+        models: bool = False,
+        auth: AuthManager = None,
+        token_store: TokenStore = None,
+        transport: Transport = None,
+        retry: RetryPolicy = None,
+        rate_limits: dict = None,
+        timeouts: dict = None,
+        default_timeout: tuple = DEFAULT_TIMEOUT,
+        metrics: Metrics = None,
     ):
         self.login = login
-        self._cookies = cookies
-        if cookies is None:
-            self._cookies = self.get_cookies(login, password)
         # XXX: be careful about this one
         if use_session:
-            self._req = requests.Session()
+            self._req = self.create_session(pool_connections, pool_maxsize, max_retries)
         else:
             self._req = requests
+        self._transport = transport
+        if transport is None:
+            self._transport = Transport(self._req, retry=retry, rate_limits=rate_limits)
+        self._cookies = cookies
+        self._auth = auth
+        if cookies is None:
+            if auth is None:
+                self._auth = AuthManager(login, password, store=token_store, req=self._transport)
+            self._cookies = self._auth.cookies()
         self.headers = headers
+        self.cache = cache
+        self.cache_ttls = dict(CACHE_TTLS)
+        if cache_ttls is not None:
+            self.cache_ttls.update(cache_ttls)
+        self._validators = MemoryCache(max_validators) if conditional else None
+        self._windows = MemoryCache(max_windows)
+        self._in_flight = SingleFlight() if single_flight else None
+        self.models = models
+        self.default_timeout = default_timeout
+        self.timeouts = dict(TIMEOUTS)
+        if timeouts is not None:
+            self.timeouts.update(timeouts)
+        self._local = threading.local()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._hooks = {"before_request": [], "after_request": []}
+        self._preflighted = set()
+        self._preflight_locks = {}
+        self._preflight_lock = threading.Lock()
+
+    @property
+    def cookies(self) -> dict:
+        """The authentication cookies currently in use."""
+        return dict(self._cookies or {})
 
     def __repr__(self):
         return "<etnawrapper.etna.EtnaWrapper(login='{}', cookies={})>".format(
@@ -77,36 +147,365 @@ class EtnaWrapper:
         return not self == obj
 
     def _query(
-        self, url: str, method="GET", raw: bool = False, data=None, params=None,
-    ) -> Union[dict, requests.Response]:
+        self,
+        url: str,
+        method="GET",
+        raw: bool = False,
+        data=None,
+        params=None,
+        stream: bool = False,
+    ) -> Union[dict, requests.Response, Iterator]:
         """Perform a request using the `self._req` HTTP client.
 
         Upon requesting a non-standard URL (not returning JSON),
         the `raw` flag allow to return a `requests.Response` object
         instead of a dictionnary.
+
+        GET requests on the templates listed in `self.cache_ttls` are
+        served from `self.cache` when it is set.
+
+        JSON responses carrying an `ETag` or a `Last-Modified` header are
+        revalidated using conditional requests, and their decoded body is
+        reused when the server answers `304 Not Modified`.
+
+        Concurrent identical GET requests are coalesced: a single request
+        is sent and its result is shared between the callers.
+
+        With `stream`, the body is not buffered: raw queries return the
+        streamed `requests.Response`, other queries return an iterator
+        over the items of the JSON list (or `hits` list) as they are
+        received. Streamed queries bypass the caches.
+        """
+        if stream:
+            response = self._send(method, url, data, params, self.headers, stream=True)
+            if raw:
+                return response
+            return self._iter_items(response)
+        ttl = None
+        key = None
+        template = resolve_template(url)
+        if method == "GET":
+            key = self._cache_key(template, url, params, raw)
+        if self.cache is not None and key is not None:
+            ttl = self.cache_ttls.get(template)
+        if ttl:
+            cached = self.cache.get(key, MISSING)
+            self.metrics.record_cache(template, hit=cached is not MISSING)
+            if cached is not MISSING:
+                return cached
+        if key is not None and self._in_flight is not None:
+            return self._in_flight.do(
+                key,
+                lambda: self._fetch(url, method, raw, data, params, key, ttl),
+                deadline=getattr(self._local, "deadline", None),
+            )
+        return self._fetch(url, method, raw, data, params, key, ttl)
+
+    def _fetch(
+        self, url: str, method: str, raw: bool, data, params, key: str = None, ttl: float = None,
+    ) -> Union[dict, requests.Response]:
+        """Send the request built by `_query` and store its result."""
+        validator = None
+        headers = self.headers
+        if self._validators is not None and key is not None and not raw:
+            validator = self._validators.get(key)
+        if validator is not None:
+            headers = dict(self.headers or {})
+            headers.update(validator["headers"])
+        response = self._send(method, url, data, params, headers)
+        if validator is not None and response.status_code == 304:
+            result = validator["body"]
+        elif raw:
+            result = response  # type: requests.Response
+        else:
+            started = time.perf_counter()
+            result = response.json()  # type: dict
+            self.metrics.record_decode(resolve_template(url), time.perf_counter() - started)
+            if self._validators is not None and key is not None:
+                self._store_validator(key, response, result)
+        if ttl:
+            self.cache.set(key, result, ttl)
+        return result
+
+    def _send(
+        self, method: str, url: str, data, params, headers: dict, stream: bool = False,
+    ) -> requests.Response:
+        """Send a request through `self._transport`.
+
+        When the cookies are managed by `self._auth`, they are renewed
+        before expiring and the request is sent once more with new
+        cookies if it is answered with `401 Unauthorized`.
+
+        Raise `BadStatusException` when the API answers with an error and
+        `DeadlineExceeded` when the budget set by `deadline` is spent.
+
+        Every attempt, retries included, is recorded in `self.metrics` and
+        surrounded by the hooks registered with `add_hook`.
         """
-        response = self._req.request(
+        deadline = getattr(self._local, "deadline", None)
+        if self._auth is not None:
+            self._cookies = self._auth.cookies(deadline=deadline)
+        cookies = self._cookies
+        request = dict(json=data, params=params, headers=headers, stream=stream, deadline=deadline)
+        response = self._attempt(method, url, cookies, **request)
+        if response.status_code == 401 and self._auth is not None:
+            response.close()
+            self._cookies = self._auth.refresh(stale=cookies, deadline=deadline)
+            response = self._attempt(method, url, self._cookies, **request)
+        if response.status_code >= 400:
+            response.close()
+            raise BadStatusException(
+                "{} {} returned {}".format(method, url, response.status_code),
+                status_code=response.status_code,
+                response=response,
+            )
+        return response
+
+    def _attempt(
+        self, method: str, url: str, cookies: dict, stream: bool = False, **kwargs
+    ) -> requests.Response:
+        """Send a request with `cookies`, retries included, see `_send`."""
+        template = resolve_template(url)
+
+        def on_send():
+            for hook in self._hooks["before_request"]:
+                hook(method, url, template)
+
+        def on_response(outcome, elapsed: float):
+            if isinstance(outcome, Exception):
+                self.metrics.record_error(template, elapsed)
+                return
+            if stream:
+                size = int(outcome.headers.get("Content-Length") or 0)
+            else:
+                size = len(outcome.content)
+            self.metrics.record_request(template, outcome.status_code, elapsed, size)
+            for hook in self._hooks["after_request"]:
+                hook(method, url, template, outcome, elapsed)
+
+        return self._transport.request(
             method,
             url,
-            cookies=self._cookies,
-            json=data,
-            params=params,
-            headers=self.headers,
-            timeout=50,
+            cookies=cookies,
+            timeout=self._timeout(url),
+            stream=stream,
+            on_retry=lambda attempt, reason: self.metrics.record_retry(template),
+            on_send=on_send,
+            on_response=on_response,
+            **kwargs
+        )
+
+    @staticmethod
+    def _iter_items(response: requests.Response) -> Iterator:
+        """Yield the items of a streamed JSON response, then release it."""
+        try:
+            yield from iter_json_items(
+                response.iter_content(chunk_size=65536),
+                encoding=response.encoding or "utf-8",
+            )
+        finally:
+            response.close()
+
+    def _as_model(self, model: type, result):
+        """Convert `result` to `model` instances when `self.models` is set."""
+        if not self.models:
+            return result
+        if isinstance(result, Iterator):
+            return (model(item) for item in result)
+        return _models.load(model, result)
+
+    def _store_validator(self, key: str, response: requests.Response, body):
+        """Remember the validators of `response` to revalidate it later."""
+        headers = {}
+        if "ETag" in response.headers:
+            headers["If-None-Match"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            headers["If-Modified-Since"] = response.headers["Last-Modified"]
+        if headers:
+            self._validators.set(key, {"headers": headers, "body": body})
+
+    def _cache_key(self, template: str, url: str, params: dict = None, raw: bool = False) -> str:
+        """Build the cache key of a request.
+
+        Keys start with the URL template to allow invalidating a whole
+        endpoint, and embed a digest of the account (its login when the
+        cookies are renewed by `self._auth`, its cookies otherwise) so
+        that accounts never share entries.
+        """
+        query = "&".join(
+            "{}={}".format(key, value) for key, value in sorted((params or {}).items())
+        )
+        if self._auth is not None:
+            identity = self._auth.login.encode()
+        else:
+            identity = repr(sorted((self._cookies or {}).items())).encode()
+        digest = hashlib.sha1(identity).hexdigest()
+        return "{} {}?{} {} {}".format(template, url, query, int(raw), digest)
+
+    def invalidate(self, *templates: str):
+        """Drop the cached responses of every URL template in `templates`."""
+        for template in templates:
+            self._windows.invalidate(template + " ")
+            if self.cache is not None:
+                self.cache.invalidate(template + " ")
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict = None,
+        data=None,
+        params=None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """Send a request to `url`, bypassing the cache, and return the response.
+
+        `headers` are sent along with `self.headers`, e.g. to make a
+        conditional request: a `304 Not Modified` is returned like any
+        other status below 400. With `stream`, the body is not read and
+        the response must be closed by the caller.
+        """
+        merged = dict(self.headers or {})
+        merged.update(headers or {})
+        return self._send(method, url, data, params, merged, stream=stream)
+
+    def _preflight(self, url: str):
+        """Send the `OPTIONS` preflight of `url`, once per URL.
+
+        Each URL has its own lock, the preflight of a module does not
+        hold back the declarations of the others. Like browsers, the
+        status of the preflight is ignored, the request itself tells.
+        """
+        if url in self._preflighted:
+            return
+        with self._preflight_lock:
+            lock = self._preflight_locks.setdefault(url, threading.Lock())
+        with lock:
+            if url not in self._preflighted:
+                try:
+                    self._query(url, method='OPTIONS', raw=True)
+                except BadStatusException:
+                    pass
+                self._preflighted.add(url)
+
+    def add_hook(self, event: str, func):
+        """Call `func` around every request sent on the wire, retries included.
+
+        `before_request` hooks receive `(method, url, template)` and
+        `after_request` hooks `(method, url, template, response, elapsed)`.
+        """
+        if event not in self._hooks:
+            raise ValueError("unknown hook {!r}, expected one of {}".format(event, list(self._hooks)))
+        self._hooks[event].append(func)
+
+    def stats(self) -> dict:
+        """Return the per-endpoint metrics collected so far."""
+        return self.metrics.snapshot()
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """Bound the time spent by the requests sent within the block.
+
+        Timeouts of the requests are shortened to the remaining budget,
+        and `DeadlineExceeded` is raised once it is spent. Deadlines are
+        per thread, nested deadlines can only shorten the budget.
+
+        >>> with wrapper.deadline(2.5):
+        ...     wrapper.declare_log(module_id, content)
+        """
+        previous = getattr(self._local, "deadline", None)
+        deadline = time.monotonic() + seconds
+        if previous is not None:
+            deadline = min(deadline, previous)
+        self._local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def bind_deadline(self, func):
+        """Return `func` running within the deadline of the calling thread.
+
+        Deadlines are per thread: callables handed to a thread pool must
+        be bound to keep the budget of the thread submitting them.
+        """
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is None:
+            return func
+
+        @functools.wraps(func)
+        def bound(*args, **kwargs):
+            previous = getattr(self._local, "deadline", None)
+            self._local.deadline = deadline if previous is None else min(deadline, previous)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.deadline = previous
+
+        return bound
+
+    def _timeout(self, url: str) -> tuple:
+        """Return the (connect, read) timeout of a request to `url`."""
+        connect, read = self.timeouts.get(resolve_template(url), self.default_timeout)
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is None:
+            return connect, read
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("deadline exceeded before requesting {}".format(url))
+        return min(connect, remaining), min(read, remaining)
+
+    def batch(self, max_workers: int = 8) -> Batch:
+        """Return a `Batch` running this wrapper's calls concurrently."""
+        return Batch(self, max_workers=max_workers)
+
+    def pictures(self, path: str, max_age: float = 86400, max_workers: int = 8) -> PictureService:
+        """Return a `PictureService` storing pictures under `path`."""
+        return PictureService(self, path, max_age=max_age, max_workers=max_workers)
+
+    def watcher(self, min_interval: float = 5, max_interval: float = 300, **kwargs) -> Watcher:
+        """Return a `Watcher` polling this wrapper's endpoints."""
+        return Watcher(self, min_interval=min_interval, max_interval=max_interval, **kwargs)
+
+    @staticmethod
+    def create_session(
+        pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0,
+    ) -> requests.Session:
+        """Create a keep-alive `requests.Session` backed by a connection pool.
+
+        `pool_connections` is the number of per-host pools to keep,
+        `pool_maxsize` the number of connections kept alive per host and
+        `max_retries` is forwarded to `requests.adapters.HTTPAdapter`.
+        """
+        session = requests.Session()
+        # cookies are sent explicitly by `_query`, the session must not
+        # remember the ones set by the responses
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
         )
-        if raw:
-            return response  # type: requests.Response
-        return response.json()  # type: dict
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
     @staticmethod
-    def get_cookies(login: str = None, password: str = None) -> str:
-        """Fetch a Cookie."""
+    def get_cookies(login: str = None, password: str = None, req=None) -> dict:
+        """Fetch a Cookie.
+
+        `req` is the HTTP client used to authenticate, it defaults to
+        the `requests` module but can be a `requests.Session` to reuse
+        its connection pool.
+        """
         if login is None:
             raise ValueError("missing login, can not authenticate")
         if password is None:
             raise ValueError("missing password, can not authenticate")
+        if req is None:
+            req = requests
         data = {"login": login, "password": password}
-        resp = requests.post(AUTH_URL, data=data)
+        resp = req.post(AUTH_URL, data=data)
         return resp.cookies.get_dict()
 
     def get_user_info(self, user_id: int = None) -> dict:
@@ -116,7 +515,7 @@ class EtnaWrapper:
         if user_id is not None:
             url = USER_INFO_URL.format(user_id=user_id)
         result = self._query(url)
-        return result
+        return self._as_model(_models.User, result)
 
     def get_promotion(self, promotion_id: int = None) -> dict:
         """Return a user's informations. Defaults to self.login."""
@@ -126,7 +525,7 @@ class EtnaWrapper:
         if promotion_id is not None:
             url = PROMOTION_URL.format(promo_id=promotion_id)
         result = self._query(url)
-        return result
+        return self._as_model(_models.Promotion, result)
 
     def get_user_promotion(self, login: str = None) -> dict:
         """Return user's promotions."""
@@ -135,7 +534,7 @@ class EtnaWrapper:
             url = USER_PROMO_URL + "?login=" + login
 
         result = self._query(url)
-        return result
+        return self._as_model(_models.Promotion, result)
 
     def get_current_activities(self, login: str = None) -> dict:
         """Return a user's current activities.
@@ -145,6 +544,8 @@ class EtnaWrapper:
         """
         url = ACTIVITY_URL.format(login=login or self.login)
         result = self._query(url)
+        if self.models:
+            return _models.load_current_activities(result)
         return result
 
     def get_notifications(self, login: str = None) -> dict:
@@ -156,13 +557,17 @@ class EtnaWrapper:
         result = self._query(url)
         return result
 
-    def get_grades(self, promotion_id: int, login: str = None) -> dict:
+    def get_grades(self, promotion_id: int, login: str = None, stream: bool = False) -> dict:
         """Fetch a student's grades, based on the promotion."""
         url = GRADES_URL.format(login=login or self.login, promo_id=promotion_id)
-        result = self._query(url)
-        return result
+        result = self._query(url, stream=stream)
+        return self._as_model(_models.Grade, result)
+
+    def get_picture(self, login: str = None) -> bytes:
+        """Fetch a user's picture, defaults to self.login.
 
-    def get_picture(self, login: str = None) -> BytesIO:
+        See `pictures` to keep pictures on disk.
+        """
         url = PICTURE_URL.format(login=login or self.login)
         result = self._query(url, raw=True)
         return result.content
@@ -189,26 +594,33 @@ class EtnaWrapper:
         result = self._query(url)
         return result
 
-    def get_students(self, promotion_id: int) -> dict:
-        """Fetch every student bsaed on `promotion_id`."""
+    def get_students(self, promotion_id: int, stream: bool = False) -> dict:
+        """Fetch every student bsaed on `promotion_id`.
+
+        Set `stream` to iterate over the students as they are received.
+        """
         url = PROMOTION_URL.format(promo_id=promotion_id)
-        result = self._query(url)
-        return result
+        result = self._query(url, stream=stream)
+        return self._as_model(_models.User, result)
 
-    def get_log_events(self, login: str = None) -> dict:
+    def get_log_events(self, login: str = None, stream: bool = False) -> dict:
         """Get a user's log event, defaults to self.login."""
         url = GSA_EVENTS_URL.format(login=login or self.login)
-        result = self._query(url)
-        return result
+        result = self._query(url, stream=stream)
+        return self._as_model(_models.LogEvent, result)
 
-    def get_logs(self, login: str = None) -> dict:
+    def get_logs(self, login: str = None, stream: bool = False) -> dict:
         """Fetch a user's logs, defaults to self.login."""
         url = GSA_LOGS_URL.format(login=login or self.login)
-        result = self._query(url)
-        return result
+        result = self._query(url, stream=stream)
+        return self._as_model(_models.LogEvent, result)
 
     def get_events(
-        self, start_date: datetime, end_date: datetime, login: str = None
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        login: str = None,
+        stream: bool = False,
     ) -> dict:
         """Fetch a user's events, defaults to self.login."""
         url = EVENTS_URL.format(
@@ -216,10 +628,39 @@ class EtnaWrapper:
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat(),
         )
-        result = self._query(url)
+        result = self._query(url, stream=stream)
         return result
 
-    def get_conversations(self, user_id: int, start: int = None, size: int = None) -> dict:
+    def get_events_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        login: str = None,
+        chunk: str = "week",
+        max_workers: int = 4,
+    ) -> List[dict]:
+        """Fetch a user's events between `start_date` and `end_date`.
+
+        The range is split in `chunk`s (`day`, `week` or `month`) fetched
+        concurrently; windows in the past are kept without expiry, only
+        the current one is fetched again on later calls.
+        """
+        login = login or self.login
+        return fetch_windows(
+            self.bind_deadline(
+                lambda window_start, window_end: self.get_events(window_start, window_end, login=login)
+            ),
+            start_date,
+            end_date,
+            chunk=chunk,
+            max_workers=max_workers,
+            cache=self._windows,
+            key="{} window {}".format(EVENTS_URL, login),
+        )
+
+    def get_conversations(
+        self, user_id: int, start: int = None, size: int = None, stream: bool = False,
+    ) -> dict:
         """Return the list of conversations for a user.
 
         Requires read permission for this user_id.
@@ -232,10 +673,26 @@ class EtnaWrapper:
             params['from'] = start
         if size is not None:
             params['size'] = size
-        result = self._query(url, params=params)
-        return result
+        result = self._query(url, params=params, stream=stream)
+        return self._as_model(_models.Conversation, result)
+
+    def iter_conversations(
+        self, user_id: int, page_size: int = 50, prefetch: bool = False,
+    ) -> Iterator[dict]:
+        """Lazily iterate over every conversation of a user.
+
+        Conversations are fetched `page_size` at a time, set `prefetch`
+        to fetch the next page in the background.
+        """
+        def fetch_page(number: int) -> list:
+            result = self.get_conversations(user_id, start=number * page_size, size=page_size)
+            return extract_items(result)
+
+        return iter_pages(fetch_page, page_size=page_size, prefetch=prefetch)
 
-    def get_declarations(self, start: str = None, end: str = None) -> dict:
+    def get_declarations(
+        self, start: str = None, end: str = None, stream: bool = False,
+    ) -> dict:
         """Return the list of declarations for a user.
 
         Requires read permission for this login.
@@ -246,12 +703,62 @@ class EtnaWrapper:
             params['start'] = start
         if end is not None:
             params['end'] = end
-        result = self._query(url, params=params)
+        result = self._query(url, params=params, stream=stream)
         return result
 
+    def iter_declarations(
+        self,
+        start: date,
+        end: date,
+        window: timedelta = timedelta(days=7),
+        prefetch: bool = False,
+    ) -> Iterator[dict]:
+        """Lazily iterate over the declarations between `start` and `end`.
+
+        The range is fetched one `window` at a time, set `prefetch`
+        to fetch the next window in the background.
+        """
+        windows = list(iter_windows(start, end, window))
+
+        def fetch_page(number: int) -> list:
+            window_start, window_end = windows[number]
+            result = self.get_declarations(
+                start=window_start.strftime('%Y-%m-%d'),
+                end=window_end.strftime('%Y-%m-%d'),
+            )
+            return extract_items(result)
+
+        return iter_pages(fetch_page, page_count=len(windows), prefetch=prefetch)
+
+    def get_declarations_range(
+        self, start: date, end: date, chunk: str = "week", max_workers: int = 4,
+    ) -> List[dict]:
+        """Return the declarations between `start` and `end` (inclusive).
+
+        Same as `get_events_range`, declared logs drop the cached windows.
+        """
+        def fetch(window_start: datetime, window_end: datetime) -> dict:
+            first, last = window_dates(window_start, window_end)
+            return self.get_declarations(
+                start=first.strftime('%Y-%m-%d'), end=last.strftime('%Y-%m-%d'),
+            )
+
+        return fetch_windows(
+            self.bind_deadline(fetch),
+            start,
+            end + timedelta(days=1),
+            chunk=chunk,
+            max_workers=max_workers,
+            cache=self._windows,
+            key="{} window {}".format(DECLARATIONS_URL, self.login),
+        )
+
     def declare_log(self, module_id: int, content: dict):
         """Send a log declaration for module_id with `content`.
 
+        The first declaration of a module costs two requests (preflight
+        and declaration), use `deadline` to bound their total duration.
+
         Content should be of the following form:
 
         >>> content = {
@@ -269,10 +776,25 @@ class EtnaWrapper:
             login=self.login,
             module_id=module_id,
         )
-        result = self._query(url, method='OPTIONS', raw=True)
+        self._preflight(url)
         result = self._query(url, method='POST', data=content)
+        self.invalidate(DECLARATIONS_URL, GSA_LOGS_URL, GSA_EVENTS_URL)
         return result
 
+    def declare_logs(
+        self, declarations: list, max_workers: int = 4, dry_run: bool = False,
+    ) -> list:
+        """Send many `(module_id, content)` log declarations.
+
+        Declarations are validated, those already declared are skipped and
+        the others are submitted concurrently. With `dry_run`, nothing is
+        posted. Return a `DeclarationResult` per declaration, see
+        `etnawrapper.declarations.declare_logs`.
+        """
+        return _declarations.declare_logs(
+            self, declarations, max_workers=max_workers, dry_run=dry_run,
+        )
+
     def open_ticket(self, title: str, message: str, tags: List[str] = None, users: List[str] = None):
         """Open a ticket."""
         content = {}
@@ -282,8 +804,9 @@ class EtnaWrapper:
         content['users'] = users
 
         url = TICKETS_URL
-        result = self._query(url, method='OPTIONS', raw=True)
+        self._preflight(url)
         result = self._query(url, method='POST', data=content)
+        self.invalidate(TICKETS_URL)
 
         return result
 
@@ -291,24 +814,33 @@ class EtnaWrapper:
         """Close a ticket."""
         url = TICKET_URL.format(task_id=ticket_id)
         result = self._query(url, method='DELETE')
+        self.invalidate(TICKETS_URL, TICKET_URL)
         return result
 
-    def get_tickets(self):
+    def get_tickets(self, stream: bool = False):
         """Fetch the list of tickets."""
         url = TICKETS_URL
-        result = self._query(url)
-        return result
+        result = self._query(url, stream=stream)
+        return self._as_model(_models.Ticket, result)
+
+    def iter_tickets(self) -> Iterator[dict]:
+        """Iterate over the tickets.
+
+        The tickets API does not paginate, the list is streamed and
+        decoded incrementally instead.
+        """
+        yield from self.get_tickets(stream=True)
 
     def get_ticket(self, ticket_id: int):
         """Fetch the ticket matching `ticket_id`."""
         url = TICKET_URL.format(task_id=ticket_id)
         result = self._query(url)
-        return result
+        return self._as_model(_models.Ticket, result)
 
-    def get_achievements(self, login: str = None) -> list:
+    def get_achievements(self, login: str = None, stream: bool = False) -> list:
         """Fetch the list of achievements."""
         url = ACHIEVEMENTS_URL.format(login=login or self.login)
-        result = self._query(url)
+        result = self._query(url, stream=stream)
         return result
 
 
@@ -0,0 +1,256 @@
+"""Export students' data to compressed files, resumably.
+
+The work is split in units (the grades, logs or achievements of a
+student, the groups of an activity) dealt in chunks to a pool of
+processes. Each process runs its chunk's requests concurrently on a
+pooled wrapper, writes the results as one gzipped NDJSON (or Parquet)
+file, atomically, then checkpoints the units of the chunk. An interrupted
+export started again with the same output directory skips the
+checkpointed units; a chunk interrupted between its file and its
+checkpoint is exported twice.
+"""
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Set
+
+from .utils import extract_items
+
+
+GRADES = "grades"
+LOGS = "logs"
+ACHIEVEMENTS = "achievements"
+GROUPS = "groups"
+KINDS = (GRADES, LOGS, ACHIEVEMENTS)
+FORMATS = ("ndjson", "parquet")
+
+
+class Unit(NamedTuple):
+    """A single export request.
+
+    `key` is a login, or `<module>:<project>` for groups.
+    """
+
+    kind: str
+    promotion: int
+    key: str
+
+    @property
+    def id(self) -> str:
+        return "{}/{}/{}".format(self.kind, self.promotion, self.key)
+
+
+def plan(
+    wrapper,
+    promotion_ids: Iterable[int],
+    kinds: Iterable[str] = KINDS,
+    groups: Iterable[str] = (),
+) -> List[Unit]:
+    """List the units exporting `kinds` for every student of the promotions.
+
+    `groups` are `<module>:<project>` activities whose groups are exported
+    once per promotion.
+    """
+    units = []
+    kinds = [kind for kind in kinds if kind != GROUPS]
+    for promotion_id in promotion_ids:
+        for student in extract_items(wrapper.get_students(promotion_id)):
+            units.extend(Unit(kind, promotion_id, student["login"]) for kind in kinds)
+        units.extend(Unit(GROUPS, promotion_id, activity) for activity in groups)
+    return units
+
+
+def fetch_unit(wrapper, unit: Unit):
+    """Return the data of `unit`."""
+    if unit.kind == GRADES:
+        return wrapper.get_grades(unit.promotion, login=unit.key)
+    if unit.kind == LOGS:
+        return wrapper.get_logs(login=unit.key)
+    if unit.kind == ACHIEVEMENTS:
+        return wrapper.get_achievements(login=unit.key)
+    if unit.kind == GROUPS:
+        module, project = unit.key.split(":", 1)
+        return wrapper.get_group_for_activity(module, project)
+    raise ValueError("unknown export kind: {}".format(unit.kind))
+
+
+def _write_ndjson(path: str, records: List[dict]):
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        for record in records:
+            stream.write(json.dumps(record, separators=(",", ":")))
+            stream.write("\n")
+
+
+def _write_parquet(path: str, records: List[dict]):
+    import pyarrow
+    import pyarrow.parquet
+
+    columns = {name: [record[name] for record in records] for name in ("kind", "promotion", "key")}
+    columns["data"] = [json.dumps(record["data"]) for record in records]
+    pyarrow.parquet.write_table(pyarrow.table(columns), path, compression="zstd")
+
+
+class ExportJob:
+    """Export units to `output`, `processes` chunks at a time.
+
+    Every process sends `threads` concurrent requests through a pooled
+    wrapper; set `processes` to 0 to run in the current process.
+
+    Given a `password`, workers authenticate on their own and log in
+    again when their cookies expire, sharing them through the
+    `FileTokenStore` at `token_store_path` when set. Otherwise they use
+    `cookies` as they are, which only lasts as long as these cookies.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        login: str,
+        cookies: dict = None,
+        processes: int = 4,
+        threads: int = 8,
+        chunk_size: int = 200,
+        fmt: str = "ndjson",
+        password: str = None,
+        token_store_path: str = None,
+    ):
+        if cookies is None and password is None and token_store_path is None:
+            raise ValueError("missing cookies, password or token store, can not authenticate")
+        if fmt not in FORMATS:
+            raise ValueError("format must be one of {}".format(", ".join(FORMATS)))
+        if fmt == "parquet":
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                raise RuntimeError("the parquet format requires pyarrow") from None
+        self.output = output
+        self.login = login
+        self.cookies = cookies
+        self.password = password
+        self.token_store_path = token_store_path
+        self.processes = processes
+        self.threads = threads
+        self.chunk_size = chunk_size
+        self.fmt = fmt
+        self._checkpoints = os.path.join(output, "checkpoints")
+        os.makedirs(self._checkpoints, exist_ok=True)
+
+    def done(self) -> Set[str]:
+        """Return the ids of the checkpointed units."""
+        done = set()
+        for name in os.listdir(self._checkpoints):
+            with open(os.path.join(self._checkpoints, name)) as stream:
+                done.update(line.strip() for line in stream if line.endswith("\n"))
+        return done
+
+    def run(self, units: Iterable[Unit]) -> dict:
+        """Export the units not checkpointed yet, return a summary."""
+        done = self.done()
+        units = list(dict.fromkeys(units))
+        pending = [unit for unit in units if unit.id not in done]
+        chunks = [
+            pending[index:index + self.chunk_size]
+            for index in range(0, len(pending), self.chunk_size)
+        ]
+        summary = {"skipped": len(units) - len(pending), "exported": 0, "failed": 0, "files": 0}
+        credentials = (self.login, self.cookies, self.password, self.token_store_path)
+        settings = (credentials, self.threads, self.output, self.fmt)
+        if self.processes:
+            with ProcessPoolExecutor(
+                max_workers=self.processes, initializer=_init_worker, initargs=settings,
+            ) as executor:
+                outcomes = list(executor.map(_export_chunk, chunks))
+        else:
+            _init_worker(*settings)
+            outcomes = [_export_chunk(chunk) for chunk in chunks]
+        for exported, failed in outcomes:
+            summary["exported"] += exported
+            summary["failed"] += failed
+            summary["files"] += bool(exported)
+        return summary
+
+
+_worker = {}
+
+
+def _worker_wrapper(login: str, cookies: dict, password: str, token_store_path: str, threads: int):
+    from .auth import FileTokenStore
+    from .etna import EtnaWrapper
+
+    if password is None and token_store_path is None:
+        return EtnaWrapper(login, cookies=cookies, pool_maxsize=threads)
+    store = FileTokenStore(token_store_path) if token_store_path is not None else None
+    return EtnaWrapper(login, password, token_store=store, pool_maxsize=threads)
+
+
+def _init_worker(credentials: tuple, threads: int, output: str, fmt: str):
+    _worker.update(
+        wrapper=_worker_wrapper(*credentials, threads=threads),
+        threads=threads,
+        output=output,
+        fmt=fmt,
+        checkpoint=os.path.join(output, "checkpoints", "{}.txt".format(uuid.uuid4().hex)),
+    )
+
+
+def _export_chunk(units: List[Unit]) -> tuple:
+    """Export `units` to a new file, checkpoint them, return the counts."""
+    wrapper = _worker["wrapper"]
+    results = wrapper.batch(_worker["threads"]).map(lambda unit: fetch_unit(wrapper, unit), units)
+    exported = [result for result in results if result.ok]
+    if not exported:
+        return 0, len(results)
+    records = [
+        {
+            "kind": result.key.kind,
+            "promotion": result.key.promotion,
+            "key": result.key.key,
+            "data": result.value,
+        }
+        for result in exported
+    ]
+    extension = "ndjson.gz" if _worker["fmt"] == "ndjson" else "parquet"
+    path = os.path.join(_worker["output"], "part-{}.{}".format(uuid.uuid4().hex, extension))
+    descriptor, temporary = tempfile.mkstemp(dir=_worker["output"], suffix=".tmp")
+    os.close(descriptor)
+    try:
+        if _worker["fmt"] == "ndjson":
+            _write_ndjson(temporary, records)
+        else:
+            _write_parquet(temporary, records)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    with open(_worker["checkpoint"], "a") as stream:
+        stream.writelines(result.key.id + "\n" for result in exported)
+        stream.flush()
+        os.fsync(stream.fileno())
+    return len(exported), len(results) - len(exported)
+
+
+def read_export(output: str) -> Iterable[dict]:
+    """Iterate over the records of the NDJSON files of an export."""
+    for name in sorted(os.listdir(output)):
+        if name.startswith("part-") and name.endswith(".ndjson.gz"):
+            with gzip.open(os.path.join(output, name), "rt", encoding="utf-8") as stream:
+                for line in stream:
+                    yield json.loads(line)
+
+
+__all__ = (
+    "GRADES",
+    "LOGS",
+    "ACHIEVEMENTS",
+    "GROUPS",
+    "KINDS",
+    "FORMATS",
+    "Unit",
+    "plan",
+    "fetch_unit",
+    "ExportJob",
+    "read_export",
+)
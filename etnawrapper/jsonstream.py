@@ -0,0 +1,245 @@
+"""Incremental decoding of JSON list responses.
+
+`iter_json_items` yields the elements of a top-level array, or of the
+`hits`/`data` array of a top-level object, as soon as they are fully
+received instead of waiting for the whole document.
+"""
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+_START, _ARRAY, _OBJECT, _COLON, _VALUE, _DONE, _WHOLE = range(7)
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+_NOTHING = object()
+_SPECIAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[ \t\n\r,:\]}]')
+
+
+class _ValueScanner:
+    """Find where a JSON value ends, chunk after chunk.
+
+    The scanner keeps its nesting and string state between calls, so that
+    every character of a value is scanned once however many chunks it is
+    split in, and the value is decoded once it is complete.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = False
+        self.scalar = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def advance(self, text: str, pos: int) -> Optional[int]:
+        """Scan `text` from `pos`, return where the value ends or None."""
+        if not self.started:
+            self.started = True
+            char = text[pos]
+            if char in '[{"':
+                self.in_string = char == '"'
+                self.depth = 0 if self.in_string else 1
+                pos += 1
+            else:
+                self.scalar = True
+        if self.scalar:
+            # a number could be cut in the middle ("12" of "12.5"),
+            # it is complete once its delimiter is received
+            match = _SCALAR_END.search(text, pos)
+            return match.start() if match is not None else None
+        return self._advance_nested(text, pos)
+
+    def _advance_nested(self, text: str, pos: int) -> Optional[int]:
+        if self.escaped:
+            if pos >= len(text):
+                return None
+            self.escaped = False
+            pos += 1
+        while True:
+            match = (_STRING_SPECIAL if self.in_string else _SPECIAL).search(text, pos)
+            if match is None:
+                return None
+            char, pos = match.group(), match.end()
+            if char == "\\":
+                if pos >= len(text):
+                    self.escaped = True
+                    return None
+                pos += 1
+                continue
+            if char == '"':
+                self.in_string = not self.in_string
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+            if not self.in_string and self.depth == 0:
+                return pos
+
+
+class ItemsParser:
+    """Push parser extracting the items of a JSON list document.
+
+    Feed it text with `feed`, which returns the items completed so far,
+    and call `close` once the document is complete. Documents that do not
+    hold a list (objects without one of `keys`, scalars) are decoded at
+    once by `close` and returned as a single item.
+    """
+
+    def __init__(self, keys=("hits", "data")):
+        self.keys = keys
+        self._buffer = ""
+        self._pos = 0
+        self._start = 0
+        self._key = None
+        self._state = _START
+        self._scanner = _ValueScanner()
+        # while a value is incomplete, the new text is kept aside and
+        # only scanned, instead of being appended to the buffer
+        self._scanning = False
+        self._chunks = []
+        self._complete = False
+        self._handlers = {
+            _START: self._on_start,
+            _ARRAY: self._on_array,
+            _OBJECT: self._on_object,
+            _COLON: self._on_colon,
+            _VALUE: self._on_value,
+        }
+
+    def feed(self, text: str) -> List[Any]:
+        """Add `text` to the document and return the completed items."""
+        if self._scanning:
+            self._chunks.append(text)
+            if self._scanner.advance(text, 0) is None:
+                return []
+            self._complete = True
+            text = self._flush()
+        self._buffer += text
+        return self._parse(final=False)
+
+    def _flush(self) -> str:
+        text = "".join(self._chunks)
+        self._chunks = []
+        self._scanning = False
+        return text
+
+    def close(self) -> List[Any]:
+        """Return the remaining items, the document must be complete."""
+        self._buffer += self._flush()
+        items = self._parse(final=True)
+        if self._state in (_OBJECT, _COLON, _VALUE, _WHOLE):
+            return items + [json.loads(self._buffer[self._start:])]
+        if self._state != _DONE:
+            raise ValueError("unterminated JSON array")
+        return items
+
+    def _skip(self, pos: int) -> int:
+        buffer = self._buffer
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _decode(self, pos: int, final: bool):
+        """Decode the value at `pos`, return None if it is incomplete."""
+        complete, self._complete = self._complete or final, False
+        if not complete and self._scanner.advance(self._buffer, pos) is None:
+            self._scanning = True
+            return None
+        self._scanner.reset()
+        return _DECODER.raw_decode(self._buffer, pos)
+
+    def _parse(self, final: bool) -> List[Any]:
+        items = []
+        pos = self._pos
+        while self._state not in (_DONE, _WHOLE):
+            pos = self._skip(pos)
+            if pos == len(self._buffer):
+                break
+            step = self._handlers[self._state](pos, final)
+            if step is None:
+                break
+            pos, item = step
+            if item is not _NOTHING:
+                items.append(item)
+        if self._state == _ARRAY:
+            # consumed items are not needed anymore
+            self._buffer = self._buffer[pos:]
+            pos = 0
+        self._pos = pos
+        return items
+
+    def _on_start(self, pos: int, final: bool):
+        self._start = pos
+        char = self._buffer[pos]
+        if char == "[":
+            self._state = _ARRAY
+        elif char == "{":
+            self._state = _OBJECT
+        else:
+            self._state = _WHOLE
+            return pos, _NOTHING
+        return pos + 1, _NOTHING
+
+    def _on_array(self, pos: int, final: bool):
+        char = self._buffer[pos]
+        if char == "]":
+            self._state = _DONE
+            return pos + 1, _NOTHING
+        if char == ",":
+            return pos + 1, _NOTHING
+        decoded = self._decode(pos, final)
+        if decoded is None:
+            return None
+        item, end = decoded
+        return end, item
+
+    def _on_object(self, pos: int, final: bool):
+        char = self._buffer[pos]
+        if char == ",":
+            return pos + 1, _NOTHING
+        if char == "}":
+            self._state = _WHOLE
+            return pos + 1, _NOTHING
+        decoded = self._decode(pos, final)
+        if decoded is None:
+            return None
+        self._key, end = decoded
+        self._state = _COLON
+        return end, _NOTHING
+
+    def _on_colon(self, pos: int, final: bool):
+        if self._buffer[pos] != ":":
+            raise ValueError("expected ':' at position {}".format(pos))
+        self._state = _VALUE
+        return pos + 1, _NOTHING
+
+    def _on_value(self, pos: int, final: bool):
+        if self._key in self.keys and self._buffer[pos] == "[":
+            self._state = _ARRAY
+            return pos + 1, _NOTHING
+        decoded = self._decode(pos, final)
+        if decoded is None:
+            return None
+        self._state = _OBJECT
+        return decoded[1], _NOTHING
+
+
+def iter_json_items(
+    chunks: Iterable[bytes], keys=("hits", "data"), encoding: str = "utf-8",
+) -> Iterator[Any]:
+    """Yield the items of the JSON list document split in `chunks`."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parser = ItemsParser(keys)
+    for chunk in chunks:
+        yield from parser.feed(decoder.decode(chunk))
+    yield from parser.feed(decoder.decode(b"", final=True))
+    yield from parser.close()
+
+
+__all__ = ("ItemsParser", "iter_json_items")
@@ -0,0 +1,196 @@
+"""Per-endpoint request metrics collected by `EtnaWrapper`.
+
+Metrics are grouped by URL template (see `etnawrapper.endpoints`) rather
+than by raw URL, and can be read with `Metrics.snapshot` or handed to an
+`Exporter`.
+"""
+import threading
+from collections import Counter
+from typing import Dict, IO, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+UNKNOWN_ENDPOINT = "unknown"
+
+
+class Histogram:
+    """Cumulative histogram over fixed `buckets` upper bounds."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(zip(self.buckets, self.counts)),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class EndpointStats:
+    """Counters of a single URL template."""
+
+    __slots__ = (
+        "requests", "errors", "statuses", "latency", "bytes_received",
+        "retries", "cache_hits", "cache_misses", "decode_time",
+    )
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = Counter()
+        self.latency = Histogram(buckets)
+        self.bytes_received = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.decode_time = Histogram(buckets)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "latency": self.latency.snapshot(),
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "decode_time": self.decode_time.snapshot(),
+        }
+
+
+class Metrics:
+    """Thread-safe registry of `EndpointStats`, keyed by URL template."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._endpoints = {}  # type: Dict[str, EndpointStats]
+        self._lock = threading.Lock()
+
+    def _stats(self, template: str) -> EndpointStats:
+        template = template or UNKNOWN_ENDPOINT
+        stats = self._endpoints.get(template)
+        if stats is None:
+            stats = self._endpoints[template] = EndpointStats(self.buckets)
+        return stats
+
+    def record_request(self, template: str, status: int, latency: float, size: int = 0):
+        """Record a request answered with `status` after `latency` seconds."""
+        with self._lock:
+            stats = self._stats(template)
+            stats.requests += 1
+            stats.statuses[status] += 1
+            stats.latency.observe(latency)
+            stats.bytes_received += size
+
+    def record_error(self, template: str, latency: float):
+        """Record a request which did not get any answer."""
+        with self._lock:
+            stats = self._stats(template)
+            stats.requests += 1
+            stats.errors += 1
+            stats.latency.observe(latency)
+
+    def record_retry(self, template: str):
+        with self._lock:
+            self._stats(template).retries += 1
+
+    def record_cache(self, template: str, hit: bool):
+        with self._lock:
+            stats = self._stats(template)
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def record_decode(self, template: str, duration: float):
+        with self._lock:
+            self._stats(template).decode_time.observe(duration)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return the metrics of every endpoint as plain dicts."""
+        with self._lock:
+            return {template: stats.snapshot() for template, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def export(self, exporter: "Exporter"):
+        """Hand the current snapshot to `exporter`."""
+        exporter.export(self.snapshot())
+
+
+class Exporter:
+    """Interface of the metrics exporters.
+
+    Implement `export` to forward snapshots to any monitoring system,
+    such as an OpenTelemetry meter.
+    """
+
+    def export(self, snapshot: Dict[str, dict]):
+        raise NotImplementedError
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class PrometheusExporter(Exporter):
+    """Write snapshots in the Prometheus text exposition format.
+
+    The text is written to `stream` when given, for instance a file read
+    by node_exporter's textfile collector, and kept in `self.last`.
+    """
+
+    def __init__(self, stream: IO[str] = None, prefix: str = "etnawrapper"):
+        self.stream = stream
+        self.prefix = prefix
+        self.last = ""
+
+    def render(self, snapshot: Dict[str, dict]) -> str:
+        prefix = self.prefix
+        lines = []
+        for template, stats in sorted(snapshot.items()):
+            label = 'endpoint="{}"'.format(_escape(template))
+            for name in ("requests", "errors", "bytes_received", "retries", "cache_hits", "cache_misses"):
+                lines.append("{}_{}_total{{{}}} {}".format(prefix, name, label, stats[name]))
+            for status, count in sorted(stats["statuses"].items()):
+                lines.append('{}_responses_total{{{},status="{}"}} {}'.format(prefix, label, status, count))
+            for name in ("latency", "decode_time"):
+                histogram = stats[name]
+                metric = "{}_{}_seconds".format(prefix, name)
+                for bound, count in histogram["buckets"].items():
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, label, bound, count))
+                lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(metric, label, histogram["count"]))
+                lines.append("{}_sum{{{}}} {}".format(metric, label, histogram["sum"]))
+                lines.append("{}_count{{{}}} {}".format(metric, label, histogram["count"]))
+        return "\n".join(lines) + "\n"
+
+    def export(self, snapshot: Dict[str, dict]):
+        self.last = self.render(snapshot)
+        if self.stream is not None:
+            self.stream.write(self.last)
+            self.stream.flush()
+
+
+__all__ = (
+    "Histogram",
+    "EndpointStats",
+    "Metrics",
+    "Exporter",
+    "PrometheusExporter",
+)
@@ -0,0 +1,257 @@
+"""Compact models for the payloads returned by ETNA's APIs.
+
+Models store known fields in `__slots__` instead of a per-instance dict,
+keep unknown fields in a side dict only when there are some, and parse
+their dates on first access. They implement the read-only mapping
+protocol, so code written against the raw dicts keeps working:
+
+>>> stage = Stage({"name": "Kick-off", "end": "2021-04-07 23:59:00"})
+>>> stage["end"]
+'2021-04-07 23:59:00'
+>>> stage.end.year
+2021
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+from .utils import parse_datetime
+
+
+def _slots(fields=(), dates=()) -> tuple:
+    """Return the slots required by a model declaring `fields` and `dates`."""
+    return tuple(fields) + tuple(
+        slot for name in dates for slot in ("_" + name, "_" + name + "_parsed")
+    )
+
+
+def _date_property(name: str) -> property:
+    raw, parsed = "_" + name, "_" + name + "_parsed"
+
+    def getter(self):
+        try:
+            return getattr(self, parsed)
+        except AttributeError:
+            value = parse_datetime(getattr(self, raw, None))
+            setattr(self, parsed, value)
+            return value
+
+    return property(getter, doc="`{}` parsed as a datetime.".format(name))
+
+
+class Model(Mapping):
+    """Base class of the models.
+
+    Subclasses list their plain fields in `_fields`, the fields holding a
+    date in `_dates` and the fields holding nested models in `_children`,
+    then declare `__slots__ = _slots(_fields, _dates)`.
+    """
+
+    __slots__ = ("_extra",)
+    _fields = ()
+    _dates = ()
+    _children = {}  # type: Dict[str, type]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls._dates:
+            setattr(cls, name, _date_property(name))
+        cls._known = frozenset(cls._fields) | frozenset(cls._dates)
+
+    def __init__(self, data: dict):
+        extra = None
+        for key, value in data.items():
+            if key in self._children and value is not None:
+                value = load(self._children[key], value)
+            if key in self._dates:
+                setattr(self, "_" + key, value)
+            elif key in self._known:
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self._extra = extra
+
+    def __getattr__(self, name: str):
+        # only called for unset slots and unknown attributes
+        if name in type(self)._fields:
+            return None
+        extra = object.__getattribute__(self, "_extra")
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def _raw(self, key: str):
+        if key in self._dates:
+            return object.__getattribute__(self, "_" + key)
+        return object.__getattribute__(self, key)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._known:
+            try:
+                return self._raw(key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._fields + self._dates:
+            try:
+                self._raw(key)
+            except AttributeError:
+                continue
+            yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "<{}({})>".format(type(self).__name__, dict(self))
+
+    def to_dict(self) -> dict:
+        """Return the payload as plain (nested) dicts."""
+        return {key: _to_plain(value) for key, value in self.items()}
+
+
+def _to_plain(value):
+    if isinstance(value, Model):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+def load(model: type, payload):
+    """Build `model` instances from an API payload.
+
+    Lists are converted item by item and the `hits` of search-like
+    responses are converted in place of the raw dicts.
+    """
+    if isinstance(payload, list):
+        return [model(item) for item in payload]
+    if isinstance(payload, dict) and isinstance(payload.get("hits"), list):
+        result = dict(payload)
+        result["hits"] = [model(item) for item in payload["hits"]]
+        return result
+    if isinstance(payload, dict):
+        return model(payload)
+    return payload
+
+
+class User(Model):
+    """A user, as returned by `get_user_info` and `get_students`."""
+
+    _fields = ("id", "login", "email", "firstname", "lastname", "logas", "groups", "firstconnexion")
+    _dates = ("login_date",)
+    __slots__ = _slots(_fields, _dates)
+
+
+class Promotion(Model):
+    """A promotion, as returned by `get_promotion`."""
+
+    _fields = ("id", "target_name", "term_name", "promo", "wall_name", "spe", "learning_duration")
+    _dates = ("learning_start", "learning_end")
+    __slots__ = _slots(_fields, _dates)
+
+
+class Stage(Model):
+    """A stage of a quest."""
+
+    _fields = ("name", "description")
+    _dates = ("start", "end")
+    __slots__ = _slots(_fields, _dates)
+
+
+class Activity(Model):
+    """A project (or any activity) of a module."""
+
+    _fields = ("id", "name", "type", "module_id", "uv_name", "duration", "groups")
+    _dates = ("date_start", "date_end")
+    __slots__ = _slots(_fields, _dates)
+
+
+class Quest(Activity):
+    """A quest, an activity divided in stages."""
+
+    _fields = Activity._fields + ("stages",)
+    _children = {"stages": Stage}
+    __slots__ = ("stages",)
+
+
+class ModuleActivities(Model):
+    """The current projects and quests of a module."""
+
+    _fields = ("project", "quest")
+    _children = {"project": Activity, "quest": Quest}
+    __slots__ = _slots(_fields)
+
+
+class Grade(Model):
+    """A mark, as returned by `get_grades`."""
+
+    _fields = (
+        "activity_name", "activity_type", "student_mark", "average",
+        "minimum", "maximum", "uv_name", "uv_long_name",
+    )
+    _dates = ("date",)
+    __slots__ = _slots(_fields, _dates)
+
+
+class LogEvent(Model):
+    """A log event, as returned by `get_log_events` and `get_logs`."""
+
+    _fields = ("id", "type", "location", "duration")
+    _dates = ("start", "end")
+    __slots__ = _slots(_fields, _dates)
+
+
+class Message(Model):
+    """A message of a conversation."""
+
+    _fields = ("id", "user", "content", "metas")
+    _dates = ("created_at", "updated_at")
+    __slots__ = _slots(_fields, _dates)
+
+
+class Conversation(Model):
+    """A conversation, as returned by `get_conversations`."""
+
+    _fields = ("id", "title", "metas", "last_message", "messages")
+    _dates = ("created_at", "updated_at")
+    _children = {"last_message": Message, "messages": Message}
+    __slots__ = _slots(_fields, _dates)
+
+
+class Ticket(Model):
+    """A ticket, as returned by `get_tickets` and `get_ticket`."""
+
+    _fields = ("id", "title", "status", "creator", "users", "tags", "messages")
+    _dates = ("created_at", "updated_at", "closed_at")
+    __slots__ = _slots(_fields, _dates)
+
+
+def load_current_activities(payload: dict) -> Dict[str, ModuleActivities]:
+    """Convert the result of `get_current_activities`."""
+    return {module: ModuleActivities(content) for module, content in payload.items()}
+
+
+__all__ = (
+    "Model",
+    "load",
+    "load_current_activities",
+    "User",
+    "Promotion",
+    "Stage",
+    "Activity",
+    "Quest",
+    "ModuleActivities",
+    "Grade",
+    "LogEvent",
+    "Message",
+    "Conversation",
+    "Ticket",
+)
@@ -0,0 +1,167 @@
+"""Users' pictures, kept in a content-addressed disk cache.
+
+Photos are streamed to `<path>/blobs/<digest[:2]>/<sha256 digest>`, so
+identical photos are stored once, and an SQLite index maps each login to
+its digest and HTTP validators. Pictures fetched less than `max_age`
+seconds ago are served from disk without any request; older ones are
+revalidated with a conditional request and only downloaded again when
+they changed. Reads go through memory-mapped files shared between callers.
+"""
+import hashlib
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Union
+
+from .batch import BatchResult
+from .constants import PICTURE_URL
+from .utils import extract_items
+
+
+class PictureService:
+    """Fetch, store and read users' pictures through `wrapper`."""
+
+    def __init__(
+        self,
+        wrapper,
+        path: str,
+        max_age: float = 86400,
+        max_workers: int = 8,
+        max_mapped: int = 256,
+    ):
+        self.wrapper = wrapper
+        self.path = os.path.expanduser(path)
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self.max_mapped = max_mapped
+        self._blobs = os.path.join(self.path, "blobs")
+        os.makedirs(self._blobs, exist_ok=True)
+        self._lock = threading.Lock()
+        self._mapped = OrderedDict()  # digest -> mmap
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pictures ("
+                " login TEXT PRIMARY KEY,"
+                " digest TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " fetched REAL NOT NULL)"
+            )
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blobs, digest[:2], digest)
+
+    def _entry(self, login: str):
+        with self._lock:
+            return self._db.execute(
+                "SELECT digest, etag, last_modified, fetched FROM pictures WHERE login = ?",
+                (login,),
+            ).fetchone()
+
+    def _save(self, login: str, digest: str, etag: str, last_modified: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pictures (login, digest, etag, last_modified, fetched)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (login, digest, etag, last_modified, time.time()),
+            )
+
+    def _download(self, response) -> str:
+        """Stream `response` to the blob store, return its digest."""
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(dir=self._blobs)
+        try:
+            with os.fdopen(descriptor, "wb") as stream:
+                for chunk in response.iter_content(chunk_size=65536):
+                    digest.update(chunk)
+                    stream.write(chunk)
+            digest = digest.hexdigest()
+            target = self._blob_path(digest)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temporary, target)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        finally:
+            response.close()
+        return digest
+
+    def fetch(self, login: str = None, revalidate: bool = False) -> str:
+        """Make sure `login`'s picture is stored, return its file path.
+
+        Defaults to the wrapper's login. With `revalidate`, the picture is
+        checked against the server even if it is younger than `max_age`.
+        """
+        login = login or self.wrapper.login
+        entry = self._entry(login)
+        headers = {}
+        if entry is not None:
+            digest, etag, last_modified, fetched = entry
+            path = self._blob_path(digest)
+            if not os.path.exists(path):
+                entry = None
+            elif not revalidate and time.time() - fetched < self.max_age:
+                return path
+            else:
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+        url = PICTURE_URL.format(login=login)
+        response = self.wrapper.request("GET", url, headers=headers, stream=True)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if entry is not None and response.status_code == 304:
+            response.close()
+            # a 304 may omit the validators, the stored ones remain valid
+            digest, etag, last_modified = entry[0], etag or entry[1], last_modified or entry[2]
+        else:
+            digest = self._download(response)
+        self._save(login, digest, etag, last_modified)
+        return self._blob_path(digest)
+
+    def read(self, login: str = None, revalidate: bool = False) -> memoryview:
+        """Return `login`'s picture as a read-only view of its mapped file."""
+        path = self.fetch(login, revalidate=revalidate)
+        digest = os.path.basename(path)
+        with self._lock:
+            mapped = self._mapped.get(digest)
+            if mapped is None:
+                if os.path.getsize(path) == 0:
+                    return memoryview(b"")
+                with open(path, "rb") as stream:
+                    mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapped[digest] = mapped
+                while len(self._mapped) > self.max_mapped:
+                    # views handed out keep their own reference to the map
+                    self._mapped.popitem(last=False)
+            self._mapped.move_to_end(digest)
+        return memoryview(mapped)
+
+    def prefetch(self, students: Union[int, Iterable]) -> List[BatchResult]:
+        """Concurrently store the pictures of many students.
+
+        `students` is a promotion id, a `get_students` result or an
+        iterable of logins. Return one `BatchResult` (holding the file
+        path) per login.
+        """
+        if isinstance(students, int):
+            students = self.wrapper.get_students(students)
+        if isinstance(students, dict):
+            students = extract_items(students)
+        logins = [student["login"] if hasattr(student, "get") else student for student in students]
+        return self.wrapper.batch(self.max_workers).map(self.fetch, logins)
+
+    def close(self):
+        with self._lock:
+            self._mapped.clear()
+        self._db.close()
+
+
+__all__ = ("PictureService",)
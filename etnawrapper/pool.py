@@ -0,0 +1,196 @@
+"""Wrappers of many accounts sharing a single connection pool."""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from .auth import MemoryTokenStore, TokenStore
+from .etna import EtnaWrapper
+from .transport import RetryPolicy, Transport
+
+
+class _Account:
+    """State of an account: wrapper build lock, job slots and users."""
+
+    __slots__ = ("lock", "limit", "users")
+
+    def __init__(self, per_account: int):
+        self.lock = threading.Lock()
+        self.limit = threading.BoundedSemaphore(per_account)
+        self.users = 0
+
+
+class WrapperPool:
+    """Registry of `EtnaWrapper`s, one per account.
+
+    Every wrapper sends its requests through the same `Transport`, and so
+    the same keep-alive session, rate limits and circuit breakers; the
+    cookies stay per account since the session never stores them. At most
+    `max_wrappers` wrappers are kept, the least recently used are evicted
+    and built again on demand, their cookies surviving in `token_store`.
+
+    `account` and `run` allow `per_account` concurrent jobs per account
+    and `max_concurrency` jobs overall. The per-account state is dropped
+    with the wrapper once no job uses it.
+
+    >>> pool = WrapperPool(max_concurrency=32, per_account=2)
+    >>> pool.register("login_x", password)
+    >>> grades = pool.run("login_x", lambda wrapper: wrapper.get_grades(42))
+
+    Extra keyword arguments (e.g. `cache`, `models`, `timeouts`) are given
+    to every wrapper; a shared cache is safe, its keys are per account.
+    """
+
+    def __init__(
+        self,
+        max_wrappers: int = 128,
+        max_concurrency: int = 32,
+        per_account: int = 4,
+        token_store: TokenStore = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        transport: Transport = None,
+        retry: RetryPolicy = None,
+        rate_limits: dict = None,
+        **options
+    ):
+        self.max_wrappers = max_wrappers
+        self.per_account = per_account
+        self.token_store = token_store if token_store is not None else MemoryTokenStore()
+        self._session = None
+        if transport is None:
+            self._session = EtnaWrapper.create_session(pool_connections, pool_maxsize)
+            transport = Transport(self._session, retry=retry, rate_limits=rate_limits)
+        self.transport = transport
+        self.options = options
+        self._credentials = {}  # type: Dict[str, dict]
+        self._wrappers = OrderedDict()  # type: OrderedDict[str, EtnaWrapper]
+        self._accounts = {}  # type: Dict[str, _Account]
+        self._global = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._wrappers)
+
+    def __contains__(self, login: str) -> bool:
+        return login in self._wrappers
+
+    def register(self, login: str, password: str = None, cookies: dict = None):
+        """Remember how to authenticate `login`, dropping its current wrapper."""
+        with self._lock:
+            self._credentials[login] = {"password": password, "cookies": cookies}
+            self._drop(login)
+
+    def _hold(self, login: str) -> _Account:
+        with self._lock:
+            account = self._accounts.get(login)
+            if account is None:
+                account = self._accounts[login] = _Account(self.per_account)
+            account.users += 1
+            return account
+
+    def _release(self, login: str, account: _Account):
+        with self._lock:
+            account.users -= 1
+            if login not in self._wrappers:
+                self._forget(login, account)
+
+    def _forget(self, login: str, account: _Account):
+        """Drop the state of `login` unless it is in use, with `self._lock` held."""
+        if account.users == 0 and self._accounts.get(login) is account:
+            del self._accounts[login]
+
+    def _drop(self, login: str):
+        """Drop the wrapper of `login` and its idle state, with `self._lock` held."""
+        self._wrappers.pop(login, None)
+        account = self._accounts.get(login)
+        if account is not None:
+            self._forget(login, account)
+
+    def _cached(self, login: str) -> Optional[EtnaWrapper]:
+        with self._lock:
+            wrapper = self._wrappers.get(login)
+            if wrapper is not None:
+                self._wrappers.move_to_end(login)
+            return wrapper
+
+    def get(self, login: str) -> EtnaWrapper:
+        """Return the wrapper of `login`, building it if needed.
+
+        Concurrent callers wait for a single build, and a single login.
+        """
+        wrapper = self._cached(login)
+        if wrapper is not None:
+            return wrapper
+        if login not in self._credentials:
+            raise KeyError("unknown account: {}".format(login))
+        account = self._hold(login)
+        try:
+            with account.lock:
+                wrapper = self._cached(login)
+                if wrapper is None:
+                    wrapper = self._build(login)
+            return wrapper
+        finally:
+            self._release(login, account)
+
+    def _build(self, login: str) -> EtnaWrapper:
+        with self._lock:
+            credentials = self._credentials[login]
+        # authenticating may take a request, do it outside of the pool lock
+        wrapper = EtnaWrapper(
+            login,
+            credentials["password"],
+            cookies=credentials["cookies"],
+            use_session=False,
+            token_store=self.token_store,
+            transport=self.transport,
+            **self.options
+        )
+        with self._lock:
+            self._wrappers[login] = wrapper
+            while len(self._wrappers) > self.max_wrappers:
+                evicted, _ = self._wrappers.popitem(last=False)
+                self._drop(evicted)
+        return wrapper
+
+    def evict(self, login: str):
+        with self._lock:
+            self._drop(login)
+
+    @contextmanager
+    def account(self, login: str, timeout: float = None) -> Iterator[EtnaWrapper]:
+        """Hold a job slot of `login` (and a global one) and yield its wrapper.
+
+        Raise `TimeoutError` when no slot was freed within `timeout` seconds.
+        """
+        account = self._hold(login)
+        try:
+            if not account.limit.acquire(timeout=timeout):
+                raise TimeoutError("no job slot available for {}".format(login))
+            try:
+                if not self._global.acquire(timeout=timeout):
+                    raise TimeoutError("no job slot available")
+                try:
+                    yield self.get(login)
+                finally:
+                    self._global.release()
+            finally:
+                account.limit.release()
+        finally:
+            self._release(login, account)
+
+    def run(self, login: str, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """Call `func(wrapper, *args, **kwargs)` with `login`'s wrapper, within the limits."""
+        with self.account(login, timeout=timeout) as wrapper:
+            return func(wrapper, *args, **kwargs)
+
+    def close(self):
+        """Forget the wrappers and close the shared session."""
+        with self._lock:
+            self._wrappers.clear()
+        if self._session is not None:
+            self._session.close()
+
+
+__all__ = ("WrapperPool",)
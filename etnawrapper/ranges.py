@@ -0,0 +1,117 @@
+"""Fetch long date ranges as concurrent, cacheable windows."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, List, Tuple
+
+from .cache import BaseCache, MISSING
+from .utils import extract_items
+
+
+CHUNKS = ("day", "week", "month")
+
+
+def _floor(moment: datetime, chunk: str) -> datetime:
+    moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if chunk == "week":
+        return moment - timedelta(days=moment.weekday())
+    if chunk == "month":
+        return moment.replace(day=1)
+    return moment
+
+
+def _next(moment: datetime, chunk: str) -> datetime:
+    if chunk == "day":
+        return moment + timedelta(days=1)
+    if chunk == "week":
+        return moment + timedelta(weeks=1)
+    return (moment + timedelta(days=32)).replace(day=1)
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time())
+
+
+def split_range(start, end, chunk: str = "week") -> List[Tuple[datetime, datetime]]:
+    """Split `[start, end)` into windows aligned on days, weeks or months.
+
+    The first and last windows are clipped to the requested range, the
+    others are whole calendar days, weeks (starting on Monday) or months,
+    so they are the same from one call to another.
+    """
+    if chunk not in CHUNKS:
+        raise ValueError("chunk must be one of {}".format(", ".join(CHUNKS)))
+    start, end = _as_datetime(start), _as_datetime(end)
+    windows = []
+    current = start
+    while current < end:
+        boundary = min(_next(_floor(current, chunk), chunk), end)
+        windows.append((current, boundary))
+        current = boundary
+    return windows
+
+
+def _dedupe(items: List[Any]) -> List[Any]:
+    seen = set()
+    result = []
+    for item in items:
+        identifier = item.get("id") if isinstance(item, dict) else None
+        if identifier is not None:
+            if identifier in seen:
+                continue
+            seen.add(identifier)
+        result.append(item)
+    return result
+
+
+def fetch_windows(
+    fetch: Callable[[datetime, datetime], Any],
+    start,
+    end,
+    chunk: str = "week",
+    max_workers: int = 4,
+    cache: BaseCache = None,
+    key: str = "",
+    now: datetime = None,
+) -> List[Any]:
+    """Fetch `[start, end)` window by window and merge the items.
+
+    `fetch(window_start, window_end)` is called concurrently for every
+    window. Windows ending before `now` are stored in `cache` (under
+    `key` followed by the window bounds) without expiry and never fetched
+    again; the window containing `now` is always fetched. Items are
+    merged in window order and deduplicated on their `id`.
+    """
+    windows = split_range(start, end, chunk)
+    if now is None:
+        now = datetime.now(windows[0][0].tzinfo) if windows else datetime.now()
+    results = [MISSING] * len(windows)
+    keys = [None] * len(windows)
+    missing = []
+    for index, (window_start, window_end) in enumerate(windows):
+        if cache is not None and window_end <= now:
+            keys[index] = "{} {} {}".format(key, window_start.isoformat(), window_end.isoformat())
+            results[index] = cache.get(keys[index], MISSING)
+        if results[index] is MISSING:
+            missing.append(index)
+
+    def run(index: int) -> list:
+        return extract_items(fetch(*windows[index]))
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for index, items in zip(missing, executor.map(run, missing)):
+                results[index] = items
+                if keys[index] is not None:
+                    cache.set(keys[index], items)
+    return _dedupe([item for items in results for item in items])
+
+
+def window_dates(window_start: datetime, window_end: datetime) -> Tuple[date, date]:
+    """Convert a `[start, end)` window to inclusive days."""
+    last = window_end - timedelta(microseconds=1)
+    return window_start.date(), max(window_start, last).date()
+
+
+__all__ = ("CHUNKS", "split_range", "fetch_windows", "window_dates")
@@ -0,0 +1,210 @@
+"""Record real traffic and replay it without network.
+
+`RecordingTransport` wraps another transport and appends every exchange
+to a gzipped NDJSON archive. `ReplayTransport` answers from such an
+archive, with the recorded latency or as fast as possible. Both can be
+given as the `transport` of an `EtnaWrapper`:
+
+>>> with RecordingTransport(Transport(), "traffic.ndjson.gz") as recorder:
+...     EtnaWrapper(login, password, transport=recorder).get_students(42)
+>>> replay = ReplayTransport("traffic.ndjson.gz", timing="original")
+>>> EtnaWrapper(login, cookies={}, transport=replay).get_students(42)
+
+Archives hold the responses as received, cookies and personal data
+included; request headers, cookies and form data (the login password)
+are never recorded.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Tuple
+
+import requests
+from requests.cookies import cookiejar_from_dict
+from requests.structures import CaseInsensitiveDict
+
+from .errors import DeadlineExceeded, ReplayError
+from .transport import Transport
+
+
+TIMINGS = ("fast", "original")
+
+
+def _request_key(method: str, url: str, params=None, json_body=None) -> Tuple[str, str, str]:
+    prepared = requests.Request(method.upper(), url, params=params).prepare()
+    digest = ""
+    if json_body is not None:
+        payload = json.dumps(json_body, sort_keys=True).encode()
+        digest = hashlib.sha1(payload).hexdigest()
+    return prepared.method, prepared.url, digest
+
+
+class RecordingTransport:
+    """Send requests through `inner` and record them to `path`.
+
+    Recorded responses are read in full, streamed ones included, and
+    stay usable by the caller. `append` continues an existing archive.
+    """
+
+    def __init__(self, inner=None, path: str = "traffic.ndjson.gz", append: bool = False):
+        self.inner = inner if inner is not None else Transport()
+        self.path = path
+        self._lock = threading.Lock()
+        self._stream = gzip.open(path, "at" if append else "wt", encoding="utf-8")
+        self._started = time.monotonic()
+        self.recorded = 0
+
+    def request(
+        self, method: str, url: str, deadline: float = None, on_retry=None, **kwargs
+    ) -> requests.Response:
+        started = time.monotonic()
+        response = self.inner.request(
+            method, url, deadline=deadline, on_retry=on_retry, **kwargs
+        )
+        body = response.content
+        elapsed = time.monotonic() - started
+        try:
+            encoded = {"body": body.decode("utf-8")}
+        except UnicodeDecodeError:
+            encoded = {"body_b64": base64.b64encode(body).decode("ascii")}
+        entry = {
+            "key": _request_key(method, url, kwargs.get("params"), kwargs.get("json")),
+            "offset": round(started - self._started, 6),
+            "elapsed": round(elapsed, 6),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+            "cookies": response.cookies.get_dict(),
+            "encoding": response.encoding,
+        }
+        entry.update(encoded)
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._stream.write(line)
+            self.recorded += 1
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayTransport:
+    """Answer requests with the responses recorded in `path`.
+
+    Requests are matched on method, URL (query string included) and JSON
+    body; the responses recorded for the same request are replayed in
+    order, then from the start again if `loop` is set. A request missing
+    from the archive raises `ReplayError`.
+
+    With `timing="original"`, the recording is replayed at its own pace:
+    each response is delayed by its recorded latency, and until the time
+    it was received at in the recording, counted from the first replayed
+    request.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timing: str = "fast",
+        loop: bool = True,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        if timing not in TIMINGS:
+            raise ValueError("timing must be one of {}".format(", ".join(TIMINGS)))
+        self.path = path
+        self.timing = timing
+        self.loop = loop
+        self._sleep = sleep
+        self._clock = clock
+        self._started = None
+        self._entries = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._lock = threading.Lock()
+        with gzip.open(path, "rt", encoding="utf-8") as stream:
+            for line in stream:
+                entry = json.loads(line)
+                self._entries[tuple(entry["key"])].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _next(self, key: tuple) -> dict:
+        with self._lock:
+            entries = self._entries.get(key)
+            position = self._positions[key]
+            if not entries or (position >= len(entries) and not self.loop):
+                raise ReplayError("no recorded response for {} {}".format(key[0], key[1]))
+            self._positions[key] = position + 1
+            return entries[position % len(entries)]
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        deadline: float = None,
+        on_retry=None,
+        on_send=None,
+        on_response=None,
+        **kwargs
+    ) -> requests.Response:
+        key = _request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        entry = self._next(key)
+        delay = self._delay(entry)
+        if deadline is not None and self._clock() + delay >= deadline:
+            raise DeadlineExceeded("deadline exceeded before {} {}".format(method, url))
+        if on_send is not None:
+            on_send()
+        if delay:
+            self._sleep(delay)
+        response = self._build(entry, key[1])
+        if on_response is not None:
+            on_response(response, delay)
+        return response
+
+    def _delay(self, entry: dict) -> float:
+        """Return how long to wait before answering with `entry`."""
+        if self.timing != "original":
+            return 0
+        now = self._clock()
+        with self._lock:
+            if self._started is None:
+                self._started = now - entry["offset"]
+            received = self._started + entry["offset"] + entry["elapsed"]
+        return max(entry["elapsed"], received - now)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    @staticmethod
+    def _build(entry: dict, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry.get("encoding")
+        response.url = url
+        response.cookies = cookiejar_from_dict(entry.get("cookies") or {})
+        if "body_b64" in entry:
+            response._content = base64.b64decode(entry["body_b64"])
+        else:
+            response._content = entry["body"].encode("utf-8")
+        response._content_consumed = True
+        return response
+
+
+__all__ = ("TIMINGS", "RecordingTransport", "ReplayTransport")
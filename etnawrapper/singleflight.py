@@ -0,0 +1,62 @@
+"""Coalesce identical concurrent calls into a single execution."""
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from .errors import DeadlineExceeded
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share the result of a call between threads asking for the same key.
+
+    The first thread calling `do` for a key executes the function, the
+    others wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any], deadline: float = None) -> Any:
+        """Execute `func` unless a call for `key` is already in flight.
+
+        A waiting thread raises `DeadlineExceeded` once `deadline` (a
+        `time.monotonic()` value) is passed, the call goes on for others.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not call.done.wait(timeout):
+                raise DeadlineExceeded("deadline exceeded waiting for {!r}".format(key))
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def __len__(self):
+        return len(self._calls)
+
+
+__all__ = ("SingleFlight",)
@@ -0,0 +1,266 @@
+"""Local mirror of students' grades, logs, declarations and activities.
+
+`SyncEngine` pulls data through an `EtnaWrapper` into a `SyncStore`, an
+SQLite database indexed on login, module and date, and remembers a
+high-water mark per student and kind of record so that later runs only
+fetch (or only store) what is new.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import List, Optional
+
+from .utils import extract_items, parse_datetime
+
+
+_MODULE_KEYS = ("uv_name", "module", "module_id", "uv_id")
+_DATE_KEYS = ("date", "start", "end", "date_start", "date_end", "created_at")
+
+
+def _normalize_date(value) -> Optional[str]:
+    try:
+        parsed = parse_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed.replace(tzinfo=None).isoformat(sep=" ") if parsed is not None else None
+
+
+def _plain(item):
+    return item.to_dict() if hasattr(item, "to_dict") else item
+
+
+def _items(payload) -> list:
+    """Return the records of `payload` as plain dicts, models included."""
+    return [_plain(item) for item in extract_items(payload)]
+
+
+def _record_id(item) -> str:
+    if isinstance(item, dict) and item.get("id") is not None:
+        return str(item["id"])
+    payload = json.dumps(item, sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _field(item, keys):
+    if not isinstance(item, dict):
+        return None
+    for key in keys:
+        if item.get(key) is not None:
+            return item[key]
+    return None
+
+
+class SyncStore:
+    """SQLite store of the synchronized records."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS records (
+                    kind TEXT NOT NULL,
+                    login TEXT NOT NULL,
+                    record_id TEXT NOT NULL,
+                    module TEXT,
+                    date TEXT,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (kind, login, record_id)
+                );
+                CREATE INDEX IF NOT EXISTS records_login ON records (login, kind, date);
+                CREATE INDEX IF NOT EXISTS records_module ON records (module, kind);
+                CREATE INDEX IF NOT EXISTS records_date ON records (kind, date);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    kind TEXT NOT NULL,
+                    login TEXT NOT NULL,
+                    high_water TEXT,
+                    synced_at REAL NOT NULL,
+                    PRIMARY KEY (kind, login)
+                );
+                """
+            )
+
+    def upsert(self, kind: str, login: str, items: list) -> int:
+        """Store `items`, return how many were new or changed.
+
+        Records whose payload did not change are not written again.
+        """
+        with self._lock, self._db:
+            return self._upsert(kind, login, items)
+
+    def _upsert(self, kind: str, login: str, items: list) -> int:
+        # INSERT ... ON CONFLICT needs SQLite 3.24, older builds are common
+        rows = []
+        for item in map(_plain, items):
+            module = _field(item, _MODULE_KEYS)
+            rows.append((
+                str(module) if module is not None else None,
+                _normalize_date(_field(item, _DATE_KEYS)),
+                json.dumps(item, sort_keys=True),
+                kind,
+                login,
+                _record_id(item),
+            ))
+        before = self._db.total_changes
+        self._db.executemany(
+            "INSERT OR IGNORE INTO records (module, date, payload, kind, login, record_id)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._db.executemany(
+            "UPDATE records SET module = ?, date = ?, payload = ?"
+            " WHERE kind = ? AND login = ? AND record_id = ? AND payload != ?",
+            [row + (row[2],) for row in rows],
+        )
+        return self._db.total_changes - before
+
+    def replace(self, kind: str, login: str, items: list) -> int:
+        """Replace every `kind` record of `login` by `items`, atomically."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM records WHERE kind = ? AND login = ?", (kind, login))
+            return self._upsert(kind, login, items)
+
+    def query(
+        self,
+        kind: str,
+        login: str = None,
+        module: str = None,
+        since: str = None,
+        until: str = None,
+    ) -> List[dict]:
+        """Return the stored `kind` records, filtered and sorted by date."""
+        clauses, params = ["kind = ?"], [kind]
+        for column, operator, value in (
+            ("login", "=", login),
+            ("module", "=", module),
+            ("date", ">=", _normalize_date(since) if since is not None else None),
+            ("date", "<=", _normalize_date(until) if until is not None else None),
+        ):
+            if value is not None:
+                clauses.append("{} {} ?".format(column, operator))
+                params.append(value)
+        sql = "SELECT payload FROM records WHERE {} ORDER BY date, record_id".format(
+            " AND ".join(clauses)
+        )
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def high_water(self, kind: str, login: str) -> Optional[str]:
+        """Return the high-water mark of `login`'s `kind` records."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT high_water FROM sync_state WHERE kind = ? AND login = ?", (kind, login)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water(self, kind: str, login: str, value: Optional[str]):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (kind, login, high_water, synced_at)"
+                " VALUES (?, ?, ?, ?)",
+                (kind, login, value, time.time()),
+            )
+
+    def close(self):
+        self._db.close()
+
+
+class SyncEngine:
+    """Incrementally mirror students' data from `wrapper` into `store`."""
+
+    def __init__(self, wrapper, store: SyncStore):
+        self.wrapper = wrapper
+        self.store = store
+
+    def _sync_events(self, kind: str, login: str, items: list) -> int:
+        """Store the records newer than the high-water mark of `login`.
+
+        Records dated at the mark itself are stored again, they may have
+        been published after the last run in the same second; `upsert`
+        skips those which did not change.
+        """
+        high_water = self.store.high_water(kind, login)
+        fresh = []
+        latest = high_water
+        for item in items:
+            moment = _normalize_date(_field(item, _DATE_KEYS))
+            if high_water is not None and moment is not None and moment < high_water:
+                continue
+            fresh.append(item)
+            if moment is not None and (latest is None or moment > latest):
+                latest = moment
+        changed = self.store.upsert(kind, login, fresh)
+        self.store.set_high_water(kind, login, latest)
+        return changed
+
+    def sync_grades(self, promotion_id: int, login: str) -> int:
+        """Mirror the grades of `login`, return the number of changed records."""
+        items = _items(self.wrapper.get_grades(promotion_id, login=login))
+        changed = self.store.upsert("grades", login, items)
+        self.store.set_high_water("grades", login, None)
+        return changed
+
+    def sync_logs(self, login: str) -> int:
+        """Mirror the logs of `login` newer than the last synchronization.
+
+        The logs endpoint has no range parameters, the list is fetched
+        in full but only the new records are written.
+        """
+        items = _items(self.wrapper.get_logs(login=login))
+        return self._sync_events("logs", login, items)
+
+    def sync_log_events(self, login: str) -> int:
+        """Mirror the log events of `login` newer than the last synchronization."""
+        items = _items(self.wrapper.get_log_events(login=login))
+        return self._sync_events("log_events", login, items)
+
+    def sync_declarations(self, since: date, until: date = None) -> int:
+        """Mirror the declarations of the wrapper's login.
+
+        Only the range starting at the last synchronized day (or `since`
+        on the first run) up to `until` (today by default) is fetched.
+        """
+        login = self.wrapper.login
+        until = until or date.today()
+        high_water = self.store.high_water("declarations", login)
+        start = date.fromisoformat(high_water) if high_water else since
+        if start > until:
+            return 0
+        items = _items(self.wrapper.get_declarations(
+            start=start.strftime("%Y-%m-%d"), end=until.strftime("%Y-%m-%d"),
+        ))
+        changed = self.store.upsert("declarations", login, items)
+        # the last day may still receive declarations, it is fetched again next time
+        self.store.set_high_water("declarations", login, until.isoformat())
+        return changed
+
+    def sync_activities(self, login: str) -> int:
+        """Replace the mirrored current activities of `login`."""
+        payload = self.wrapper.get_current_activities(login=login)
+        items = []
+        for module, content in (payload or {}).items():
+            content = _plain(content)
+            for kind in ("project", "quest"):
+                for activity in content.get(kind) or []:
+                    items.append(dict(activity, module=module, activity_type=kind))
+        changed = self.store.replace("activities", login, items)
+        self.store.set_high_water("activities", login, None)
+        return changed
+
+    def sync_student(self, promotion_id: int, login: str) -> dict:
+        """Run every synchronization available for `login`."""
+        return {
+            "grades": self.sync_grades(promotion_id, login),
+            "logs": self.sync_logs(login),
+            "log_events": self.sync_log_events(login),
+            "activities": self.sync_activities(login),
+        }
+
+
+__all__ = ("SyncStore", "SyncEngine")
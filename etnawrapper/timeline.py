@@ -0,0 +1,221 @@
+"""Columnar timeline of students' activities.
+
+`get_current_activities` returns nested modules, projects, quests and
+stages with dates as strings. `Timeline` flattens them once per student
+into parallel columns sorted by end date, with the dates already parsed,
+so that "what is due before X" is a binary search per student. Students
+are updated independently, and an unchanged payload is not parsed again.
+"""
+import bisect
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from .utils import extract_items, parse_datetime
+
+
+PROJECT = "project"
+QUEST = "quest"
+STAGE = "stage"
+ACTIVITY = "activity"
+
+
+class TimelineEntry(NamedTuple):
+    """A dated activity of a timeline."""
+
+    key: str
+    module: Any
+    kind: str
+    name: str
+    parent: Optional[str]
+    start: Optional[datetime]
+    end: datetime
+    item: Any
+
+
+def _timestamp(value) -> Optional[float]:
+    try:
+        moment = parse_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _moment(timestamp: Optional[float]) -> Optional[datetime]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _digest(payload) -> str:
+    plain = payload.to_dict() if hasattr(payload, "to_dict") else payload
+    return hashlib.sha1(json.dumps(plain, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Columns:
+    """Entries of one key, as parallel lists sorted by end date."""
+
+    __slots__ = ("digest", "ends", "starts", "modules", "kinds", "names", "parents", "items")
+
+    def __init__(self, digest: str, rows: List[tuple]):
+        rows.sort(key=lambda row: row[0])
+        self.digest = digest
+        self.ends = [row[0] for row in rows]
+        self.starts = [row[1] for row in rows]
+        self.modules = [row[2] for row in rows]
+        self.kinds = [row[3] for row in rows]
+        self.names = [row[4] for row in rows]
+        self.parents = [row[5] for row in rows]
+        self.items = [row[6] for row in rows]
+
+    def entry(self, key: str, index: int) -> TimelineEntry:
+        return TimelineEntry(
+            key,
+            self.modules[index],
+            self.kinds[index],
+            self.names[index],
+            self.parents[index],
+            _moment(self.starts[index]),
+            _moment(self.ends[index]),
+            self.items[index],
+        )
+
+
+def _row(module, kind: str, item, parent: str = None, start_key="date_start", end_key="date_end"):
+    end = _timestamp(item.get(end_key))
+    if end is None:
+        return None
+    return (end, _timestamp(item.get(start_key)), module, kind, item.get("name"), parent, item)
+
+
+def flatten_activities(payload) -> List[tuple]:
+    """Flatten a `get_current_activities` payload into timeline rows."""
+    rows = []
+    for module, content in (payload or {}).items():
+        for project in content.get(PROJECT) or []:
+            rows.append(_row(module, PROJECT, project))
+        for quest in content.get(QUEST) or []:
+            rows.append(_row(module, QUEST, quest))
+            for stage in quest.get("stages") or []:
+                rows.append(_row(module, STAGE, stage, quest.get("name"), "start", "end"))
+    return [row for row in rows if row is not None]
+
+
+class Timeline:
+    """Activities of many students (or modules), indexed by end date.
+
+    >>> timeline = Timeline(wrapper)
+    >>> timeline.load(logins)
+    >>> timeline.due_before(datetime(2021, 4, 1), logins=logins[:10])
+    """
+
+    def __init__(self, wrapper=None, max_workers: int = 8):
+        self.wrapper = wrapper
+        self.max_workers = max_workers
+        self._columns = {}  # type: Dict[str, _Columns]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(columns.ends) for columns in self._columns.values())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._columns
+
+    def update(self, key: str, payload) -> bool:
+        """Replace the entries of `key` by a `get_current_activities` payload.
+
+        Return False, without parsing anything, when `payload` did not
+        change since the last update of `key`.
+        """
+        return self._update(key, payload, flatten_activities)
+
+    def _update(self, key: str, payload, flatten) -> bool:
+        digest = _digest(payload)
+        current = self._columns.get(key)
+        if current is not None and current.digest == digest:
+            return False
+        columns = _Columns(digest, flatten(payload))
+        with self._lock:
+            self._columns[key] = columns
+        return True
+
+    def update_module(self, module) -> bool:
+        """Fetch the activities of `module`, stored under `module:<module>`."""
+        payload = self.wrapper.get_project_activites(module)
+
+        def flatten(payload) -> List[tuple]:
+            rows = (_row(module, ACTIVITY, item) for item in extract_items(payload))
+            return [row for row in rows if row is not None]
+
+        return self._update("module:{}".format(module), payload, flatten)
+
+    def remove(self, key: str):
+        with self._lock:
+            self._columns.pop(key, None)
+
+    def load(self, logins: Iterable[str]) -> Dict[str, bool]:
+        """Fetch the current activities of `logins` concurrently.
+
+        Return whether each student's entries changed; students whose
+        activities could not be fetched are left as they were.
+        """
+        results = self.wrapper.batch(self.max_workers).get_current_activities(logins)
+        return {
+            result.key: self.update(result.key, result.value) for result in results if result.ok
+        }
+
+    def due_before(
+        self,
+        moment: datetime,
+        logins: Iterable[str] = None,
+        since: datetime = None,
+        kinds: Iterable[str] = None,
+    ) -> List[TimelineEntry]:
+        """Return the entries ending before `moment`, sorted by end date.
+
+        Only the entries of `logins` (every key by default) ending after
+        `since` (if set) and of one of `kinds` (if set) are returned.
+        """
+        until = _timestamp(moment)
+        after = _timestamp(since) if since is not None else None
+        kinds = set(kinds) if kinds is not None else None
+        with self._lock:
+            keys = list(self._columns) if logins is None else list(logins)
+            selected = [(key, self._columns.get(key)) for key in keys]
+        entries = []
+        for key, columns in selected:
+            if columns is None:
+                continue
+            first = 0 if after is None else bisect.bisect_right(columns.ends, after)
+            last = bisect.bisect_left(columns.ends, until)
+            for index in range(first, last):
+                if kinds is None or columns.kinds[index] in kinds:
+                    entries.append(columns.entry(key, index))
+        entries.sort(key=lambda entry: entry.end)
+        return entries
+
+    def upcoming(
+        self, logins: Iterable[str] = None, until: datetime = None, kinds: Iterable[str] = None,
+    ) -> List[TimelineEntry]:
+        """Return the entries not ended yet (and ending before `until`)."""
+        now = datetime.now(timezone.utc)
+        return self.due_before(
+            until or datetime.max.replace(tzinfo=timezone.utc), logins, since=now, kinds=kinds,
+        )
+
+
+__all__ = (
+    "PROJECT",
+    "QUEST",
+    "STAGE",
+    "ACTIVITY",
+    "TimelineEntry",
+    "Timeline",
+    "flatten_activities",
+)
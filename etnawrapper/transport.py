@@ -0,0 +1,313 @@
+"""Resilient HTTP transport used by `EtnaWrapper`.
+
+`Transport` wraps a `requests.Session` (or the `requests` module) and adds
+retries with exponential backoff for idempotent requests, a token-bucket
+rate limiter and a circuit breaker per API host.
+"""
+import random
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+
+from .constants import API_HOSTS
+from .errors import DeadlineExceeded, MaxRetryError
+
+
+class RetryPolicy:
+    """Decide which requests are retried, and how long to wait in between.
+
+    Idempotent requests failing with a connection error, a timeout or one
+    of `statuses` are retried up to `total` times. The delay grows
+    exponentially from `backoff_factor` up to `max_backoff`, with full
+    jitter when `jitter` is set. `Retry-After` headers are honored.
+    """
+
+    def __init__(
+        self,
+        total: int = 2,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30,
+        jitter: bool = True,
+        statuses=(429, 500, 502, 503, 504),
+        methods=("GET", "HEAD", "OPTIONS", "PUT", "DELETE"),
+    ):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(methods)
+
+    def can_retry(self, method: str, attempt: int) -> bool:
+        return method.upper() in self.methods and attempt < self.total
+
+    def backoff(self, attempt: int, response: requests.Response = None) -> float:
+        """Return the delay before retrying for the `attempt`-th time."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class TokenBucket:
+    """Allow `rate` requests per second, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, sleep=time.sleep, deadline: float = None):
+        """Take a token, waiting for one to be available.
+
+        Raise `DeadlineExceeded` instead of waiting past `deadline`, a
+        `time.monotonic()` value.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                if deadline is not None and now + wait >= deadline:
+                    raise DeadlineExceeded("deadline exceeded waiting for the rate limit")
+            sleep(wait)
+
+
+class CircuitBreaker:
+    """Stop sending requests to a host after `failure_threshold` consecutive failures.
+
+    Once open, requests fail immediately with `MaxRetryError` for
+    `recovery_timeout` seconds, then a single trial request is let
+    through: its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_request(self, host: str = ""):
+        """Raise `MaxRetryError` if requests must not be sent."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if not self._trial and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._trial = True
+                return
+        raise MaxRetryError("circuit open for {}, not sending request".format(host))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_aborted(self):
+        """Forget a request which failed through no fault of the host.
+
+        A trial request is let through again, nothing is counted.
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+# timeouts shortened to a deadline expire at most this early (seconds)
+_DEADLINE_SLACK = 0.01
+
+
+def _expired(deadline: float = None) -> bool:
+    return deadline is not None and time.monotonic() >= deadline - _DEADLINE_SLACK
+
+
+def host_name(url: str) -> str:
+    """Return the name of the API host of `url` (see `API_HOSTS`)."""
+    for name, base in API_HOSTS.items():
+        if url.startswith(base):
+            return name
+    return urlsplit(url).netloc
+
+
+class Transport:
+    """Send requests through `req` with retries, rate limiting and circuit breaking.
+
+    `rate_limits` maps API host names (see `constants.API_HOSTS`) to a
+    `TokenBucket` or to a number of requests per second. A circuit breaker
+    is kept per host unless `failure_threshold` is None.
+    """
+
+    def __init__(
+        self,
+        req=requests,
+        retry: RetryPolicy = None,
+        rate_limits: Dict[str, object] = None,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        sleep=time.sleep,
+    ):
+        self.req = req
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.rate_limits = {
+            name: limit if isinstance(limit, TokenBucket) else TokenBucket(limit)
+            for name, limit in (rate_limits or {}).items()
+        }
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._sleep = sleep
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Return the circuit breaker of the host `name`."""
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+            return self._breakers[name]
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        deadline: float = None,
+        on_retry=None,
+        on_send=None,
+        on_response=None,
+        **kwargs
+    ) -> requests.Response:
+        """Send a request, see `requests.request` for the arguments.
+
+        `deadline` is a `time.monotonic()` value after which no attempt
+        is made anymore, `DeadlineExceeded` is raised instead.
+        `on_retry(attempt, reason)` is called before every retry, `reason`
+        being the exception or the response that triggered it.
+        `on_send()` and `on_response(outcome, elapsed)` are called around
+        every attempt, `outcome` being its response or exception.
+        """
+        name = host_name(url)
+        breaker = self.breaker(name) if self.failure_threshold is not None else None
+        attempt = 0
+        while True:
+            self._before_attempt(method, url, name, breaker, deadline)
+            try:
+                response = self._attempt(
+                    method, url, breaker, on_send, on_response, deadline, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if not self.retry.can_retry(method, attempt):
+                    raise MaxRetryError(
+                        "{} {} failed after {} attempts: {}".format(method, url, attempt + 1, error)
+                    ) from error
+                self._wait(self.retry.backoff(attempt), deadline, error)
+                reason = error
+            else:
+                delay = self._retry_delay(method, attempt, response, deadline)
+                if delay is None:
+                    return response
+                response.close()
+                self._sleep(delay)
+                reason = response
+            if on_retry is not None:
+                on_retry(attempt, reason)
+            attempt += 1
+
+    def _before_attempt(
+        self, method: str, url: str, name: str, breaker: CircuitBreaker = None, deadline=None
+    ):
+        """Check the deadline and the circuit, then wait for the rate limit."""
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded("deadline exceeded before {} {}".format(method, url))
+        if breaker is not None:
+            breaker.before_request(name)
+        limiter = self.rate_limits.get(name)
+        if limiter is not None:
+            limiter.acquire(self._sleep, deadline)
+
+    def _attempt(
+        self,
+        method: str,
+        url: str,
+        breaker: CircuitBreaker = None,
+        on_send=None,
+        on_response=None,
+        deadline: float = None,
+        **kwargs
+    ) -> requests.Response:
+        """Send the request once and report its outcome to `breaker`.
+
+        Any error counts as a failure, so that a trial request can never
+        leave the circuit half-open, except for timeouts cut short by the
+        caller's `deadline`: they say nothing about the host.
+        """
+        if on_send is not None:
+            on_send()
+        started = time.perf_counter()
+        try:
+            response = self.req.request(method, url, **kwargs)
+        except Exception as error:
+            if breaker is not None:
+                if isinstance(error, requests.Timeout) and _expired(deadline):
+                    breaker.record_aborted()
+                else:
+                    breaker.record_failure()
+            if on_response is not None:
+                on_response(error, time.perf_counter() - started)
+            raise
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        if on_response is not None:
+            on_response(response, time.perf_counter() - started)
+        return response
+
+    def _retry_delay(
+        self, method: str, attempt: int, response: requests.Response, deadline: float = None
+    ):
+        """Return how long to wait before retrying, None to return `response`."""
+        if response.status_code not in self.retry.statuses:
+            return None
+        if not self.retry.can_retry(method, attempt):
+            return None
+        delay = self.retry.backoff(attempt, response)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _wait(self, delay: float, deadline: float = None, error: Exception = None):
+        """Sleep before retrying, unless it would overrun `deadline`."""
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise DeadlineExceeded("deadline exceeded while retrying") from error
+        self._sleep(delay)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+__all__ = ("RetryPolicy", "TokenBucket", "CircuitBreaker", "Transport", "host_name")
@@ -0,0 +1,106 @@
+"""Helpers shared by the wrappers and their companions."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, List, Tuple
+
+
+_DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S%z",
+)
+
+
+def parse_datetime(value) -> datetime:
+    """Parse a date as returned by ETNA's APIs.
+
+    Accepts ISO 8601 strings, the `2019-05-6 10:00` format used by the
+    intranet and UNIX timestamps. None is returned as is.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError("unknown date format: {!r}".format(value))
+
+
+def extract_items(payload) -> List[Any]:
+    """Return the list of items held by an API response.
+
+    Lists are returned as is, search-like responses are unwrapped from
+    their `hits` (or `data`) key and any other payload is considered as
+    a single item.
+    """
+    if payload is None:
+        return []
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in ("hits", "data"):
+            if isinstance(payload.get(key), list):
+                return payload[key]
+    return [payload]
+
+
+def iter_pages(
+    fetch_page: Callable[[int], List[Any]],
+    page_size: int = None,
+    page_count: int = None,
+    prefetch: bool = False,
+) -> Iterator[Any]:
+    """Yield the items of the pages returned by `fetch_page(page_number)`.
+
+    When `page_count` is set, exactly `page_count` pages are fetched.
+    Otherwise iteration stops on an empty page, or on a page shorter than
+    `page_size` when it is set. With `prefetch`, the next page is
+    requested in a background thread while the current one is consumed.
+    """
+    def is_last(number: int, page: list) -> bool:
+        if page_count is not None:
+            return number + 1 >= page_count
+        return not page or (page_size is not None and len(page) < page_size)
+
+    if page_count == 0:
+        return
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        number = 0
+        pending = executor.submit(fetch_page, number) if prefetch else None
+        while True:
+            page = pending.result() if prefetch else fetch_page(number)
+            last = is_last(number, page)
+            number += 1
+            if prefetch and not last:
+                pending = executor.submit(fetch_page, number)
+            yield from page
+            if last:
+                return
+
+
+def iter_windows(start: date, end: date, window: timedelta) -> Iterator[Tuple[date, date]]:
+    """Split the inclusive `start`-`end` range in consecutive days windows.
+
+    >>> windows = iter_windows(date(2020, 1, 1), date(2020, 1, 10), timedelta(days=7))
+    >>> [(start.day, end.day) for start, end in windows]
+    [(1, 7), (8, 10)]
+    """
+    if window < timedelta(days=1):
+        raise ValueError("window must be at least one day long")
+    one_day = timedelta(days=1)
+    current = start
+    while current <= end:
+        window_end = min(current + window - one_day, end)
+        yield current, window_end
+        current = window_end + one_day
@@ -0,0 +1,255 @@
+"""Watch endpoints for new, changed and removed items.
+
+`Watcher` polls each watched endpoint on its own adaptive schedule: the
+interval doubles every time nothing changed, up to `max_interval`, and
+drops back to `min_interval` as soon as something did. Items are compared
+by id and by a hash of their content, and only the differences are
+emitted, to callbacks or through the `changes` async iterator.
+
+A source failing to poll is reported to the `on_error` callbacks (or
+logged when there is none) and retried later, backing off like an
+unchanged one; the other sources are polled as usual. A change callback
+raising is logged, and does not prevent the other callbacks and sources
+from running.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple
+
+from .utils import extract_items
+
+
+logger = logging.getLogger(__name__)
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+
+
+class Change(NamedTuple):
+    """A difference found by a `Watcher`."""
+
+    source: str
+    kind: str
+    id: Any
+    item: Any
+
+
+class AdaptiveSchedule:
+    """Polling interval backing off while nothing changes."""
+
+    def __init__(self, min_interval: float = 5, max_interval: float = 300, backoff: float = 2.0):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("expected 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+
+    def update(self, changed: bool) -> float:
+        """Return the next interval after a poll."""
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self.interval
+
+
+def _plain(item):
+    return item.to_dict() if hasattr(item, "to_dict") else item
+
+
+def _digest(item) -> str:
+    payload = json.dumps(_plain(item), sort_keys=True, default=str).encode()
+    return hashlib.sha1(payload).hexdigest()
+
+
+class _Source:
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Any],
+        schedule: AdaptiveSchedule,
+        removals: bool = True,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.schedule = schedule
+        self.removals = removals
+        self.state = None
+        self.due = 0.0
+
+    def diff(self, items: list) -> List[Change]:
+        state = {}
+        changes = []
+        for item in items:
+            digest = _digest(item)
+            identifier = item.get("id") if hasattr(item, "get") else None
+            if identifier is None:
+                identifier = digest
+            state[identifier] = digest
+            if self.state is None:
+                continue
+            previous = self.state.get(identifier)
+            if previous is None:
+                changes.append(Change(self.name, ADDED, identifier, item))
+            elif previous != digest:
+                changes.append(Change(self.name, CHANGED, identifier, item))
+        if self.state is not None and self.removals:
+            for identifier in self.state.keys() - state.keys():
+                changes.append(Change(self.name, REMOVED, identifier, None))
+        self.state = state
+        return changes
+
+
+class Watcher:
+    """Poll endpoints of `wrapper` and emit what changed.
+
+    The first poll of a source only records its items, unless
+    `emit_initial` is set, in which case they are all emitted as added.
+    """
+
+    def __init__(
+        self,
+        wrapper=None,
+        min_interval: float = 5,
+        max_interval: float = 300,
+        emit_initial: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.wrapper = wrapper
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.emit_initial = emit_initial
+        self._clock = clock
+        self._sleep = sleep
+        self._sources = {}
+        self._callbacks = []
+        self._error_callbacks = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def watch(
+        self,
+        name: str,
+        fetch: Callable[[], Any],
+        min_interval: float = None,
+        max_interval: float = None,
+        removals: bool = True,
+    ) -> "Watcher":
+        """Watch the items returned by `fetch()` under `name`.
+
+        Unset `removals` when `fetch` only returns a window of the items:
+        an item leaving the window is not gone, and is not reported.
+        """
+        schedule = AdaptiveSchedule(
+            min_interval if min_interval is not None else self.min_interval,
+            max_interval if max_interval is not None else self.max_interval,
+        )
+        source = _Source(name, fetch, schedule, removals)
+        if self.emit_initial:
+            source.state = {}
+        with self._lock:
+            self._sources[name] = source
+        return self
+
+    def watch_notifications(self, login: str = None, **kwargs) -> "Watcher":
+        name = "notifications:{}".format(login or self.wrapper.login)
+        return self.watch(name, lambda: self.wrapper.get_notifications(login=login), **kwargs)
+
+    def watch_tickets(self, **kwargs) -> "Watcher":
+        return self.watch("tickets", self.wrapper.get_tickets, **kwargs)
+
+    def watch_conversations(self, user_id: int, size: int = 50, **kwargs) -> "Watcher":
+        """Watch the `size` most recent conversations of `user_id`.
+
+        Conversations pushed out of the window are not reported as removed.
+        """
+        name = "conversations:{}".format(user_id)
+        kwargs.setdefault("removals", False)
+        return self.watch(
+            name, lambda: self.wrapper.get_conversations(user_id, start=0, size=size), **kwargs
+        )
+
+    def on_change(self, callback: Callable[[Change], None]) -> Callable[[Change], None]:
+        """Call `callback(change)` for every change, usable as a decorator."""
+        self._callbacks.append(callback)
+        return callback
+
+    def on_error(
+        self, callback: Callable[[str, Exception], None]
+    ) -> Callable[[str, Exception], None]:
+        """Call `callback(source, error)` when a source fails to poll."""
+        self._error_callbacks.append(callback)
+        return callback
+
+    def _poll_source(self, source: _Source) -> List[Change]:
+        try:
+            changes = source.diff(extract_items(source.fetch()))
+        except Exception as error:
+            source.schedule.update(False)
+            source.due = self._clock() + source.schedule.interval
+            self._report(source, error)
+            return []
+        source.schedule.update(bool(changes))
+        source.due = self._clock() + source.schedule.interval
+        for change in changes:
+            for callback in self._callbacks:
+                try:
+                    callback(change)
+                except Exception:
+                    logger.exception("change callback failed on %s", source.name)
+        return changes
+
+    def _report(self, source: _Source, error: Exception):
+        if not self._error_callbacks:
+            logger.warning("polling %s failed", source.name, exc_info=error)
+        for callback in self._error_callbacks:
+            callback(source.name, error)
+
+    def poll(self, force: bool = False) -> List[Change]:
+        """Poll the sources that are due (all of them with `force`)."""
+        now = self._clock()
+        with self._lock:
+            sources = [s for s in self._sources.values() if force or s.due <= now]
+        changes = []
+        for source in sources:
+            changes.extend(self._poll_source(source))
+        return changes
+
+    def next_poll(self) -> float:
+        """Return the number of seconds until the next source is due."""
+        with self._lock:
+            if not self._sources:
+                return self.max_interval
+            due = min(source.due for source in self._sources.values())
+        return max(0.0, due - self._clock())
+
+    def run(self):
+        """Poll until `stop` is called."""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            self.poll()
+            delay = self.next_poll()
+            if delay:
+                self._sleep(delay)
+
+    def stop(self):
+        self._stopped.set()
+
+    async def changes(self):
+        """Asynchronously iterate over the changes, polling in a thread."""
+        loop = asyncio.get_running_loop()
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            for change in await loop.run_in_executor(None, self.poll):
+                yield change
+            await asyncio.sleep(self.next_poll())
+
+
+__all__ = ("ADDED", "CHANGED", "REMOVED", "AdaptiveSchedule", "Change", "Watcher")
@@ -8,7 +8,9 @@ setup(
     name="etnawrapper",
     packages=["etnawrapper"],
     # TODO: Use requiremnts.txt
-    install_requires=['requests', 'click', 'arrow'],
+    install_requires=['requests', 'click'],
+    extras_require={'async': ['aiohttp']},
+    python_requires=">=3.7",
     version=__version__,
     description="API wrapper for ETNA' APIs",
     author="Theo 'Bob' Massard",
@@ -22,6 +24,8 @@ setup(
         "Intended Audience :: System Administrators",
         "Operating System :: OS Independent",
         "Programming Language :: Python",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
     ],
     entry_points={"console_scripts": ["etna=etnawrapper.client:main"]},
 )
@@ -12,5 +12,5 @@ def login():
 @responses.activate
 @pytest.fixture(scope='session')
 def client():
-    responses.add(responses.POST, constants.AUTH_URL)
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc'})
     return etna.EtnaWrapper('test_u', 'password')
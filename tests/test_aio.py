@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from etnawrapper import aio, constants
+from etnawrapper.cache import MemoryCache
+from etnawrapper.errors import BadStatusException
+
+
+class FakeResponse:
+    def __init__(self, payload, status=200):
+        self._payload = payload
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def json(self, content_type=None):
+        await asyncio.sleep(0.01)
+        return self._payload
+
+    async def read(self):
+        return b'raw'
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs.get('params')))
+        self.timeout = kwargs.get('timeout')
+        session = self
+
+        class _Tracked(FakeResponse):
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, session.in_flight)
+                return self
+
+            async def __aexit__(self, *exc):
+                session.in_flight -= 1
+
+        return _Tracked({'url': url}, status=404 if 'missing' in url else 200)
+
+
+def test_async_wrapper_mirrors_sync_urls():
+    session = FakeSession()
+    client = aio.AsyncEtnaWrapper('test_u', cookies={'jwt': 'abc'}, session=session)
+
+    async def run():
+        infos = await client.get_user_info(42)
+        grades = await client.get_grades(7)
+        picture = await client.get_picture()
+        return infos, grades, picture
+
+    infos, grades, picture = asyncio.run(run())
+    assert infos['url'] == constants.USER_INFO_URL.format(user_id=42)
+    assert grades['url'] == constants.GRADES_URL.format(promo_id=7, login='test_u')
+    assert picture == b'raw'
+
+    with pytest.raises(ValueError):
+        aio.AsyncEtnaWrapper('sample', None)
+
+
+def test_async_wrapper_bounded_concurrency():
+    session = FakeSession()
+
+    async def run():
+        client = aio.AsyncEtnaWrapper(
+            'test_u', cookies={}, session=session, concurrency=3,
+        )
+        return await asyncio.gather(*(client.get_logs(f'user_{i}') for i in range(20)))
+
+    results = asyncio.run(run())
+    assert len(results) == 20
+    assert results[5]['url'] == constants.GSA_LOGS_URL.format(login='user_5')
+    assert session.max_in_flight == 3
+
+
+def test_async_wrapper_errors_timeouts_and_cache():
+    session = FakeSession()
+    client = aio.AsyncEtnaWrapper(
+        'test_u', cookies={'jwt': 'abc'}, session=session, cache=MemoryCache(),
+    )
+
+    async def run():
+        with pytest.raises(BadStatusException) as error:
+            await client.get_logs('missing')
+        assert error.value.status_code == 404
+        await client.get_user_info()
+        assert session.timeout.sock_read == constants.TIMEOUTS[constants.IDENTITY_URL][1]
+        await client.get_user_info()
+
+    asyncio.run(run())
+    assert len(session.calls) == 2
+
+
+class _Morsel:
+    def __init__(self, value):
+        self.value = value
+
+
+class LoginSession(FakeSession):
+    def __init__(self, cookies):
+        super().__init__()
+        self.logins = 0
+        self.cookies = cookies
+
+    def post(self, url, **kwargs):
+        self.logins += 1
+        response = FakeResponse({})
+        response.cookies = {key: _Morsel(value) for key, value in self.cookies.items()}
+        return response
+
+
+def test_async_wrapper_built_outside_of_the_loop():
+    session = LoginSession({'authenticator': 'abc'})
+    client = aio.AsyncEtnaWrapper('test_u', 'password', session=session, concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(client.get_user_info(i) for i in range(5)))
+
+    assert len(asyncio.run(run())) == 5
+    assert session.logins == 1
+    # a wrapper can be used again from another loop
+    assert len(asyncio.run(run())) == 5
+
+    client = aio.AsyncEtnaWrapper('test_u', 'password', session=LoginSession({}))
+    with pytest.raises(BadStatusException):
+        asyncio.run(client.get_user_info())
+
+
+def test_async_wrapper_writes_invalidate_the_cache():
+    session = FakeSession()
+    client = aio.AsyncEtnaWrapper(
+        'test_u', cookies={'jwt': 'abc'}, session=session, cache=MemoryCache(),
+    )
+
+    async def run():
+        await client.get_tickets()
+        await client.close_ticket(1)
+        await client.get_tickets()
+
+    asyncio.run(run())
+    assert [method for method, _, _ in session.calls] == ['GET', 'DELETE', 'GET']
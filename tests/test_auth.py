@@ -0,0 +1,93 @@
+import base64
+import json
+import os
+import time
+
+import pytest
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.auth import AuthManager, FileTokenStore, MemoryTokenStore
+from etnawrapper.errors import BadStatusException, DeadlineExceeded
+
+
+def _jwt(expires):
+    claims = base64.urlsafe_b64encode(json.dumps({'exp': expires}).encode()).decode()
+    return 'header.{}.signature'.format(claims.rstrip('='))
+
+
+@responses.activate
+def test_cookies_are_persisted(tmp_path):
+    path = os.path.join(str(tmp_path), 'tokens.json')
+    token = _jwt(time.time() + 3600)
+    responses.add(
+        responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=' + token},
+    )
+
+    first = etna.EtnaWrapper('test_u', 'password', token_store=FileTokenStore(path))
+    second = etna.EtnaWrapper('test_u', token_store=FileTokenStore(path))
+    assert first._cookies == second._cookies == {'authenticator': token}
+    assert len(responses.calls) == 1
+    assert oct(os.stat(path).st_mode & 0o777) == '0o600'
+
+
+@responses.activate
+def test_expiring_cookies_are_refreshed():
+    responses.add(
+        responses.POST, constants.AUTH_URL,
+        headers={'Set-Cookie': 'authenticator=' + _jwt(time.time() + 60)},
+    )
+    manager = AuthManager('test_u', 'password', refresh_margin=300)
+    manager.cookies()
+    manager.cookies()
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_unauthorized_request_is_replayed():
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=a'})
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=b'})
+    client = etna.EtnaWrapper('test_u', 'password')
+    responses.add(responses.GET, constants.IDENTITY_URL, status=401)
+    responses.add(responses.GET, constants.IDENTITY_URL, json={'login': 'test_u'})
+
+    assert client.get_user_info() == {'login': 'test_u'}
+    assert client._cookies == {'authenticator': 'b'}
+    assert responses.calls[3].request.headers['Cookie'] == 'authenticator=b'
+
+
+@responses.activate
+def test_refused_authentication_is_not_stored():
+    responses.add(responses.POST, constants.AUTH_URL, status=401)
+    responses.add(responses.POST, constants.AUTH_URL)
+    store = MemoryTokenStore()
+    manager = AuthManager('test_u', 'wrong', store=store)
+
+    for expected in (401, 200):
+        with pytest.raises(BadStatusException) as error:
+            manager.cookies()
+        assert error.value.status_code == expected
+    assert store.load('test_u') is None
+
+
+@responses.activate
+def test_authentication_is_bounded_by_the_deadline():
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=a'})
+    manager = AuthManager('test_u', 'password')
+
+    manager.refresh(deadline=time.monotonic() + 0.5)
+    assert responses.calls[0].request.req_kwargs['timeout'][1] <= 0.5
+    with pytest.raises(DeadlineExceeded):
+        manager.refresh(stale={'authenticator': 'a'}, deadline=time.monotonic() - 1)
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_unreadable_jwt_expiry_falls_back_to_lifetime():
+    claims = base64.urlsafe_b64encode(json.dumps({'exp': 'soon'}).encode()).decode()
+    token = 'header.{}.signature'.format(claims.rstrip('='))
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=' + token})
+    manager = AuthManager('test_u', 'password', lifetime=600)
+
+    assert manager.cookies() == {'authenticator': token}
+    assert time.time() + 590 < manager._record['expires'] <= time.time() + 600
@@ -0,0 +1,33 @@
+import responses
+
+from etnawrapper import etna, constants
+
+
+@responses.activate
+def test_batch_grades():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    for login in ('a', 'b'):
+        url = constants.GRADES_URL.format(promo_id=7, login=login)
+        responses.add(responses.GET, url, json=[{'login': login}])
+    failing = constants.GRADES_URL.format(promo_id=7, login='c')
+    responses.add(responses.GET, failing, body=ValueError('boom'))
+
+    results = client.batch(max_workers=4).get_grades(7, logins=['a', 'c', 'b', 'a'])
+    assert [result.key for result in results] == ['a', 'c', 'b', 'a']
+    assert results[0].value == [{'login': 'a'}]
+    assert results[2].value == [{'login': 'b'}]
+    assert not results[1].ok
+    assert isinstance(results[1].error, ValueError)
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_batch_keeps_the_deadline():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    for user_id in (1, 2):
+        responses.add(responses.GET, constants.USER_INFO_URL.format(user_id=user_id), json={})
+
+    with client.deadline(0.5):
+        results = client.batch(max_workers=2).get_user_info([1, 2])
+    assert all(result.ok for result in results)
+    assert all(call.request.req_kwargs['timeout'][1] <= 0.5 for call in responses.calls)
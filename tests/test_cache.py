@@ -0,0 +1,100 @@
+import os
+import threading
+
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.cache import MemoryCache, DiskCache
+
+
+def test_memory_cache_lru():
+    cache = MemoryCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') is None
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'size': 1}
+
+
+def test_cache_counters_are_thread_safe():
+    cache = MemoryCache()
+    cache.set('a', 1)
+
+    def read():
+        for _ in range(1000):
+            cache.get('a')
+            cache.get('b')
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats() == {'hits': 8000, 'misses': 8000, 'size': 1}
+
+
+def test_disk_cache(tmp_path):
+    path = os.path.join(str(tmp_path), 'cache.sqlite')
+    cache = DiskCache(path, maxsize=2)
+    cache.set('tpl a', {'a': 1})
+    cache.set('tpl b', [2])
+    cache.get('tpl a')
+    cache.set('other c', 3)
+    assert len(cache) == 2
+    assert cache.get('tpl b') is None
+    cache.close()
+
+    cache = DiskCache(path, maxsize=2)
+    assert cache.get('tpl a') == {'a': 1}
+    cache.invalidate('tpl ')
+    assert cache.get('tpl a') is None
+    assert cache.get('other c') == 3
+
+
+@responses.activate
+def test_wrapper_cache():
+    cache = MemoryCache()
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'}, cache=cache)
+    info_url = constants.USER_INFO_URL.format(user_id=12)
+    responses.add(responses.GET, info_url, json={'id': 12})
+    responses.add(responses.GET, constants.TICKETS_URL, json=[])
+    responses.add(responses.OPTIONS, constants.TICKETS_URL)
+    responses.add(responses.POST, constants.TICKETS_URL, json={'id': 1})
+
+    assert client.get_user_info(12) == {'id': 12}
+    assert client.get_user_info(12) == {'id': 12}
+    assert len(responses.calls) == 1
+    assert cache.hits == 1
+
+    # endpoints without ttl are not cached
+    client.get_tickets()
+    client.get_tickets()
+    assert len(responses.calls) == 3
+
+    client.cache_ttls[constants.TICKETS_URL] = 60
+    client.get_tickets()
+    client.get_tickets()
+    assert len(responses.calls) == 4
+    client.open_ticket('title', 'message')
+    client.get_tickets()
+    assert len(responses.calls) == 7
+
+
+@responses.activate
+def test_conditional_requests():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    url = constants.PROMOTION_URL.format(promo_id=42)
+    responses.add(
+        responses.GET, url, json=[{'login': 'test_u'}], headers={'ETag': '"v1"'},
+    )
+    responses.add(responses.GET, url, status=304)
+
+    first = client.get_students(42)
+    second = client.get_students(42)
+    assert second == first == [{'login': 'test_u'}]
+    assert 'If-None-Match' not in responses.calls[0].request.headers
+    assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
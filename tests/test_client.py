@@ -0,0 +1,136 @@
+import responses
+from click.testing import CliRunner
+
+from etnawrapper import client as cli_client, constants
+
+
+ACTIVITIES = {
+    'Module': {
+        'project': [{'name': 'Project', 'date_end': '2021-04-30'}],
+        'quest': [{
+            'name': 'Quest',
+            'date_end': '2099-04-01',
+            'stages': [
+                {'name': 'Past stage', 'end': '2001-01-01 10:00'},
+                {'name': 'Next stage', 'end': '2099-01-01 10:00'},
+            ],
+        }],
+    },
+}
+
+
+def _configure(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli_client, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cli_client, 'TOKEN_STORE_PATH', str(tmp_path / 'tokens.json'))
+    monkeypatch.setattr(cli_client, 'RESPONSE_CACHE_PATH', str(tmp_path / 'responses.sqlite'))
+    monkeypatch.setenv('ETNA_USER', 'test_u')
+    monkeypatch.setenv('ETNA_PASS', 'password')
+    cli_client.cli.add_command(cli_client.activities)
+
+
+@responses.activate
+def test_activities_cached_and_offline(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    responses.add(
+        responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc; Path=/'},
+    )
+    responses.add(
+        responses.GET, constants.ACTIVITY_URL.format(login='test_u'), json=ACTIVITIES,
+    )
+    runner = CliRunner()
+
+    result = runner.invoke(cli_client.cli, ['activities', 'list'])
+    assert result.exit_code == 0, result.output
+    assert 'Next stage' in result.output
+    assert 'Past stage' not in result.output
+    assert len(responses.calls) == 2
+
+    # fresh enough: neither login nor request
+    result = runner.invoke(cli_client.cli, ['--max-age', '60', 'activities'])
+    assert result.exit_code == 0, result.output
+    assert len(responses.calls) == 2
+
+    result = runner.invoke(cli_client.cli, ['--max-age', '0', 'activities'])
+    assert len(responses.calls) == 3
+
+    result = runner.invoke(cli_client.cli, ['--offline', 'activities', 'list', '--full'])
+    assert result.exit_code == 0, result.output
+    assert 'Past stage' in result.output
+    assert len(responses.calls) == 3
+
+
+def test_offline_without_cache(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    result = CliRunner().invoke(cli_client.cli, ['--offline', 'activities'])
+    assert result.exit_code == 1
+    assert 'offline' in result.output
+
+
+@responses.activate
+def test_conversations_only_fetch_displayed_authors(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    cli_client.cli.add_command(cli_client.conversations)
+    responses.add(
+        responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc; Path=/'},
+    )
+    responses.add(responses.GET, constants.IDENTITY_URL, json={'id': 1, 'login': 'test_u'})
+    hits = [
+        {
+            'title': 'Subject {}'.format(index),
+            'metas': {'wall-name': 'wall'},
+            'last_message': {'user': 7, 'content': 'hello'},
+        }
+        for index in range(2)
+    ]
+    responses.add(
+        responses.GET, constants.CONVERSATIONS_URL.format(user_id=1), json={'hits': hits},
+    )
+    user = {'id': 7, 'login': 'author_x', 'firstname': 'Ada', 'lastname': 'Byron'}
+    responses.add(responses.GET, constants.USER_PROMO_URL, status=404)
+    responses.add(responses.GET, constants.USER_INFO_URL.format(user_id=7), json=user)
+
+    result = CliRunner().invoke(cli_client.cli, ['conversations', 'list', '--count', '2'])
+    assert result.exit_code == 0, result.output
+    assert result.output.count('author_x - Ada Byron') == 2
+    assert len(responses.calls) == 5
+
+
+@responses.activate
+def test_conversations_resolve_authors_from_the_trombi(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    cli_client.cli.add_command(cli_client.conversations)
+    responses.add(
+        responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc; Path=/'},
+    )
+    responses.add(responses.GET, constants.IDENTITY_URL, json={'id': 1, 'login': 'test_u'})
+    hits = [
+        {
+            'title': 'Subject {}'.format(index),
+            'metas': {'wall-name': 'wall'},
+            'last_message': {'user': index, 'content': 'hello'},
+        }
+        for index in range(100)
+    ]
+    responses.add(
+        responses.GET, constants.CONVERSATIONS_URL.format(user_id=1), json={'hits': hits},
+    )
+    students = [
+        {'id': index, 'login': 'student_{}'.format(index), 'firstname': 'A', 'lastname': 'B'}
+        for index in range(100)
+    ]
+    responses.add(responses.GET, constants.USER_PROMO_URL, json=[{'id': 42}])
+    responses.add(responses.GET, constants.PROMOTION_URL.format(promo_id=42), json=students)
+
+    result = CliRunner().invoke(cli_client.cli, ['conversations', 'list', '--count', '100'])
+    assert result.exit_code == 0, result.output
+    assert 'student_99 - A B' in result.output
+    # login, identity, conversations, then the promotion and its trombi
+    assert len(responses.calls) == 5
+
+
+def test_get_wrapper_outside_of_a_command(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    with responses.RequestsMock() as mock:
+        mock.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc'})
+        wrapper = cli_client.get_wrapper()
+    assert wrapper.login == 'test_u'
@@ -0,0 +1,94 @@
+import threading
+
+import responses
+
+from etnawrapper import etna, constants
+
+
+def _declaration(module, start, end, text='Objectifs: tests'):
+    return module, {'module': module, 'declaration': {'start': start, 'end': end, 'content': text}}
+
+
+@responses.activate
+def test_declare_logs():
+    client = etna.EtnaWrapper('test_u', cookies={})
+    responses.add(
+        responses.GET, constants.DECLARATIONS_URL.format(login='test_u'),
+        json=[{'module': 1, 'start': '2021-03-01 09:00', 'end': '2021-03-01 12:00'}],
+    )
+    url = constants.DECLARATION_URL.format(module_id=1)
+    responses.add(responses.OPTIONS, url)
+    responses.add(responses.POST, url, json={'declared': True})
+
+    results = client.declare_logs([
+        _declaration(1, '2021-03-01 09:00', '2021-03-01 12:00'),
+        _declaration(1, '2021-03-02 09:00', '2021-03-02 12:00'),
+        _declaration(1, '2021-03-03 09:00', '2021-03-03 12:00'),
+        _declaration(1, '2021-03-03 09:00', '2021-03-03 12:00'),
+        _declaration(1, '2021-03-04 12:00', '2021-03-04 09:00'),
+    ])
+    assert [result.status for result in results] == [
+        'duplicate', 'declared', 'declared', 'duplicate', 'invalid',
+    ]
+    assert results[1].value == {'declared': True}
+    methods = [call.request.method for call in responses.calls]
+    assert methods.count('OPTIONS') == 1
+    assert methods.count('POST') == 2
+
+
+@responses.activate
+def test_declare_logs_dry_run():
+    client = etna.EtnaWrapper('test_u', cookies={})
+    responses.add(responses.GET, constants.DECLARATIONS_URL.format(login='test_u'), json=[])
+
+    results = client.declare_logs(
+        [_declaration(1, '2021-03-02 09:00', '2021-03-02 12:00')], dry_run=True,
+    )
+    assert results[0].status == 'valid'
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_preflights_of_different_modules_do_not_wait_for_each_other():
+    client = etna.EtnaWrapper('test_u', cookies={})
+    slow, fast = constants.DECLARATION_URL.format(module_id=1), constants.DECLARATION_URL.format(module_id=2)
+    released = threading.Event()
+
+    def wait(request):
+        released.wait(5)
+        return 200, {}, ''
+
+    responses.add_callback(responses.OPTIONS, slow, callback=wait)
+    responses.add(responses.OPTIONS, fast)
+    thread = threading.Thread(target=client._preflight, args=(slow,))
+    thread.start()
+    try:
+        client._preflight(fast)
+        assert fast in client._preflighted
+        assert slow not in client._preflighted
+    finally:
+        released.set()
+        thread.join()
+
+
+@responses.activate
+def test_declare_logs_mixed_timezones_and_failures():
+    client = etna.EtnaWrapper('test_u', cookies={})
+    declarations = [
+        _declaration(1, '2021-03-02T09:00:00+01:00', '2021-03-02T12:00:00+01:00'),
+        _declaration(2, '2021-03-03 09:00', '2021-03-03 12:00'),
+    ]
+    listing = constants.DECLARATIONS_URL.format(login='test_u')
+    responses.add(responses.GET, listing, status=404)
+
+    results = client.declare_logs(declarations)
+    assert [result.status for result in results] == ['failed', 'failed']
+    assert results[0].error.status_code == 404
+
+    responses.replace(responses.GET, listing, json=[])
+    for module in (1, 2):
+        url = constants.DECLARATION_URL.format(module_id=module)
+        responses.add(responses.OPTIONS, url, status=405)
+        responses.add(responses.POST, url, json={'declared': True})
+    results = client.declare_logs(declarations)
+    assert [result.status for result in results] == ['declared', 'declared']
@@ -0,0 +1,51 @@
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.directory import Directory
+
+
+STUDENTS = [
+    {'id': 1, 'login': 'massar_t', 'firstname': 'Theo', 'lastname': 'Massard'},
+    {'id': 2, 'login': 'doe_j', 'firstname': 'John', 'lastname': 'Doe'},
+    {'id': 3, 'login': 'doe_m', 'firstname': 'Marie', 'lastname': 'Doe'},
+]
+
+
+@responses.activate
+def test_directory_lookups():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    responses.add(responses.GET, constants.PROMOTION_URL.format(promo_id=42), json=STUDENTS)
+    directory = Directory(client)
+    assert directory.load(42) == 3
+    assert directory.load(42) == 0
+    assert len(responses.calls) == 1
+
+    assert directory.get(2)['login'] == 'doe_j'
+    assert directory.by_login('massar_t')['id'] == 1
+    assert [user['id'] for user in directory.search('doe')] == [2, 3]
+    assert [user['id'] for user in directory.search('Marie D')] == [3]
+    assert [user['id'] for user in directory.search('th')] == [1]
+    assert directory.search('doe', limit=1) == [STUDENTS[1]]
+
+    directory.add(dict(STUDENTS[1], login='doe_john'))
+    assert directory.by_login('doe_j') is None
+    assert [user['login'] for user in directory.search('doe_')] == ['doe_john', 'doe_m']
+
+
+@responses.activate
+def test_directory_resolve():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    responses.add(responses.GET, constants.PROMOTION_URL.format(promo_id=42), json=STUDENTS)
+    responses.add(
+        responses.GET, constants.USER_INFO_URL.format(user_id=7),
+        json={'id': 7, 'login': 'staff', 'firstname': 'Ada', 'lastname': 'Staff'},
+    )
+    responses.add(responses.GET, constants.USER_INFO_URL.format(user_id=8), status=404)
+    directory = Directory(client)
+    directory.load(42)
+
+    authors = directory.resolve([1, 7, 2, 7, 8, 1])
+    assert sorted(authors) == [1, 2, 7]
+    assert len(responses.calls) == 3
+    directory.resolve([7, 1])
+    assert len(responses.calls) == 3
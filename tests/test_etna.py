@@ -7,18 +7,18 @@ from etnawrapper import etna, constants
 
 @responses.activate
 def test_wrapper_class():
-    responses.add(responses.POST, constants.AUTH_URL)
-    client = etna.EtnaWrapper("test_u", "password")
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc'})
+    client = etna.EtnaWrapper("test_u", "password", use_session=False)
     assert client is not None
     assert isinstance(client._req, type(requests))
 
-    client = etna.EtnaWrapper("test_u", "password", use_session=True)
+    client = etna.EtnaWrapper("test_u", "password")
     assert client is not None
     assert isinstance(client._req, requests.Session)
 
     # display
     _s = str(client)
-    assert _s == "<etnawrapper.etna.EtnaWrapper(login='test_u', cookies={})>"
+    assert _s == "<etnawrapper.etna.EtnaWrapper(login='test_u', cookies={'authenticator': 'abc'})>"
 
     # missing password
     with pytest.raises(ValueError):
@@ -39,6 +39,21 @@ def test_wrapper_class():
         client == 42
 
 
+@responses.activate
+def test_pooled_session(monkeypatch):
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc'})
+
+    def _unpooled(*args, **kwargs):
+        raise AssertionError("authentication bypassed the session")
+
+    monkeypatch.setattr(requests, 'post', _unpooled)
+    client = etna.EtnaWrapper("test_u", "password", pool_maxsize=32, max_retries=3)
+    adapter = client._req.get_adapter(constants.AUTH_URL)
+    assert adapter._pool_maxsize == 32
+    assert adapter.max_retries.total == 3
+    assert responses.calls[0].request.url == constants.AUTH_URL
+
+
 @responses.activate
 def test_declaration(client: etna.EtnaWrapper, login: str):
     m_id, a_id = 18, 22
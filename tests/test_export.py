@@ -0,0 +1,55 @@
+import os
+
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.auth import FileTokenStore
+from etnawrapper.export import ExportJob, Unit, plan, read_export
+
+
+STUDENTS = [{'id': 1, 'login': 'a'}, {'id': 2, 'login': 'b'}]
+
+
+@responses.activate
+def test_export_resumes(tmp_path):
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    responses.add(responses.GET, constants.PROMOTION_URL.format(promo_id=42), json=STUDENTS)
+    responses.add(responses.GET, constants.GRADES_URL.format(login='a', promo_id=42), json=[1])
+    responses.add(responses.GET, constants.GRADES_URL.format(login='b', promo_id=42), status=404)
+    responses.add(responses.GET, constants.GRADES_URL.format(login='b', promo_id=42), json=[2])
+    responses.add(
+        responses.GET, constants.GROUPS_URL.format(module_id=3, project_id=4), json=[{'id': 9}],
+    )
+    units = plan(client, [42], kinds=['grades'], groups=['3:4'])
+    assert units == [
+        Unit('grades', 42, 'a'), Unit('grades', 42, 'b'), Unit('groups', 42, '3:4'),
+    ]
+
+    output = str(tmp_path / 'export')
+    job = ExportJob(output, 'test_u', {'jwt': 'abc'}, processes=0, chunk_size=2)
+    summary = job.run(units)
+    assert summary == {'skipped': 0, 'exported': 2, 'failed': 1, 'files': 2}
+
+    summary = ExportJob(output, 'test_u', {'jwt': 'abc'}, processes=0).run(units)
+    assert summary == {'skipped': 2, 'exported': 1, 'failed': 0, 'files': 1}
+    records = sorted(read_export(output), key=lambda record: record['key'])
+    assert [(record['kind'], record['key'], record['data']) for record in records] == [
+        ('groups', '3:4', [{'id': 9}]), ('grades', 'a', [1]), ('grades', 'b', [2]),
+    ]
+    assert not [name for name in os.listdir(output) if name.endswith('.tmp')]
+
+
+@responses.activate
+def test_export_workers_log_in_again(tmp_path):
+    store = str(tmp_path / 'tokens.json')
+    FileTokenStore(store).save('test_u', {'cookies': {'authenticator': 'old'}, 'expires': 1e12})
+    responses.add(responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=new'})
+    url = constants.GRADES_URL.format(login='a', promo_id=42)
+    responses.add(responses.GET, url, status=401)
+    responses.add(responses.GET, url, json=[1])
+
+    output = str(tmp_path / 'export')
+    job = ExportJob(output, 'test_u', password='password', token_store_path=store, processes=0)
+    assert job.run([Unit('grades', 42, 'a')])['exported'] == 1
+    assert responses.calls[2].request.headers['Cookie'] == 'authenticator=new'
+    assert FileTokenStore(store).load('test_u')['cookies'] == {'authenticator': 'new'}
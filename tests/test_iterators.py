@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+import responses
+from responses import matchers
+
+from etnawrapper import etna, constants
+
+
+@responses.activate
+def test_iter_conversations():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    url = constants.CONVERSATIONS_URL.format(user_id=1)
+    pages = [[{'id': 1}, {'id': 2}], [{'id': 3}, {'id': 4}], [{'id': 5}]]
+    for number, hits in enumerate(pages):
+        responses.add(
+            responses.GET, url, json={'hits': hits},
+            match=[matchers.query_param_matcher({'from': str(number * 2), 'size': '2'})],
+        )
+
+    conversations = client.iter_conversations(1, page_size=2, prefetch=True)
+    assert next(conversations) == {'id': 1}
+    assert [c['id'] for c in conversations] == [2, 3, 4, 5]
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_iter_declarations():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    url = constants.DECLARATIONS_URL.format(login='test_u')
+    windows = [
+        ('2020-01-01', '2020-01-07', [{'id': 1}]),
+        ('2020-01-08', '2020-01-14', []),
+        ('2020-01-15', '2020-01-16', [{'id': 2}]),
+    ]
+    for start, end, declarations in windows:
+        responses.add(
+            responses.GET, url, json=declarations,
+            match=[matchers.query_param_matcher({'start': start, 'end': end})],
+        )
+
+    declarations = client.iter_declarations(
+        date(2020, 1, 1), date(2020, 1, 16), window=timedelta(days=7),
+    )
+    assert [d['id'] for d in declarations] == [1, 2]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.jsonstream import ItemsParser, iter_json_items
+
+
+@pytest.mark.parametrize('document, expected', [
+    ([1, 2.5, "a]b", {"x": [1, {"y": "}"}]}, None], None),
+    ({"total": 2, "meta": {"hits": 0}, "hits": [{"id": 1}, {"id": 2}]}, [{"id": 1}, {"id": 2}]),
+    ({"id": 1}, [{"id": 1}]),
+    ([], None),
+])
+def test_iter_json_items(document, expected):
+    text = json.dumps(document, indent=2).encode()
+    for size in (1, 3, 1024):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert list(iter_json_items(chunks)) == (expected if expected is not None else document)
+
+
+def test_items_are_yielded_early():
+    parser = ItemsParser()
+    assert parser.feed('{"hits": [{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(': 2}, 12') == [{"id": 2}]
+    assert parser.feed('3]}') == [123]
+    assert parser.close() == []
+
+
+def test_large_items_are_decoded_once(monkeypatch):
+    calls = []
+    decoder = json.JSONDecoder()
+
+    class CountingDecoder:
+        def raw_decode(self, text, pos):
+            calls.append(pos)
+            return decoder.raw_decode(text, pos)
+
+    monkeypatch.setattr('etnawrapper.jsonstream._DECODER', CountingDecoder())
+    item = {"name": "x\\\"]}" * 200, "values": [[i, {"i": i}] for i in range(200)]}
+    text = json.dumps({"hits": [item, 12.5, "s"]})
+    parser = ItemsParser()
+    items = []
+    for index in range(0, len(text), 7):
+        items += parser.feed(text[index:index + 7])
+    assert items + parser.close() == [item, 12.5, "s"]
+    # one decoding per item, plus the "hits" key
+    assert len(calls) == 4
+
+
+@responses.activate
+def test_streamed_query():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    url = constants.PROMOTION_URL.format(promo_id=42)
+    students = [{'login': 'student_{}'.format(i)} for i in range(100)]
+    responses.add(responses.GET, url, json={'hits': students})
+
+    result = client.get_students(42, stream=True)
+    assert not isinstance(result, (list, dict))
+    assert list(result) == students
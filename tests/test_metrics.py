@@ -0,0 +1,36 @@
+import requests
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.cache import MemoryCache
+from etnawrapper.metrics import PrometheusExporter
+from etnawrapper.transport import RetryPolicy, Transport
+
+
+@responses.activate
+def test_metrics_and_hooks():
+    transport = Transport(requests.Session(), retry=RetryPolicy(total=1), sleep=lambda _: None)
+    client = etna.EtnaWrapper('test_u', cookies={}, cache=MemoryCache(), transport=transport)
+    calls = []
+    client.add_hook('before_request', lambda method, url, template: calls.append(template))
+    url = constants.USER_INFO_URL.format(user_id=1)
+    responses.add(responses.GET, url, status=502)
+    responses.add(responses.GET, url, json={'id': 1})
+
+    client.get_user_info(1)
+    client.get_user_info(1)
+
+    stats = client.stats()[constants.USER_INFO_URL]
+    assert calls == [constants.USER_INFO_URL] * 2
+    assert stats['requests'] == 2
+    assert stats['statuses'] == {502: 1, 200: 1}
+    assert stats['retries'] == 1
+    assert stats['cache_hits'] == 1
+    assert stats['cache_misses'] == 1
+    assert stats['bytes_received'] == len(b'{"id": 1}')
+    assert stats['decode_time']['count'] == 1
+
+    exporter = PrometheusExporter()
+    client.metrics.export(exporter)
+    line = 'etnawrapper_requests_total{{endpoint="{}"}} 2'.format(constants.USER_INFO_URL)
+    assert line in exporter.last.splitlines()
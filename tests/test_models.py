@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import responses
+
+from etnawrapper import etna, constants, models
+
+
+def test_model_mapping_compatibility():
+    conversation = models.Conversation({
+        'id': 3,
+        'title': 'Hello',
+        'last_message': {'user': 12, 'content': 'hi', 'created_at': '2021-04-07 23:38:36'},
+        'metas': {'wall-name': 'students'},
+        'unknown': True,
+    })
+    assert not hasattr(conversation, '__dict__')
+    assert conversation['last_message']['user'] == 12
+    assert conversation['metas']['wall-name'] == 'students'
+    assert conversation['unknown'] is True
+    assert conversation.get('missing') is None
+    assert conversation.last_message.created_at == datetime(2021, 4, 7, 23, 38, 36)
+    assert conversation['last_message']['created_at'] == '2021-04-07 23:38:36'
+    assert conversation.to_dict()['last_message'] == {
+        'user': 12, 'content': 'hi', 'created_at': '2021-04-07 23:38:36',
+    }
+
+
+@responses.activate
+def test_wrapper_models():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'}, models=True)
+    url = constants.ACTIVITY_URL.format(login='test_u')
+    responses.add(responses.GET, url, json={
+        'Module': {
+            'project': [],
+            'quest': [{'name': 'Q', 'stages': [{'name': 'S', 'end': '2021-01-02 10:00'}]}],
+        },
+    })
+
+    activities = client.get_current_activities()
+    stage = activities['Module']['quest'][0]['stages'][0]
+    assert isinstance(stage, models.Stage)
+    assert stage.end == datetime(2021, 1, 2, 10)
@@ -0,0 +1,54 @@
+import os
+
+import responses
+from responses import matchers
+
+from etnawrapper import etna, constants
+
+
+PHOTO = b'\xff\xd8\xff\xe0 jpeg'
+
+
+@responses.activate
+def test_pictures_fetch_and_revalidate(tmp_path):
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    url = constants.PICTURE_URL.format(login='test_u')
+    responses.add(responses.GET, url, body=PHOTO, headers={'ETag': '"v1"'})
+    responses.add(
+        responses.GET, url, status=304,
+        match=[matchers.header_matcher({'If-None-Match': '"v1"'})],
+    )
+    pictures = client.pictures(str(tmp_path), max_age=3600)
+
+    path = pictures.fetch()
+    assert open(path, 'rb').read() == PHOTO
+    assert len(os.path.basename(path)) == 64
+    assert bytes(pictures.read()) == PHOTO
+    assert len(responses.calls) == 1
+
+    assert pictures.fetch(revalidate=True) == path
+    assert len(responses.calls) == 2
+    # the 304 carried no ETag, the stored one is still sent
+    assert pictures.fetch(revalidate=True) == path
+    assert len(responses.calls) == 3
+    pictures.close()
+
+
+@responses.activate
+def test_pictures_prefetch_promotion(tmp_path):
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    students = [{'id': 1, 'login': 'a'}, {'id': 2, 'login': 'b'}, {'id': 3, 'login': 'c'}]
+    responses.add(responses.GET, constants.PROMOTION_URL.format(promo_id=42), json=students)
+    for login in ('a', 'b'):
+        responses.add(responses.GET, constants.PICTURE_URL.format(login=login), body=PHOTO)
+    responses.add(responses.GET, constants.PICTURE_URL.format(login='c'), status=404)
+    pictures = client.pictures(str(tmp_path))
+
+    results = pictures.prefetch(42)
+    assert [result.ok for result in results] == [True, True, False]
+    # identical photos are stored once
+    assert results[0].value == results[1].value
+    assert len(os.listdir(os.path.dirname(results[0].value))) == 1
+    pictures.prefetch(['a', 'b'])
+    assert len(responses.calls) == 4
+    pictures.close()
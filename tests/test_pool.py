@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+import responses
+
+from etnawrapper import constants
+from etnawrapper.pool import WrapperPool
+
+
+@responses.activate
+def test_pool_shares_transport_and_isolates_cookies():
+    pool = WrapperPool(max_wrappers=2)
+    for login in ('a', 'b', 'c'):
+        pool.register(login, cookies={'authenticator': login})
+        responses.add(responses.GET, constants.ACTIVITY_URL.format(login=login), json={})
+
+    first = pool.get('a')
+    assert pool.get('a') is first
+    assert first._transport is pool.get('b')._transport
+    pool.get('c')
+    assert 'a' not in pool and len(pool) == 2
+
+    pool.run('b', lambda wrapper: wrapper.get_current_activities())
+    pool.run('c', lambda wrapper: wrapper.get_current_activities())
+    cookies = [call.request.headers['Cookie'] for call in responses.calls]
+    assert cookies == ['authenticator=b', 'authenticator=c']
+    with pytest.raises(KeyError):
+        pool.get('unknown')
+    pool.close()
+
+
+def test_pool_limits_concurrency():
+    pool = WrapperPool(max_concurrency=3, per_account=1)
+    for login in ('a', 'b', 'c', 'd'):
+        pool.register(login, cookies={})
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def job(wrapper):
+        with lock:
+            running.append(wrapper.login)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(wrapper.login)
+
+    threads = [
+        threading.Thread(target=pool.run, args=(login, job))
+        for login in ('a', 'a', 'b', 'c', 'd', 'd')
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) <= 3
+    assert len(peak) == 6
+
+    with pool.account('a'):
+        with pytest.raises(TimeoutError):
+            with pool.account('a', timeout=0.01):
+                pass
+
+
+@responses.activate
+def test_pool_builds_once_and_forgets_evicted_accounts():
+    def login(request):
+        time.sleep(0.05)
+        return 200, {'Set-Cookie': 'authenticator=token'}, ''
+
+    responses.add_callback(responses.POST, constants.AUTH_URL, callback=login)
+    pool = WrapperPool(max_wrappers=1)
+    pool.register('a', 'password')
+    pool.register('b', cookies={'authenticator': 'b'})
+    wrappers = []
+    threads = [threading.Thread(target=lambda: wrappers.append(pool.get('a'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(responses.calls) == 1
+    assert all(wrapper is wrappers[0] for wrapper in wrappers)
+
+    with pool.account('a'):
+        pool.get('b')
+        assert 'a' not in pool and 'a' in pool._accounts
+    assert 'a' not in pool._accounts
+    pool.evict('b')
+    assert not pool._accounts
+    pool.close()
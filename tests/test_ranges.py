@@ -0,0 +1,67 @@
+from datetime import date, datetime
+
+import pytest
+import responses
+from responses import matchers
+
+from etnawrapper import etna, constants
+from etnawrapper.cache import MemoryCache
+from etnawrapper.ranges import fetch_windows, split_range
+
+
+def test_split_range():
+    # 2020-01-01 is a Wednesday
+    assert split_range(date(2020, 1, 1), date(2020, 1, 15), 'week') == [
+        (datetime(2020, 1, 1), datetime(2020, 1, 6)),
+        (datetime(2020, 1, 6), datetime(2020, 1, 13)),
+        (datetime(2020, 1, 13), datetime(2020, 1, 15)),
+    ]
+    assert split_range(datetime(2020, 1, 31, 12), datetime(2020, 3, 1), 'month') == [
+        (datetime(2020, 1, 31, 12), datetime(2020, 2, 1)),
+        (datetime(2020, 2, 1), datetime(2020, 3, 1)),
+    ]
+    assert len(split_range(date(2020, 1, 1), date(2020, 1, 3), 'day')) == 2
+    with pytest.raises(ValueError):
+        split_range(date(2020, 1, 1), date(2020, 1, 3), 'year')
+
+
+def test_fetch_windows_caches_closed_windows():
+    calls = []
+
+    def fetch(start, end):
+        calls.append(start)
+        return [{'id': start.day}, {'id': 0}]
+
+    cache = MemoryCache()
+    now = datetime(2020, 1, 2, 12)
+    items = fetch_windows(fetch, date(2020, 1, 1), date(2020, 1, 3), 'day', cache=cache, now=now)
+    assert [item['id'] for item in items] == [1, 0, 2]
+    assert len(calls) == 2
+
+    fetch_windows(fetch, date(2020, 1, 1), date(2020, 1, 3), 'day', cache=cache, now=now)
+    # only the window containing `now` is fetched again
+    assert calls[2:] == [datetime(2020, 1, 2)]
+
+
+@responses.activate
+def test_get_declarations_range():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    url = constants.DECLARATIONS_URL.format(login='test_u')
+    for start, end, declarations in (
+        ('2020-01-01', '2020-01-05', [{'id': 1}]),
+        ('2020-01-06', '2020-01-12', [{'id': 1}, {'id': 2}]),
+        ('2020-01-13', '2020-01-14', [{'id': 3}]),
+    ):
+        responses.add(
+            responses.GET, url, json=declarations,
+            match=[matchers.query_param_matcher({'start': start, 'end': end})],
+        )
+
+    declarations = client.get_declarations_range(date(2020, 1, 1), date(2020, 1, 14))
+    assert [d['id'] for d in declarations] == [1, 2, 3]
+    client.get_declarations_range(date(2020, 1, 1), date(2020, 1, 14))
+    assert len(responses.calls) == 3
+
+    client.invalidate(constants.DECLARATIONS_URL)
+    client.get_declarations_range(date(2020, 1, 1), date(2020, 1, 14))
+    assert len(responses.calls) == 6
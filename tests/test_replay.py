@@ -0,0 +1,89 @@
+import gzip
+import json
+import time
+
+import pytest
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.errors import DeadlineExceeded, ReplayError
+from etnawrapper.replay import RecordingTransport, ReplayTransport
+from etnawrapper.transport import Transport
+
+
+@responses.activate
+def test_record_and_replay(tmp_path):
+    archive = str(tmp_path / 'traffic.ndjson.gz')
+    responses.add(
+        responses.POST, constants.AUTH_URL, headers={'Set-Cookie': 'authenticator=abc; Path=/'},
+    )
+    responses.add(responses.GET, constants.TICKETS_URL, json=[{'id': 1}])
+    responses.add(responses.GET, constants.TICKETS_URL, json=[{'id': 1}, {'id': 2}])
+    responses.add(
+        responses.GET, constants.PICTURE_URL.format(login='test_u'), body=b'\xff\xd8\x00',
+    )
+    with RecordingTransport(Transport(), archive) as recorder:
+        client = etna.EtnaWrapper('test_u', 'secret', transport=recorder, conditional=False)
+        assert client.get_tickets() == [{'id': 1}]
+        assert list(client.iter_tickets()) == [{'id': 1}, {'id': 2}]
+        assert client.get_picture() == b'\xff\xd8\x00'
+    assert recorder.recorded == 4
+    with open(archive, 'rb') as stream:
+        assert b'secret' not in stream.read()
+
+    responses.reset()
+    replay = ReplayTransport(archive)
+    client = etna.EtnaWrapper('test_u', 'secret', transport=replay, conditional=False)
+    assert client._cookies == {'authenticator': 'abc'}
+    assert client.get_tickets() == [{'id': 1}]
+    assert list(client.iter_tickets()) == [{'id': 1}, {'id': 2}]
+    # recorded responses are replayed in a loop
+    assert client.get_tickets() == [{'id': 1}]
+    assert client.get_picture() == b'\xff\xd8\x00'
+    with pytest.raises(ReplayError):
+        client.get_user_info(42)
+    assert not responses.calls
+
+
+def test_replay_timing(tmp_path):
+    archive = str(tmp_path / 'traffic.ndjson.gz')
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, constants.TICKETS_URL, json=[])
+        with RecordingTransport(Transport(), archive) as recorder:
+            recorder.request('GET', constants.TICKETS_URL)
+
+    delays = []
+    replay = ReplayTransport(archive, timing='original', loop=False, sleep=delays.append)
+    assert replay.request('GET', constants.TICKETS_URL).json() == []
+    assert len(delays) == 1
+    with pytest.raises(ReplayError):
+        replay.request('GET', constants.TICKETS_URL)
+    replay = ReplayTransport(archive, timing='original', sleep=delays.append)
+    with pytest.raises(DeadlineExceeded):
+        replay.request('GET', constants.TICKETS_URL, deadline=time.monotonic() - 1)
+
+
+def test_replay_original_pace(tmp_path):
+    archive = str(tmp_path / 'traffic.ndjson.gz')
+    with gzip.open(archive, 'wt') as stream:
+        for offset, elapsed in ((1.0, 0.5), (3.0, 0.25)):
+            entry = {
+                'key': ['GET', constants.TICKETS_URL, ''], 'offset': offset, 'elapsed': elapsed,
+                'status': 200, 'headers': {}, 'body': '[]',
+            }
+            stream.write(json.dumps(entry) + '\n')
+
+    now = [100.0]
+    delays = []
+
+    def sleep(delay):
+        delays.append(delay)
+        now[0] += delay
+
+    replay = ReplayTransport(archive, timing='original', sleep=sleep, clock=lambda: now[0])
+    replay.request('GET', constants.TICKETS_URL)
+    replay.request('GET', constants.TICKETS_URL)
+    # the second request was sent 2s after the first one in the recording
+    assert delays == [0.5, 1.75]
+    replay.request('GET', constants.TICKETS_URL)
+    assert delays[-1] == 0.5
@@ -0,0 +1,54 @@
+import json
+import threading
+import time
+
+import pytest
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.errors import DeadlineExceeded
+from etnawrapper.singleflight import SingleFlight
+
+
+@responses.activate
+def test_concurrent_identical_gets_are_coalesced():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'}, conditional=False)
+    url = constants.USER_INFO_URL.format(user_id=12)
+
+    def slow(request):
+        time.sleep(0.2)
+        return 200, {}, json.dumps({'id': 12})
+
+    responses.add_callback(responses.GET, url, callback=slow)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.get_user_info(12)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{'id': 12}] * 5
+    assert len(responses.calls) == 1
+    assert len(client._in_flight) == 0
+
+
+def test_waiting_callers_honor_their_deadline():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return 'done'
+
+    thread = threading.Thread(target=lambda: flight.do('key', leader))
+    thread.start()
+    started.wait(5)
+    with pytest.raises(DeadlineExceeded):
+        flight.do('key', leader, deadline=time.monotonic() + 0.05)
+    release.set()
+    thread.join()
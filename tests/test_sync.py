@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+import responses
+from responses import matchers
+
+from etnawrapper import etna, constants
+from etnawrapper.sync import SyncEngine, SyncStore
+
+
+@responses.activate
+def test_sync_log_events_are_incremental():
+    client = etna.EtnaWrapper('test_u', cookies={})
+    engine = SyncEngine(client, SyncStore())
+    url = constants.GSA_EVENTS_URL.format(login='student')
+    first = [
+        {'id': 1, 'start': '2021-03-01 09:00:00', 'uv_name': 'GPR'},
+        {'id': 2, 'start': '2021-03-02 09:00:00', 'uv_name': 'TIC'},
+    ]
+    responses.add(responses.GET, url, json=first)
+    responses.add(responses.GET, url, json=first + [{'id': 3, 'start': '2021-03-03 09:00:00'}])
+
+    assert engine.sync_log_events('student') == 2
+    assert engine.sync_log_events('student') == 1
+    assert engine.store.high_water('log_events', 'student') == '2021-03-03 09:00:00'
+    assert [e['id'] for e in engine.store.query('log_events', login='student')] == [1, 2, 3]
+    assert [e['id'] for e in engine.store.query('log_events', module='TIC')] == [2]
+    assert [e['id'] for e in engine.store.query('log_events', since='2021-03-02')] == [2, 3]
+
+
+@responses.activate
+def test_sync_declarations_fetch_new_window():
+    client = etna.EtnaWrapper('test_u', cookies={})
+    engine = SyncEngine(client, SyncStore())
+    url = constants.DECLARATIONS_URL.format(login='test_u')
+    responses.add(
+        responses.GET, url, json=[{'id': 1, 'start': '2021-03-01 10:00'}],
+        match=[matchers.query_param_matcher({'start': '2021-03-01', 'end': '2021-03-10'})],
+    )
+    responses.add(
+        responses.GET, url, json=[{'id': 2, 'start': '2021-03-12 10:00'}],
+        match=[matchers.query_param_matcher({'start': '2021-03-10', 'end': '2021-03-15'})],
+    )
+
+    engine.sync_declarations(since=date(2021, 3, 1), until=date(2021, 3, 10))
+    engine.sync_declarations(since=date(2021, 3, 1), until=date(2021, 3, 15))
+    assert [d['id'] for d in engine.store.query('declarations')] == [1, 2]
+
+
+@responses.activate
+def test_sync_models_and_records_at_the_high_water_mark():
+    client = etna.EtnaWrapper('test_u', cookies={}, models=True)
+    engine = SyncEngine(client, SyncStore())
+    url = constants.GSA_LOGS_URL.format(login='student')
+    first = [{'id': 1, 'start': '2021-03-01 09:00:00'}]
+    late = {'id': 2, 'start': '2021-03-01 09:00:00'}
+    responses.add(responses.GET, url, json=first)
+    responses.add(responses.GET, url, json=first + [late])
+
+    assert engine.sync_logs('student') == 1
+    assert engine.sync_logs('student') == 1
+    assert [e['id'] for e in engine.store.query('logs', login='student')] == [1, 2]
+
+
+def test_store_upsert_counts_and_atomic_replace():
+    store = SyncStore()
+    assert store.upsert('grades', 'a', [{'id': 1, 'mark': 10}, {'id': 2, 'mark': 12}]) == 2
+    assert store.upsert('grades', 'a', [{'id': 1, 'mark': 10}, {'id': 2, 'mark': 14}]) == 1
+    with pytest.raises(TypeError):
+        store.replace('grades', 'a', [{'id': 3, 'mark': object()}])
+    assert [g['mark'] for g in store.query('grades', login='a')] == [10, 14]
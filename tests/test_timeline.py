@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.timeline import PROJECT, QUEST, STAGE, Timeline
+from etnawrapper.transport import RetryPolicy
+
+
+def _activities(project_end='2021-04-30'):
+    return {
+        'Module': {
+            'project': [{'name': 'Project', 'date_start': '2021-03-01', 'date_end': project_end}],
+            'quest': [{
+                'name': 'Quest',
+                'date_end': '2021-04-01',
+                'stages': [
+                    {'name': 'Stage 1', 'start': '2021-03-01 09:00', 'end': '2021-03-10 23:59'},
+                    {'name': 'Stage 2', 'start': '2021-03-11 09:00', 'end': '2021-03-20 23:59'},
+                ],
+            }],
+        },
+    }
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_timeline_due_before():
+    timeline = Timeline()
+    assert timeline.update('a', _activities())
+    assert timeline.update('b', _activities(project_end='2021-03-15'))
+    assert not timeline.update('a', _activities())
+    assert len(timeline) == 8
+
+    due = timeline.due_before(_utc(2021, 3, 16))
+    assert [(entry.key, entry.name) for entry in due] == [
+        ('a', 'Stage 1'), ('b', 'Stage 1'), ('b', 'Project'),
+    ]
+    assert due[0].parent == 'Quest'
+    assert due[0].end == _utc(2021, 3, 10, 23, 59)
+
+    due = timeline.due_before(_utc(2021, 4, 2), logins=['a'], since=_utc(2021, 3, 11))
+    assert [(entry.kind, entry.name) for entry in due] == [(STAGE, 'Stage 2'), (QUEST, 'Quest')]
+    assert timeline.due_before(_utc(2022, 1, 1), logins=['b', 'z'], kinds=[PROJECT])[0].key == 'b'
+
+
+@responses.activate
+def test_timeline_load():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'}, retry=RetryPolicy(total=0))
+    responses.add(responses.GET, constants.ACTIVITY_URL.format(login='a'), json=_activities())
+    responses.add(responses.GET, constants.ACTIVITY_URL.format(login='b'), status=500)
+    responses.add(
+        responses.GET, constants.ACTIVITIES_URL.format(module_id=3),
+        json=[{'name': 'Activity', 'date_end': '2021-03-05'}, {'name': 'Undated'}],
+    )
+    timeline = Timeline(client)
+    assert timeline.load(['a', 'b']) == {'a': True}
+    assert 'b' not in timeline
+    assert timeline.update_module(3)
+    due = timeline.due_before(_utc(2021, 3, 6))
+    assert [(entry.key, entry.name) for entry in due] == [('module:3', 'Activity')]
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+import requests
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.errors import BadStatusException, DeadlineExceeded, MaxRetryError
+from etnawrapper.transport import CircuitBreaker, RetryPolicy, TokenBucket, Transport
+
+
+@responses.activate
+def test_retries_idempotent_requests():
+    delays = []
+    transport = Transport(requests.Session(), retry=RetryPolicy(total=2), sleep=delays.append)
+    client = etna.EtnaWrapper('test_u', cookies={}, transport=transport)
+    responses.add(responses.GET, constants.IDENTITY_URL, status=503)
+    responses.add(responses.GET, constants.IDENTITY_URL, json={'login': 'test_u'})
+    responses.add(responses.POST, constants.TICKETS_URL, status=503)
+
+    assert client.get_user_info() == {'login': 'test_u'}
+    assert len(delays) == 1
+
+    # POST are not retried
+    with pytest.raises(BadStatusException) as error:
+        client._query(constants.TICKETS_URL, method='POST')
+    assert error.value.status_code == 503
+    assert len(delays) == 1
+
+
+@responses.activate
+def test_circuit_breaker():
+    transport = Transport(
+        requests.Session(), retry=RetryPolicy(total=0), failure_threshold=2, sleep=lambda _: None,
+    )
+    client = etna.EtnaWrapper('test_u', cookies={}, transport=transport)
+    url = constants.GSA_LOGS_URL.format(login='test_u')
+    responses.add(responses.GET, url, body=requests.ConnectionError('down'))
+
+    for _ in range(2):
+        with pytest.raises(MaxRetryError):
+            client.get_logs()
+    assert transport.breaker('gsa').is_open
+    with pytest.raises(MaxRetryError):
+        client.get_logs()
+    assert len(responses.calls) == 2
+
+
+def test_failed_trial_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    session = requests.Session()
+    transport = Transport(session, retry=RetryPolicy(total=0))
+    transport._breakers['gsa'] = breaker
+    url = constants.GSA_LOGS_URL.format(login='test_u')
+
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body=requests.exceptions.ChunkedEncodingError('cut'))
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            transport.request('GET', url)
+    assert breaker.is_open and not breaker._trial
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, json={})
+        assert transport.request('GET', url).status_code == 200
+    assert not breaker.is_open
+
+
+def test_token_bucket():
+    waits = []
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.acquire(waits.append)
+    bucket.acquire(waits.append)
+    assert waits == []
+
+    def sleep(delay):
+        waits.append(delay)
+        bucket._updated -= delay
+
+    bucket.acquire(sleep)
+    assert len(waits) == 1
+    assert 0 < waits[0] <= 0.1
+    with pytest.raises(DeadlineExceeded):
+        bucket.acquire(sleep, deadline=time.monotonic())
+    assert len(waits) == 1
+
+
+def test_deadline_timeouts_do_not_open_the_circuit():
+    transport = Transport(requests.Session(), retry=RetryPolicy(total=0), failure_threshold=1)
+    url = constants.GSA_LOGS_URL.format(login='test_u')
+
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body=requests.ReadTimeout('cut short'))
+        with pytest.raises(MaxRetryError):
+            transport.request('GET', url, deadline=time.monotonic() + 0.005)
+        assert not transport.breaker('gsa').is_open
+        mock.add(responses.GET, url, body=requests.ReadTimeout('slow host'))
+        with pytest.raises(MaxRetryError):
+            transport.request('GET', url, deadline=time.monotonic() + 60)
+    assert transport.breaker('gsa').is_open
+
+
+@responses.activate
+def test_timeouts_and_deadline():
+    client = etna.EtnaWrapper(
+        'test_u', cookies={}, timeouts={constants.GSA_LOGS_URL: (1, 2)},
+    )
+    url = constants.GSA_LOGS_URL.format(login='test_u')
+    responses.add(responses.GET, url, json=[])
+    responses.add(responses.GET, constants.IDENTITY_URL, json={})
+
+    client.get_logs()
+    client.get_user_info()
+    assert responses.calls[0].request.req_kwargs['timeout'] == (1, 2)
+    assert responses.calls[1].request.req_kwargs['timeout'] == constants.TIMEOUTS[constants.IDENTITY_URL]
+
+    with client.deadline(0.5):
+        client.get_user_info()
+        assert responses.calls[2].request.req_kwargs['timeout'][1] <= 0.5
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(0):
+            client.get_user_info()
+    assert len(responses.calls) == 3
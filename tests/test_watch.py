@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+import responses
+
+from etnawrapper import etna, constants
+from etnawrapper.watch import ADDED, CHANGED, REMOVED, AdaptiveSchedule, Watcher
+
+
+def test_adaptive_schedule():
+    schedule = AdaptiveSchedule(min_interval=1, max_interval=5)
+    assert [schedule.update(False) for _ in range(4)] == [2, 4, 5, 5]
+    assert schedule.update(True) == 1
+    with pytest.raises(ValueError):
+        AdaptiveSchedule(min_interval=10, max_interval=5)
+
+
+def test_watcher_emits_deltas():
+    payloads = [
+        [{'id': 1, 'title': 'a'}, {'id': 2, 'title': 'b'}],
+        [{'id': 1, 'title': 'a'}, {'id': 2, 'title': 'b'}],
+        [{'id': 1, 'title': 'changed'}, {'id': 3, 'title': 'c'}],
+    ]
+    now = [0.0]
+    watcher = Watcher(min_interval=1, max_interval=8, clock=lambda: now[0])
+    watcher.watch('tickets', lambda: payloads.pop(0))
+    seen = []
+    watcher.on_change(seen.append)
+
+    assert watcher.poll() == []
+    assert watcher.next_poll() == 2
+    assert watcher.poll() == []  # not due yet
+    now[0] = 2
+    assert watcher.poll() == []
+    assert watcher.next_poll() == 4
+    now[0] = 6
+    changes = watcher.poll()
+    assert {(c.kind, c.id) for c in changes} == {(CHANGED, 1), (ADDED, 3), (REMOVED, 2)}
+    assert seen == changes
+    assert watcher.next_poll() == 1
+
+
+def test_failing_source_backs_off_without_blocking_the_others():
+    def broken():
+        raise ConnectionError('down')
+
+    now = [0.0]
+    watcher = Watcher(min_interval=1, max_interval=8, emit_initial=True, clock=lambda: now[0])
+    watcher.watch('broken', broken)
+    watcher.watch('tickets', lambda: [{'id': 1}])
+    errors = []
+    watcher.on_error(lambda source, error: errors.append((source, str(error))))
+
+    assert [(c.source, c.id) for c in watcher.poll()] == [('tickets', 1)]
+    assert errors == [('broken', 'down')]
+    assert watcher._sources['broken'].due == 2
+    now[0] = 2
+    watcher.poll()
+    assert len(errors) == 2
+    assert watcher._sources['broken'].due == 6
+
+
+def test_windowed_source_and_failing_callback(caplog):
+    payloads = [[{'id': 1}, {'id': 2}], [{'id': 3}, {'id': 1}]]
+    tickets = [[], [{'id': 1}]]
+    watcher = Watcher(min_interval=1)
+    watcher.watch('window', lambda: payloads.pop(0), removals=False)
+    watcher.watch('tickets', lambda: tickets.pop(0))
+    watcher.on_change(lambda change: 1 / 0)
+    seen = []
+    watcher.on_change(seen.append)
+
+    watcher.poll(force=True)
+    changes = watcher.poll(force=True)
+    assert [(c.source, c.kind, c.id) for c in changes] == [('window', ADDED, 3), ('tickets', ADDED, 1)]
+    assert seen == changes
+    assert 'change callback failed on window' in caplog.text
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    assert not client.watcher().watch_conversations(7)._sources['conversations:7'].removals
+
+
+@responses.activate
+def test_watch_tickets_async():
+    client = etna.EtnaWrapper('test_u', cookies={'jwt': 'abc'})
+    responses.add(responses.GET, constants.TICKETS_URL, json=[{'id': 1}])
+    responses.add(responses.GET, constants.TICKETS_URL, json=[{'id': 1}, {'id': 2}])
+    watcher = client.watcher(min_interval=0.01, emit_initial=True).watch_tickets()
+
+    async def collect():
+        changes = []
+        async for change in watcher.changes():
+            changes.append(change)
+            if len(changes) == 2:
+                watcher.stop()
+        return changes
+
+    changes = asyncio.run(collect())
+    assert [(c.kind, c.id) for c in changes] == [(ADDED, 1), (ADDED, 2)]